@@ -0,0 +1,64 @@
+# backend/bench/cascade.py
+# Every photo analysis on the full vision model (MODEL_CASCADE off) vs the
+# cheap model first with escalation when the answer looks doubtful. The fake
+# model answers "mini" requests SMALL_MODEL_SPEEDUP times faster and makes
+# --doubt-rate of them low-confidence, so that share has to be escalated.
+#
+#   cd backend && python -m bench.cascade --repeat 20 --doubt-rate 0.2
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+FAKE_PORT = 8900
+
+
+async def main(repeat: int, latency: float, doubt_rate: float):
+    from bench import fake_openai
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from services import alternative, cascade, dish_vision, llm, vision
+
+    analyses = {
+        "fridge": vision._analyze_fridge_image,
+        "dish": lambda image: cascade.run_cascade(
+            "dish", lambda m, d, mode: dish_vision._analyze_dish_image(image, m, d, mode), dish_vision._doubt),
+        "alternative": lambda image: cascade.run_cascade(
+            "alternative", lambda m, d, mode: alternative._suggest_healthier_alternatives(image, m, d, mode),
+            alternative._doubt),
+    }
+
+    random.seed(0)
+    runner = await fake_openai.start(FAKE_PORT, latency, doubt_rate=doubt_rate)
+    print(f"{'analysis':<14}{'full p50 ms':>13}{'cascade p50 ms':>16}{'escalated':>11}{'saved s':>9}")
+    try:
+        for name, analyse in analyses.items():
+            p50 = {}
+            for enabled in (False, True):
+                cascade.MODEL_CASCADE = enabled
+                cascade.cascade_stats.clear()
+                wall = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await analyse(b"photo")  # uncached
+                    wall.append(time.perf_counter() - start)
+                p50[enabled] = statistics.median(wall)
+            stats = cascade.get_cascade_stats()["modes"][name]
+            print(f"{name:<14}{p50[False] * 1000:>13.0f}{p50[True] * 1000:>16.0f}"
+                  f"{stats['escalation_rate']:>11.0%}{stats['est_saved_s'] or 0:>9.1f}")
+    finally:
+        await llm.close_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--doubt-rate", type=float, default=0.2, help="share of low-confidence cheap answers")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.latency, args.doubt_rate))
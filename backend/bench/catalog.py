@@ -0,0 +1,77 @@
+# backend/bench/catalog.py
+# Crawls the fake stores into a throwaway catalog, then compares cold price
+# lookups answered from the local catalog with live scraping:
+#   crawl    - wall time, pages and products for the whole lexicon
+#   catalog  - Catalog.lookup for every lexicon name (search-term hits) and
+#              for product words that were never a search term (token hits)
+#   live     - fetch_price with the catalog disabled and an empty price cache
+#
+#   cd backend && python -m bench.catalog --store-latency 0.2
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+FAKE_PORT = 8901
+
+
+def summary(label: str, samples, unit: float, unit_name: str) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    return (f"{label:<24}{len(ordered):>8}{statistics.median(ordered) / unit:>12.1f}"
+            f"{p99 / unit:>12.1f}  {unit_name}")
+
+
+async def main(store_latency: float, live_sample: int):
+    from bench.fake_stores import FakeStores, STORES, store_env
+    os.environ.update(store_env(FAKE_PORT))
+
+    import logging
+    logging.disable(logging.WARNING)
+    from services import catalog, prices
+    from services.ingredients import known_names
+
+    runner = await FakeStores(latency={store: store_latency for store in STORES}).start(FAKE_PORT)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.sqlite3")
+            stats = await catalog.crawl(path)
+            print(f"crawl: {stats['terms']} terms, {stats['pages']} pages, {stats['products']} products, "
+                  f"{stats['seconds']}s, errors {stats['errors'] or 0}")
+
+            local = catalog.Catalog(path, catalog.CATALOG_MAX_AGE_H * 3600)
+            await local.lookup("warm-up")  # loads the index
+            names = known_names()
+            # Words that only appear in product names, e.g. "premium" variants
+            product_words = [f"{name} premium" for name in names]
+
+            print(f"{'lookup':<24}{'n':>8}{'p50':>12}{'p99':>12}")
+            for label, queries in (("catalog / search term", names), ("catalog / tokens", product_words)):
+                samples = []
+                for name in queries:
+                    t = time.perf_counter()
+                    await local.lookup(name)
+                    samples.append(time.perf_counter() - t)
+                print(summary(label, samples, 1e-6, "µs"))
+            print(f"  catalog stats: {local.stats()}")
+            await local.close()
+
+            samples = []
+            for name in names[:live_sample]:
+                t = time.perf_counter()
+                await prices.fetch_price(name)  # catalog is off unless PRICE_CATALOG_DB is set
+                samples.append(time.perf_counter() - t)
+            print(summary("live scrape (cold)", samples, 1e-3, "ms"))
+    finally:
+        await prices.close_session()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store-latency", type=float, default=0.2, help="fake store response time, seconds")
+    parser.add_argument("--live-sample", type=int, default=30, help="names looked up live")
+    args = parser.parse_args()
+    asyncio.run(main(args.store_latency, args.live_sample))
@@ -0,0 +1,80 @@
+# backend/bench/combined.py
+# Separate endpoints vs one combined call for the same photo, against the fake
+# OpenAI server: prompt/completion tokens and latency per mode, as reported by
+# services.llm.usage_stats (the same numbers GET /llm/stats serves).
+#
+#   cd backend && python -m bench.combined --repeat 5 --latency 0.5 --token-latency 0.01
+import argparse
+import asyncio
+import io
+import os
+import time
+
+FAKE_PORT = 8900
+ALL_OUTPUTS = ("inventory", "recipes", "dish", "alternatives")
+
+
+def make_photo(seed: int) -> bytes:
+    # A 1600x1200 JPEG that differs per seed, so the result cache never short-circuits
+    from PIL import Image
+    img = Image.effect_noise((1600, 1200), 40 + seed % 20).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+async def main(repeat: int, latency: float, token_latency: float):
+    from bench import fake_openai
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from services import llm
+    from services.alternative import suggest_healthier_alternatives
+    from services.combined import analyze_combined, mode_name, model_outputs
+    from services.dish_vision import analyze_dish_image
+    from services.image_prep import prepare_image
+    from services.vision import analyze_fridge_image
+
+    runner = await fake_openai.start(FAKE_PORT, latency, token_latency=token_latency)
+    wall = {"separate (parallel)": [], "combined (1 call)": []}
+    try:
+        for i in range(repeat):
+            photo = await prepare_image(make_photo(i))
+            start = time.perf_counter()
+            await asyncio.gather(analyze_fridge_image(photo), analyze_dish_image(photo),
+                                 suggest_healthier_alternatives(photo))
+            wall["separate (parallel)"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await analyze_combined(photo, ALL_OUTPUTS)
+            wall["combined (1 call)"].append(time.perf_counter() - start)
+            await analyze_combined(photo, ("inventory", "recipes"))
+    finally:
+        await llm.close_client()
+        await runner.cleanup()
+
+    print(f"{'mode':<42}{'calls':>6}{'prompt tok':>12}{'compl tok':>11}{'p50 ms':>9}")
+    stats = llm.get_llm_stats()["usage_by_mode"]
+    for mode, s in stats.items():
+        print(f"{mode:<42}{s['calls']:>6}{s['avg_prompt_tokens']:>12}{s['avg_completion_tokens']:>11}"
+              f"{s['latency_p50_ms']:>9}")
+
+    separate = [stats[m] for m in ("fridge", "dish", "alternative")]
+    combined = stats[mode_name(model_outputs(ALL_OUTPUTS))]
+    sep_prompt = sum(s["avg_prompt_tokens"] for s in separate)
+    sep_completion = sum(s["avg_completion_tokens"] for s in separate)
+    print(f"\nper photo, all outputs: separate {sep_prompt} + {sep_completion} tokens in 3 calls, "
+          f"combined {combined['avg_prompt_tokens']} + {combined['avg_completion_tokens']} in 1 call "
+          f"({1 - combined['avg_prompt_tokens'] / sep_prompt:.0%} fewer prompt tokens)")
+    for label, samples in wall.items():
+        print(f"{label:<22} wall p50 {sorted(samples)[len(samples) // 2] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake seconds per output token")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.latency, args.token_latency))
@@ -0,0 +1,66 @@
+# backend/bench/concurrency.py
+# Fires N concurrent uploads at /analyze, /analyze-dish/ and /api/alternative
+# against a local fake OpenAI server and reports throughput per concurrency level.
+# With a blocking client the wall time grows linearly with N; with the async
+# client it should stay close to a single call's latency.
+#
+#   cd backend && python -m bench.concurrency --latency 1.0 --levels 1 4 16
+import argparse
+import asyncio
+import os
+import time
+
+FAKE_PORT = 8900
+FAKE_STORES_PORT = 8901
+ENDPOINTS = ["/analyze", "/analyze-dish/", "/api/alternative"]
+FAKE_IMAGE = b"\xff\xd8\xff\xe0" + b"\x00" * 50_000
+
+
+async def run_level(client, endpoint: str, concurrency: int) -> float:
+    async def one():
+        # Unique bytes per upload so the result cache doesn't short-circuit the model call
+        image = FAKE_IMAGE + os.urandom(16)
+        r = await client.post(endpoint, files={"file": ("photo.jpg", image, "image/jpeg")})
+        r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(concurrency)])
+    return time.perf_counter() - start
+
+
+async def main(latency: float, levels: list):
+    from bench import fake_openai
+    from bench.fake_stores import FakeStores, store_env
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.update(store_env(FAKE_STORES_PORT))  # /analyze-dish/ prices its ingredients
+
+    import httpx
+    from main import app
+    from services import llm, prices
+
+    runner = await fake_openai.start(FAKE_PORT, latency)
+    stores_runner = await FakeStores().start(FAKE_STORES_PORT)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            print(f"fake model latency: {latency:.2f}s")
+            print(f"{'endpoint':<20}{'concurrency':>12}{'wall s':>10}{'req/s':>10}")
+            for endpoint in ENDPOINTS:
+                for n in levels:
+                    wall = await run_level(client, endpoint, n)
+                    print(f"{endpoint:<20}{n:>12}{wall:>10.2f}{n / wall:>10.2f}")
+    finally:
+        await llm.close_client()
+        await prices.close_session()
+        await runner.cleanup()
+        await stores_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.levels))
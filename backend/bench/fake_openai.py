@@ -0,0 +1,231 @@
+# backend/bench/fake_openai.py
+# Minimal stand-in for the OpenAI chat completions API.
+# Sleeps for a configurable latency (plus an optional per-output-token delay) and
+# returns a canned JSON answer matching the requested structured-output schema,
+# with estimated token usage, so the backend can be load-tested without
+# spending tokens. A failure rate makes a share of calls answer 503 (retried by
+# services.llm), and output_tokens pads answers with whitespace to a minimum
+# length to simulate long generations. "mini" models answer SMALL_MODEL_SPEEDUP
+# times faster, and a doubt rate makes a share of their answers low-confidence
+# (for the model cascade).
+#
+#   python -m bench.fake_openai --port 8900 --latency 2.0 --failure-rate 0.05
+#   OPENAI_BASE_URL=http://127.0.0.1:8900/v1 uvicorn main:app
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+_FRIDGE = [{"name": "eggs", "amount": "dozen"}, {"name": "milk", "amount": "1.5L"},
+           {"name": "chicken thighs", "amount": "1kg"}, {"name": "broccoli", "amount": "2 heads"},
+           {"name": "tomatoes", "amount": "6"}, {"name": "cheese", "amount": "300g"},
+           {"name": "bell peppers", "amount": "3"}, {"name": "pasta", "amount": "500g"}]
+_INGREDIENTS = [{"name": "zemiaky", "amount": "1 kg"}, {"name": "bryndza", "amount": "300 g"},
+                {"name": "slanina", "amount": "150 g"}]
+
+# One valid answer per structured-output schema the backend asks for
+CANNED_ANSWERS = {
+    "FridgeAnalysis": {
+        "ingredients": _FRIDGE,
+        "recipes": [{
+            "name": "Omelette",
+            "ingredients_used": ["eggs 4", "milk 100ml"],
+            "instructions": "1. Whisk eggs with milk. 2. Fry.",
+        }],
+        "shopping_suggestions": ["pasta"],
+    },
+    "FridgeInventory": {
+        "ingredients": _FRIDGE,
+        "shopping_suggestions": ["pasta"],
+    },
+    "RecipeSuggestions": {
+        "recipes": [{
+            "name": "Omelette",
+            "ingredients_used": ["eggs 4", "milk 100ml"],
+            "instructions": "1. Whisk eggs with milk. 2. Fry.",
+        }],
+    },
+    "DishAnalysis": {
+        "recognized_dish": "Bryndzové halušky",
+        "certainty_percent": 95,
+        "serves": 4,
+        "prep_time_min": 45,
+        "instructions": "1. Cook.",
+        "ingredients": _INGREDIENTS,
+    },
+    "DishShoppingAnalysis": {
+        "recognized_dish": "Bryndzové halušky",
+        "serves": 4,
+        "prep_time_min": 45,
+        "instructions": "1. Cook.",
+        "ingredients": _INGREDIENTS,
+        "shopping_list": {"items": [], "estimated_total": 0.0, "currency": "€"},
+    },
+    "AlternativesAnalysis": {
+        "detected_product": "Extra Virgin Olive Oil",
+        "category": "cooking oil",
+        "assessment": "great",
+        "message": "Great choice!",
+        "why": "Rich in monounsaturated fats.",
+        "alternatives": [
+            {"name": "Avocado Oil", "why_better_or_similar": "Higher smoke point.",
+             "price_per_100ml_eur": 3.2, "best_for": "high-heat cooking"},
+            {"name": "Rapeseed Oil", "why_better_or_similar": "More omega-3.",
+             "price_per_100ml_eur": 0.4, "best_for": "baking"},
+            {"name": "Walnut Oil", "why_better_or_similar": "Rich in ALA.",
+             "price_per_100ml_eur": 2.5, "best_for": "salads"},
+        ],
+    },
+}
+
+SMALL_MODEL_SPEEDUP = 3.0
+
+
+def _doubtful(schema: str, answer: dict) -> dict:
+    # Valid but unconvincing: what the cascade should not accept from the cheap model
+    if schema == "DishAnalysis":
+        return {**answer, "certainty_percent": 35}
+    if schema == "AlternativesAnalysis":
+        return {**answer, "alternatives": []}
+    if "ingredients" in answer:
+        return {**answer, "ingredients": []}
+    return answer
+
+
+# Image input cost per detail level (a ~1024px photo at high detail is 85 + 4 tiles x 170)
+IMAGE_TOKENS = {"low": 85, "high": 765}
+
+
+def _combined_answer(schema: str, answers: dict) -> dict:
+    # services.combined names its schemas Combined_<output>_<output>...
+    sections = schema.split("_")[1:]
+    fridge = answers["FridgeAnalysis"]
+    answer = {}
+    if "inventory" in sections:
+        answer["ingredients"] = fridge["ingredients"]
+        answer["shopping_suggestions"] = fridge["shopping_suggestions"]
+    if "recipes" in sections:
+        answer["recipes"] = fridge["recipes"]
+    if "dish" in sections:
+        answer["dish"] = answers["DishAnalysis"]
+    if "alternatives" in sections:
+        answer["product"] = answers["AlternativesAnalysis"]
+    return answer
+
+
+def _answer_for(body: dict, answers: dict, doubt_rate: float = 0.0) -> str:
+    schema = (body.get("response_format") or {}).get("json_schema", {}).get("name") or ""
+    answer = _combined_answer(schema, answers) if schema.startswith("Combined_") else answers.get(schema, {})
+    if "mini" in body.get("model", "") and random.random() < doubt_rate:
+        answer = _doubtful(schema, answer)
+    return json.dumps(answer, ensure_ascii=False)
+
+
+def _usage(body: dict, content: str) -> dict:
+    # Rough token counts (~4 characters per token), enough to compare prompt variants
+    text_chars = len(json.dumps(body.get("response_format") or {}))
+    image_tokens = 0
+    for message in body.get("messages", []):
+        parts = message["content"] if isinstance(message["content"], list) else [{"type": "text", "text": message["content"]}]
+        for part in parts:
+            if part["type"] == "text":
+                text_chars += len(part["text"])
+            else:
+                image_tokens += IMAGE_TOKENS.get(part["image_url"].get("detail", "high"), IMAGE_TOKENS["high"])
+    prompt_tokens = text_chars // 4 + image_tokens
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def make_app(latency: float = 1.0, answers: dict = None, token_latency: float = 0.0,
+             failure_rate: float = 0.0, output_tokens: int = 0, doubt_rate: float = 0.0) -> web.Application:
+    answers = answers or CANNED_ANSWERS
+    stats = Counter()  # requests, failures, prompt_tokens, completion_tokens
+
+    async def stream_completion(request: web.Request, body: dict, content: str) -> web.StreamResponse:
+        model = body.get("model", "fake")
+        # Spread the latency over ~20 content deltas, like a real streamed answer
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        step = max(1, len(content) // 20)
+        token_delay = _usage(body, content)["completion_tokens"] * token_latency
+        for i in range(0, len(content), step):
+            await asyncio.sleep((latency + token_delay) / 20)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [], "usage": _usage(body, content)}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        stats["requests"] += 1
+        if random.random() < failure_rate:
+            stats["failures"] += 1
+            await asyncio.sleep(latency / 10)
+            return web.json_response({"error": {"message": "overloaded", "type": "server_error"}}, status=503)
+        content = _answer_for(body, answers, doubt_rate)
+        # Whitespace after the JSON value is still valid structured output
+        content = content.ljust(output_tokens * 4)
+        usage = _usage(body, content)
+        stats["prompt_tokens"] += usage["prompt_tokens"]
+        stats["completion_tokens"] += usage["completion_tokens"]
+        if body.get("stream"):
+            return await stream_completion(request, body, content)
+        delay = latency + usage["completion_tokens"] * token_latency
+        await asyncio.sleep(delay / SMALL_MODEL_SPEEDUP if "mini" in body.get("model", "") else delay)
+        return web.json_response({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["stats"] = stats
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def start(port: int, latency: float = 1.0, answers: dict = None, token_latency: float = 0.0,
+                failure_rate: float = 0.0, output_tokens: int = 0, doubt_rate: float = 0.0) -> web.AppRunner:
+    """Serve in the running loop; counters are in `runner.app["stats"]`."""
+    runner = web.AppRunner(make_app(latency, answers, token_latency, failure_rate, output_tokens, doubt_rate))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra seconds per output token")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of calls answered with 503")
+    parser.add_argument("--output-tokens", type=int, default=0, help="pad answers to at least this many tokens")
+    parser.add_argument("--doubt-rate", type=float, default=0.0, help="share of low-confidence mini-model answers")
+    args = parser.parse_args()
+    app = make_app(args.latency, token_latency=args.token_latency, failure_rate=args.failure_rate,
+                   output_tokens=args.output_tokens, doubt_rate=args.doubt_rate)
+    web.run_app(app, host="127.0.0.1", port=args.port)
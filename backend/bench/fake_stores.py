@@ -0,0 +1,107 @@
+# backend/bench/fake_stores.py
+# Local stand-ins for the Tesco/Billa/Lidl/Kaufland search endpoints.
+# Each store answers after a configurable latency with a page in the same
+# shape the scrapers parse. Counts distinct client connections per store so
+# benchmarks can see how much keep-alive reuse they get. Every page lists a
+# few products; the first is the one the price scrapers pick up. Store i listens on
+# port + i, so per-host connection limits apply per store as they would
+# against the real sites.
+#
+#   python -m bench.fake_stores --port 8901
+#   TESCO_SEARCH_URL=http://127.0.0.1:8901/tesco BILLA_SEARCH_URL=http://127.0.0.1:8902/billa ... uvicorn main:app
+import argparse
+import asyncio
+import random
+from collections import defaultdict
+
+from aiohttp import web
+
+STORES = ["tesco", "billa", "lidl", "kaufland"]
+PAGE_PADDING = "<div class='product-tile'>filler</div>\n" * 2000  # ~80 KB like a real page
+PRODUCT_VARIANTS = [("", 1.0), (" bio", 1.4), (" premium 1 kg", 1.9)]  # name suffix, price factor
+
+
+def store_env(port: int) -> dict:
+    """*_SEARCH_URL overrides for FakeStores started on `port` (set before importing services)."""
+    return {f"{store.upper()}_SEARCH_URL": f"http://127.0.0.1:{port + i}/{store}" for i, store in enumerate(STORES)}
+
+
+class FakeStores:
+    def __init__(self, latency: dict = None, failure_rate: dict = None, slow_rate: dict = None,
+                 slow_latency: float = 2.0):
+        self.latency = {store: 0.05 for store in STORES}
+        self.latency.update(latency or {})
+        self.failure_rate = {store: 0.0 for store in STORES}
+        self.failure_rate.update(failure_rate or {})
+        # Share of requests that take slow_latency instead (a slow tail, e.g. a cold backend)
+        self.slow_rate = {store: 0.0 for store in STORES}
+        self.slow_rate.update(slow_rate or {})
+        self.slow_latency = slow_latency
+        self.connections = defaultdict(set)
+        self.requests = defaultdict(int)
+
+    def reset_counters(self):
+        self.connections.clear()
+        self.requests.clear()
+
+    def _page(self, store: str, query: str, page_size: int) -> web.Response:
+        price = round(0.5 + (hash(query) % 500) / 100, 2)
+        products = [(f"{query}{variant}", round(price * factor, 2)) for variant, factor in PRODUCT_VARIANTS]
+        if store == "billa":
+            return web.json_response({"results": [
+                {"name": name, "price": {"finalPrice": p}} for name, p in products[:page_size]
+            ]})
+        key = "priceValue" if store == "tesco" else "price"
+        tiles = ", ".join(f'{{"name": "{name}", "{key}": {p}}}' for name, p in products)
+        body = f'<html><body>{PAGE_PADDING}<script>[{tiles}]</script></body></html>'
+        return web.Response(text=body, content_type="text/html")
+
+    def handler(self, store: str):
+        async def handle(request: web.Request) -> web.Response:
+            self.requests[store] += 1
+            self.connections[store].add(request.transport.get_extra_info("peername"))
+            slow = random.random() < self.slow_rate[store]
+            await asyncio.sleep(self.slow_latency if slow else self.latency[store])
+            if random.random() < self.failure_rate[store]:
+                return web.Response(status=503, text="unavailable")
+            query = request.query.get("query") or request.query.get("text") or request.query.get("q", "")
+            return self._page(store, query, int(request.query.get("pageSize", "1")))
+        return handle
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        for store in STORES:
+            app.router.add_get(f"/{store}", self.handler(store))
+        return app
+
+    async def start(self, port: int) -> web.AppRunner:
+        """Serve store i on port + i in the running loop."""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        for i in range(len(STORES)):
+            await web.TCPSite(runner, "127.0.0.1", port + i).start()
+        return runner
+
+
+async def _serve(stores: FakeStores, port: int):
+    runner = await stores.start(port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of lookups answered with 503")
+    args = parser.parse_args()
+    stores = FakeStores(
+        latency={store: args.latency for store in STORES},
+        failure_rate={store: args.failure_rate for store in STORES},
+    )
+    try:
+        asyncio.run(_serve(stores, args.port))
+    except KeyboardInterrupt:
+        pass
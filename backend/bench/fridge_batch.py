@@ -0,0 +1,68 @@
+# backend/bench/fridge_batch.py
+# N photos of one fridge: posted one by one to /analyze (what the app did)
+# vs one /analyze/batch request, fanned out or packed into a single call.
+# The fake model pays --latency per call plus --token-latency per output
+# token; photos are distinct per run so no cache answers.
+#
+#   cd backend && python -m bench.fridge_batch --photos 3 6 --repeat 5
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+FAKE_PORT = 8900
+
+
+async def main(photo_counts, repeat: int, latency: float, token_latency: float):
+    from bench import fake_openai
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from services import fridge_batch, llm, vision
+
+    runs = 0
+
+    def photos(n: int):
+        nonlocal runs
+        runs += 1
+        return [f"photo-{runs}-{i}".encode() for i in range(n)]
+
+    async def one_by_one(images):
+        return [await vision.analyze_fridge_image(image) for image in images]
+
+    def batch(pack_max: int):
+        async def run(images):
+            fridge_batch.FRIDGE_BATCH_PACK_MAX = pack_max
+            return await fridge_batch.analyze_fridge_batch(images)
+        return run
+
+    modes = (("one by one", one_by_one), ("batch, fan-out", batch(0)), ("batch, packed", batch(8)))
+    runner = await fake_openai.start(FAKE_PORT, latency, token_latency=token_latency)
+    print(f"{'photos':>6}  {'mode':<16}{'p50 ms':>9}{'model calls':>13}{'recipe sets':>13}")
+    try:
+        for n in photo_counts:
+            for label, analyse in modes:
+                llm.usage_stats.clear()
+                wall, result = [], None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    result = await analyse(photos(n))
+                    wall.append(time.perf_counter() - start)
+                calls = sum(u.calls for u in llm.usage_stats.values()) / repeat
+                recipe_sets = len(result) if isinstance(result, list) else 1
+                print(f"{n:>6}  {label:<16}{statistics.median(wall) * 1000:>9.0f}{calls:>13.1f}{recipe_sets:>13}")
+    finally:
+        await llm.close_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--photos", type=int, nargs="+", default=[3, 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.005, help="fake seconds per output token")
+    args = parser.parse_args()
+    asyncio.run(main(args.photos, args.repeat, args.latency, args.token_latency))
@@ -0,0 +1,85 @@
+# backend/bench/gap_analysis.py
+# Gap analysis at scale: the old per-recipe calculate_gaps (linear scan by name,
+# string parsing per nutrient) vs services.recipes.rank_recipes scoring every
+# candidate against a week of eaten meals in one pass.
+#
+#   cd backend && python -m bench.gap_analysis --recipes 10000 --days 7
+import argparse
+import random
+import time
+
+from services.recipes import DAILY, DAILY_NUTRIENTS, nutrient_matrix, rank_recipes, remaining_gaps, score_recipes
+
+
+def old_calculate_gaps(chosen_recipe_name: str, analysis_result: dict) -> dict:
+    # services/recipes.py::calculate_gaps before the vectorized engine
+    recipe = next((r for r in analysis_result["recipes"] if r["name"] == chosen_recipe_name), None)
+    if not recipe:
+        return {"error": "Recipe not found"}
+
+    gaps = {}
+    micros = recipe.get("micronutrients", {})
+    for nutrient, daily in DAILY_NUTRIENTS.items():
+        current = micros.get(nutrient, 0)
+        if isinstance(current, str):
+            current = float(current.replace("g", "").replace("mg", ""))
+
+        missing = daily - current
+        if missing > 0:
+            unit = "g" if nutrient == "protein" or nutrient.endswith("_g") else "mg"
+            gaps[nutrient] = f"Need {missing:.2f}{unit} more"
+
+    return {
+        "chosen_recipe": chosen_recipe_name,
+        "covered": {k: v for k, v in micros.items() if k in DAILY_NUTRIENTS},
+        "still_missing_today": gaps or "You're all set!"
+    }
+
+
+def make_recipe(rng: random.Random, i: int) -> dict:
+    # Each recipe covers a random 0-60 % of each daily value. Micronutrients stay numeric:
+    # the old parser strips "g" before "mg" and raises on "8mg".
+    values = {k: rng.uniform(0, 0.6) * daily for k, daily in DAILY_NUTRIENTS.items()}
+    return {
+        "name": f"Recipe {i}",
+        "macros": {"protein": f"{values.pop('protein'):.1f}g"},
+        "micronutrients": {k: round(v, 4) for k, v in values.items()},
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(n_recipes: int, days: int, top_k: int, skip_old: bool):
+    rng = random.Random(42)
+    recipes = [make_recipe(rng, i) for i in range(n_recipes)]
+    eaten = [[make_recipe(rng, -d * 10 - m) for m in range(3)] for d in range(days)]
+    print(f"{n_recipes} candidate recipes, {days} day(s) x 3 eaten meals, top {top_k}")
+
+    if not skip_old:
+        # Old API: one call per recipe, and no notion of meals already eaten or of ranking
+        analysis = {"recipes": recipes}
+        _, old_ms = timed(lambda: [old_calculate_gaps(r["name"], analysis) for r in recipes])
+        print(f"{'old calculate_gaps loop':<28}{old_ms:>10.1f} ms")
+
+    result, total_ms = timed(lambda: rank_recipes(recipes, eaten, top_k))
+    candidates, build_ms = timed(lambda: nutrient_matrix(recipes))
+    gaps = remaining_gaps(nutrient_matrix([m for day in eaten for m in day]), days)
+    _, score_ms = timed(lambda: score_recipes(candidates, gaps, DAILY * days))
+    print(f"{'rank_recipes (end to end)':<28}{total_ms:>10.1f} ms")
+    print(f"{'  dicts -> matrix':<28}{build_ms:>10.1f} ms")
+    print(f"{'  score all candidates':<28}{score_ms:>10.2f} ms")
+    print("best:", ", ".join(f"{r['name']} ({r['score']})" for r in result["ranked"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--skip-old", action="store_true", help="the old loop is quadratic in --recipes")
+    args = parser.parse_args()
+    main(args.recipes, args.days, args.top_k, args.skip_old)
@@ -0,0 +1,46 @@
+# backend/bench/image_prep.py
+# Bytes-out and latency of the upload preprocessing stage per input size.
+#
+#   cd backend && python -m bench.image_prep --detail high
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from services.image_prep import max_dim_for, preprocess_image
+
+SIZES = [(1024, 768), (2048, 1536), (3024, 4032), (4000, 3000), (6000, 4000)]
+
+
+def synthetic_photo(width: int, height: int) -> bytes:
+    # Noise over a gradient compresses roughly like a real photo
+    base = Image.radial_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    img = Image.merge("RGB", (base, noise, Image.blend(base, noise, 0.5)))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=95)
+    return out.getvalue()
+
+
+def main(detail: str, repeat: int):
+    max_dim = max_dim_for(detail)
+    print(f"detail={detail} max_dim={max_dim}")
+    print(f"{'input':>12}{'bytes in':>12}{'bytes out':>12}{'b64 out':>12}{'ratio':>8}{'ms':>9}")
+    for width, height in SIZES:
+        raw = synthetic_photo(width, height)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            out = preprocess_image(raw, max_dim)
+        ms = (time.perf_counter() - start) / repeat * 1000
+        b64 = (len(out) + 2) // 3 * 4
+        label = f"{width}x{height}"
+        print(f"{label:>12}{len(raw):>12}{len(out):>12}{b64:>12}{len(out) / len(raw):>8.2f}{ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detail", choices=["low", "high"], default="high")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.detail, args.repeat)
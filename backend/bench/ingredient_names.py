@@ -0,0 +1,90 @@
+# backend/bench/ingredient_names.py
+# Ingredient normalization over a synthetic corpus of the spellings the model
+# and users produce: case and whitespace noise, missing diacritics, Slovak case
+# endings, qualifiers ("varené", "fresh") and one-letter typos. Compares the old
+# exact ENGLISH_NAMES lookup with services.ingredients (cold and warm memo), and
+# counts real foods outside the lexicon that it wrongly maps onto a known one.
+#
+#   cd backend && python -m bench.ingredient_names --names 200000
+import argparse
+import random
+import time
+
+from services.ingredients import ENGLISH_NAMES, IngredientNormalizer, _lexicon, fold
+
+ENDINGS = ["", "", "y", "e", "u", "ou", "ami"]
+QUALIFIER_WORDS = ["varené", "čerstvé", "nakrájaná", "fresh", "chopped"]
+# Not in the lexicon, but spelled close to something that is
+UNKNOWN_FOODS = [
+    "pear", "pears", "salami", "green beans", "juice", "chocolate", "milk chocolate", "creamer",
+    "ice cream", "cream cheese", "peanut butter", "coconut milk", "plums", "cherries", "grapes",
+    "lamb", "duck", "shrimp", "ginger", "cinnamon", "pineapple", "soy sauce", "mustard", "peanuts",
+    "hrušky", "saláma", "slivky", "čerešne", "hrozno", "jahňacina", "kačica", "zázvor", "škorica",
+]
+
+
+def perturb(rng: random.Random, name: str) -> str:
+    text = name
+    if rng.random() < 0.3:
+        text = fold(text)                       # typed without diacritics
+    if rng.random() < 0.3 and " " not in text:
+        text = text.rstrip("aeiouyáéíóúý") + rng.choice(ENDINGS)
+    if rng.random() < 0.2:
+        text = f"{text} {rng.choice(QUALIFIER_WORDS)}"
+    if rng.random() < 0.1 and len(text) > 5:
+        i = rng.randrange(1, len(text) - 1)     # drop one letter
+        text = text[:i] + text[i + 1:]
+    if rng.random() < 0.3:
+        text = text.title()
+    if rng.random() < 0.2:
+        text = f" {text}  "
+    return text
+
+
+def old_translate(name: str):
+    # dish_vision.translate_ingredient before the normalizer
+    original_name = name.strip().lower()
+    return ENGLISH_NAMES.get(original_name)
+
+
+def run(label: str, fn, corpus, expected):
+    start = time.perf_counter()
+    results = [fn(name) for name in corpus]
+    elapsed = time.perf_counter() - start
+    correct = sum(r == e for r, e in zip(results, expected))
+    print(f"{label:<22}{len(corpus) / elapsed / 1000:>10.0f}k/s{correct / len(corpus):>10.1%}"
+          f"{len(set(r or n.strip().lower() for r, n in zip(results, corpus))):>12}")
+
+
+def main(n_names: int):
+    rng = random.Random(7)
+    lexicon = _lexicon()
+    sources = [(sk, en) for sk, en in lexicon if sk != en]  # Slovak/alias spellings
+    picks = [rng.choice(sources) for _ in range(n_names)]
+    corpus = [perturb(rng, sk) for sk, _ in picks]
+    reference = IngredientNormalizer(lexicon)
+    expected = [reference.translate(sk) for sk, _ in picks]
+
+    print(f"{n_names} names, {len(set(corpus))} distinct spellings, {len(set(expected))} ingredients")
+    print(f"{'':<22}{'throughput':>13}{'correct':>10}{'cache keys':>12}")
+    run("old exact lookup", old_translate, corpus, expected)
+
+    normalizer = IngredientNormalizer(lexicon)
+    start = time.perf_counter()
+    IngredientNormalizer(lexicon)
+    print(f"{'build index':<22}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    run("normalizer (cold)", normalizer.translate, corpus, expected)
+    run("normalizer (warm)", normalizer.translate, corpus, expected)
+    print(f"fuzzy matches: {normalizer.fuzzy_hits}")
+
+    wrong = [(name, normalizer.translate(name)) for name in UNKNOWN_FOODS]
+    wrong = [(name, english) for name, english in wrong if english is not None]
+    print(f"unknown foods mapped to a known one: {len(wrong)}/{len(UNKNOWN_FOODS)}"
+          + "".join(f"\n  {name} -> {english}" for name, english in wrong))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.names)
@@ -0,0 +1,317 @@
+# backend/bench/load.py
+# Offline load test: drives /analyze, /analyze-dish/ and /api/alternative at
+# several concurrency levels against the fake OpenAI and fake store servers,
+# and reports throughput, p50/p95/p99 latency, errors and memory per level.
+# Results can be saved as JSON and compared with an earlier run:
+#
+#   cd backend && python -m bench.load --levels 1 8 32 --requests 64 --out bench/results/base.json
+#   ... change something ...
+#   python -m bench.load --levels 1 8 32 --requests 64 --compare bench/results/base.json
+#
+# The fakes run in a child process, so CPU time and memory are the backend's
+# own. The backend runs in this process behind an in-memory ASGI transport;
+# pass --url to load a separately started server instead (memory is then not
+# measured).
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+FAKE_OPENAI_PORT = 8900
+FAKE_STORES_PORT = 8901  # stores use 8901-8904
+ENDPOINTS = ["/analyze", "/analyze-dish/", "/api/alternative"]
+SESSION_HEADER = "X-Session-Id"  # services.sessions; not imported, so --url runs need no backend code
+
+
+def make_images(count: int, width: int, height: int, directory: str) -> List[str]:
+    """Distinct photo-sized JPEGs on disk, so they don't count towards this process's memory.
+
+    Uploads are re-encoded before they are hashed, so only different pixels
+    give a fresh cache key, and photos that look alike are reused by the
+    near-duplicate index; each image gets its own layout of coloured blocks
+    over the whole frame.
+    """
+    import random
+    from PIL import Image, ImageDraw
+    base = Image.merge("RGB", [
+        Image.linear_gradient("L").resize((width, height)),
+        Image.effect_noise((width, height), 24).convert("L"),
+        Image.linear_gradient("L").rotate(90).resize((width, height)),
+    ])
+    paths = []
+    for i in range(count):
+        img = base.copy()
+        draw = ImageDraw.Draw(img)
+        rng = random.Random(i)
+        for _ in range(12):
+            x, y = rng.randrange(width), rng.randrange(height)
+            w, h = rng.randrange(width // 8, width // 3), rng.randrange(height // 8, height // 3)
+            draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(directory, f"{i}.jpg")
+        img.save(path, format="JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def percentile_ms(sorted_samples: List[float], q: float) -> Optional[float]:
+    if not sorted_samples:
+        return None
+    return round(sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))] * 1000, 1)
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10, 1)
+
+
+def serve_fakes(args: argparse.Namespace):
+    # Child process: fake OpenAI plus fake stores until terminated
+    from bench import fake_openai
+    from bench.fake_stores import FakeStores, STORES
+
+    async def serve():
+        await fake_openai.start(FAKE_OPENAI_PORT, args.latency, token_latency=args.token_latency,
+                                failure_rate=args.failure_rate, output_tokens=args.output_tokens)
+        await FakeStores(
+            latency={store: args.store_latency for store in STORES},
+            failure_rate={store: args.store_failure_rate for store in STORES},
+        ).start(FAKE_STORES_PORT)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"fake server on port {port} did not start")
+            time.sleep(0.05)
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def run_level(client, endpoint: str, concurrency: int, images: List[str]) -> Dict:
+    latencies = []
+    statuses = Counter()
+    total = len(images)
+    next_image = iter(images)
+
+    async def worker():
+        # Closed loop: each worker sends its next request as soon as the last one finished
+        for path in next_image:
+            body = read(path)
+            start = time.perf_counter()
+            try:
+                # Every request is its own user: one shared session would let the
+                # near-duplicate index answer from an earlier photo of the run
+                r = await client.post(endpoint, files={"file": ("photo.jpg", body, "image/jpeg")},
+                                      headers={SESSION_HEADER: uuid.uuid4().hex})
+                statuses[str(r.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+
+    lat = sorted(latencies)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(n for status, n in statuses.items() if status != "200"),
+        "statuses": dict(statuses),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 2),
+        "mean_ms": round(sum(lat) / len(lat) * 1000, 1),
+        "p50_ms": percentile_ms(lat, 0.5),
+        "p95_ms": percentile_ms(lat, 0.95),
+        "p99_ms": percentile_ms(lat, 0.99),
+        "max_ms": round(lat[-1] * 1000, 1),
+    }
+
+
+def backend_counters() -> Dict:
+    # Read from the in-process backend, so they cover retries and cache hits
+    from services.llm import get_llm_stats, usage_stats
+    from services.prices import get_store_stats
+    stores = get_store_stats()
+    return {
+        "model_calls": sum(s.calls for s in usage_stats.values()),
+        "prompt_tokens": sum(s.prompt_tokens for s in usage_stats.values()),
+        "completion_tokens": sum(s.completion_tokens for s in usage_stats.values()),
+        "parse_failures": sum(get_llm_stats()["parse_failures"].values()),
+        "store_requests": sum(s["requests"] for s in stores["stores"].values()),
+        "price_cache_hits": stores["cache"]["hits"],
+    }
+
+
+def diff_counters(after: Dict, before: Dict) -> Dict:
+    return {k: after[k] - before[k] for k in after}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str, max_regression: float) -> bool:
+    """Print the change per level against a saved run; False if any key metric regressed."""
+    with open(baseline_path) as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\ncompared with {baseline_path} (allowed regression {max_regression:.0%})")
+    print(f"{'endpoint':<20}{'conc':>6}{'req/s':>18}{'p95 ms':>22}")
+    for r in results:
+        base = baseline.get((r["endpoint"], r["concurrency"]))
+        if base is None:
+            continue
+        rps_change = r["throughput_rps"] / base["throughput_rps"] - 1
+        p95_change = r["p95_ms"] / base["p95_ms"] - 1
+        regressed = rps_change < -max_regression or p95_change > max_regression
+        ok = ok and not regressed
+        print(f"{r['endpoint']:<20}{r['concurrency']:>6}"
+              f"{base['throughput_rps']:>8.1f} → {r['throughput_rps']:<7.1f}"
+              f"{base['p95_ms']:>10.0f} → {r['p95_ms']:<7.0f}({p95_change:+.0%}){'  REGRESSED' if regressed else ''}")
+    return ok
+
+
+async def main(args: argparse.Namespace) -> List[Dict]:
+    import httpx
+
+    per_level = [max(args.requests, concurrency) for concurrency in args.levels]
+    # Every endpoint uses its own prompt version (cache key), so images repeat across endpoints only
+    count = 1 if args.repeat_image else 1 + sum(per_level)
+    images = make_images(count, args.image_width, args.image_height, args.image_dir)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=300)
+        app = None
+    else:
+        from bench.fake_stores import store_env
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_OPENAI_PORT}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ.update(store_env(FAKE_STORES_PORT))
+        from main import app, shutdown, startup
+        await startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300)
+
+    results = []
+    try:
+        print(f"model latency {args.latency:.2f}s, failure rate {args.failure_rate:.0%}, "
+              f"store latency {args.store_latency * 1000:.0f} ms, image {os.path.getsize(images[0]) // 1024} KB")
+        print(f"{'endpoint':<20}{'conc':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'errors':>8}{'calls':>7}{'rss MB':>8}")
+        for endpoint in args.endpoints:
+            # One untimed request per endpoint: imports, connection pools, lazy indexes
+            await client.post(endpoint, files={"file": ("photo.jpg", read(images[0]), "image/jpeg")})
+            offset = 1 % len(images)
+            for concurrency, n in zip(args.levels, per_level):
+                level_images = [images[(offset + i) % len(images)] for i in range(n)]
+                offset = (offset + n) % len(images)
+                counters = backend_counters() if app else None
+                result = await run_level(client, endpoint, concurrency, level_images)
+                if app:
+                    result.update(diff_counters(backend_counters(), counters))
+                    result["rss_mb"] = rss_mb()
+                    result["peak_rss_mb"] = peak_rss_mb()
+                results.append(result)
+                print(f"{endpoint:<20}{concurrency:>6}{result['throughput_rps']:>8.1f}{result['p50_ms']:>9.0f}"
+                      f"{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}{result['errors']:>8}"
+                      f"{result.get('model_calls', '-'):>7}{result.get('rss_mb') or '-':>8}")
+    finally:
+        await client.aclose()
+        if app:
+            await shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32], help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=64, help="requests per endpoint and level")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake model latency, seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra model seconds per output token")
+    parser.add_argument("--output-tokens", type=int, default=0, help="pad model answers to this many tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of model calls failing with 503")
+    parser.add_argument("--store-latency", type=float, default=0.05)
+    parser.add_argument("--store-failure-rate", type=float, default=0.0)
+    parser.add_argument("--image-width", type=int, default=1600)
+    parser.add_argument("--image-height", type=int, default=1200)
+    parser.add_argument("--repeat-image", action="store_true",
+                        help="send the same image every time (measures the cached path)")
+    parser.add_argument("--url", help="load an already running backend instead of an in-process one")
+    parser.add_argument("--image-dir", help="where to write the test images (default: a temporary directory)")
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.image_dir:
+        tmp = tempfile.TemporaryDirectory(prefix="fridgenutri-bench-")
+        args.image_dir = tmp.name
+    fakes = None
+    if not args.url:
+        fakes = multiprocessing.get_context("spawn").Process(target=serve_fakes, args=(args,), daemon=True)
+        fakes.start()
+        for port in (FAKE_OPENAI_PORT, FAKE_STORES_PORT):
+            wait_for_port(port)
+    try:
+        results = asyncio.run(main(args))
+    finally:
+        if fakes is not None:
+            fakes.terminate()
+            fakes.join()
+        if tmp is not None:
+            tmp.cleanup()
+            args.image_dir = None
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        config = {k: v for k, v in vars(args).items() if k not in ("out", "compare", "max_regression", "image_dir")}
+        with open(args.out, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "config": config,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nsaved {args.out}")
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        sys.exit(1)
@@ -0,0 +1,80 @@
+# backend/bench/metrics_overhead.py
+# Cost of the instrumentation in services.metrics: one counter increment, one
+# histogram observation and one span per call, a /metrics render at realistic
+# label cardinality, and requests/s of a trivial FastAPI route with and without
+# MetricsMiddleware (in-process ASGI transport, no sockets).
+#
+#   cd backend && python -m bench.metrics_overhead --ops 200000 --requests 5000
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from services import metrics
+
+
+def per_op(label: str, fn, ops: int):
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{elapsed / ops * 1e9:>10.0f} ns/op")
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+
+async def requests_per_second(app: FastAPI, n: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(100):  # warm-up
+            await client.get(f"/items/{i}")
+        start = time.perf_counter()
+        for i in range(n):
+            await client.get(f"/items/{i}")
+        return n / (time.perf_counter() - start)
+
+
+def main(ops: int, n_requests: int):
+    counter = metrics.Counter("bench_total", "bench", ["store", "outcome"])
+    histogram = metrics.Histogram("bench_seconds", "bench", ["store"])
+
+    def in_span():
+        with metrics.span("bench"):
+            pass
+
+    per_op("counter.inc", lambda: counter.inc("Tesco", "found"), ops)
+    per_op("histogram.observe", lambda: histogram.observe(0.12, "Tesco"), ops)
+    per_op("span (context manager)", in_span, ops)
+
+    # Roughly what a busy instance exposes: ~30 routes x 3 statuses, 4 stores, 8 modes
+    for route in range(30):
+        for status in ("200", "422", "500"):
+            metrics.http_requests_total.inc("POST", f"/route{route}", status)
+        metrics.http_request_seconds.observe(0.2, "POST", f"/route{route}")
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"{'render /metrics':<28}{(time.perf_counter() - start) * 1000:>10.2f} ms "
+          f"({len(text.splitlines())} lines)")
+
+    plain = asyncio.run(requests_per_second(make_app(False), n_requests))
+    instrumented = asyncio.run(requests_per_second(make_app(True), n_requests))
+    print(f"{'requests/s without':<28}{plain:>10.0f}")
+    print(f"{'requests/s with middleware':<28}{instrumented:>10.0f}  ({instrumented / plain - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.ops, args.requests)
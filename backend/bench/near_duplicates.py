@@ -0,0 +1,138 @@
+# backend/bench/near_duplicates.py
+# Perceptual-hash reuse of analyses for repeated photos:
+#   distances - dHash distance from a synthetic fridge photo to re-takes of it
+#               (brighter, shifted, one item moved, re-encoded) and to other fridges
+#   lookup    - BK-tree search vs a linear scan over --entries random hashes
+#   session   - a week of daily re-takes of the same fridge through /analyze's
+#               path (prepare_image + near-duplicate index), fake model calls
+#
+#   cd backend && python -m bench.near_duplicates --latency 0.5
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance
+
+FAKE_PORT = 8900
+PHOTO_SIZE = (3000, 2000)
+
+
+def fridge_photo(seed: int, moved: int = -1, brightness: float = 1.0, shift: int = 0) -> bytes:
+    # Shelves with coloured boxes and bottles; `moved` shifts one item sideways
+    rng = random.Random(seed)
+    width, height = PHOTO_SIZE
+    img = Image.new("RGB", PHOTO_SIZE, (225, 228, 232))
+    draw = ImageDraw.Draw(img)
+    for shelf in range(1, 4):
+        draw.rectangle((0, shelf * height // 4 - 20, width, shelf * height // 4), fill=(150, 150, 160))
+    for item in range(14):
+        shelf = item % 4
+        x = rng.randrange(50, width - 450) + (300 if item == moved else 0)
+        w, h = rng.randrange(150, 400), rng.randrange(200, height // 4 - 60)
+        bottom = (shelf + 1) * height // 4 - 20
+        colour = tuple(rng.randrange(20, 235) for _ in range(3))
+        draw.rectangle((x, bottom - h, x + w, bottom), fill=colour)
+    if shift:
+        img = img.crop((shift, shift, width, height)).resize(PHOTO_SIZE)
+    if brightness != 1.0:
+        img = ImageEnhance.Brightness(img).enhance(brightness)
+    noise = Image.effect_noise(PHOTO_SIZE, 12).convert("RGB")
+    img = Image.blend(img, noise, 0.06)  # sensor noise differs between shots
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def distances(prepare):
+    from services.near_duplicates import dhash, hamming
+
+    base = dhash(prepare(fridge_photo(1)))
+    variants = {
+        "same scene, new shot": fridge_photo(1),
+        "10% brighter": fridge_photo(1, brightness=1.1),
+        "20% darker": fridge_photo(1, brightness=0.8),
+        "shifted 40px": fridge_photo(1, shift=40),
+        "one item moved": fridge_photo(1, moved=3),
+    }
+    others = [fridge_photo(seed) for seed in range(2, 12)]
+    print(f"{'photo':<24}{'distance':>9}")
+    for label, photo in variants.items():
+        print(f"{label:<24}{hamming(base, dhash(prepare(photo))):>9}")
+    other = sorted(hamming(base, dhash(prepare(photo))) for photo in others)
+    print(f"{'other fridges (min)':<24}{other[0]:>9}")
+    print(f"{'other fridges (median)':<24}{statistics.median(other):>9}")
+
+
+def lookups(entries: int, max_distance: int):
+    from services.near_duplicates import BKTree, hamming
+
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(entries)]
+    tree = BKTree()
+    for i, bits in enumerate(hashes):
+        tree.add(bits, i)
+    queries = [hashes[rng.randrange(entries)] ^ (1 << rng.randrange(64)) for _ in range(200)]
+
+    for label, search in (
+        ("linear scan", lambda q: [i for i, h in enumerate(hashes) if hamming(q, h) <= max_distance]),
+        ("bk-tree", lambda q: list(tree.search(q, max_distance))),
+    ):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            samples.append(time.perf_counter() - start)
+        print(f"{label:<24}{statistics.median(samples) * 1e6:>9.0f} µs p50 over {entries} hashes, d<={max_distance}")
+
+
+async def session(latency: float, days: int):
+    from bench import fake_openai
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    from services import llm, vision
+    from services.image_prep import prepare_image
+    from services.near_duplicates import near_duplicates
+
+    runner = await fake_openai.start(FAKE_PORT, latency)
+    try:
+        for label, reuse in (("exact-bytes cache only", False), ("near-duplicate index", True)):
+            llm.usage_stats.clear()
+            # New noise per pass, so the second pass cannot hit the first one's exact-bytes cache
+            photos = [fridge_photo(1, moved=3 if day % 3 == 2 else -1, brightness=1 + 0.05 * (day % 3))
+                      for day in range(days)]
+            wall = []
+            for photo in photos:
+                start = time.perf_counter()
+                contents = await prepare_image(photo)
+                if reuse:
+                    await near_duplicates.analyze("bench-session", "fridge", contents,
+                                                  lambda: vision.analyze_fridge_image(contents))
+                else:
+                    await vision.analyze_fridge_image(contents)
+                wall.append(time.perf_counter() - start)
+            calls = sum(u.calls for u in llm.usage_stats.values())
+            print(f"{label:<24}{statistics.mean(wall) * 1000:>9.0f} ms mean, {calls} model calls for {days} photos")
+        print(f"  index stats: {near_duplicates.stats()}")
+    finally:
+        await llm.close_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    from services.image_prep import preprocess_image
+    from services.near_duplicates import NEAR_DUPLICATE_DISTANCE
+
+    distances(preprocess_image)
+    lookups(args.entries, NEAR_DUPLICATE_DISTANCE)
+    asyncio.run(session(args.latency, args.days))
@@ -0,0 +1,79 @@
+# backend/bench/price_pool.py
+# Connection count, store requests and p95 latency of price lookups: the old
+# chain (a fresh aiohttp session per ingredient, stores asked one after another
+# until one has a price) vs the shared application-lifetime session.
+#
+#   cd backend && python -m bench.price_pool --dishes 20 --ingredients 12
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import aiohttp
+
+FAKE_PORT = 8901
+
+
+def p95(samples: list) -> float:
+    return statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+
+
+async def per_lookup_session(name: str):
+    from services import prices, store_adapters
+    async with aiohttp.ClientSession(headers=prices.HEADERS, timeout=aiohttp.ClientTimeout(total=8)) as session:
+        for adapter in store_adapters.STORE_ADAPTERS.values():
+            try:
+                if await adapter.fetch_price(session, name):
+                    return
+            except Exception:
+                pass
+
+
+async def run(label: str, dishes: int, ingredients: int, lookup, stores) -> None:
+    stores.reset_counters()
+    latencies = []
+
+    async def dish(d: int):
+        start = time.perf_counter()
+        await lookup([{"name": f"{label}-item-{d}-{i}", "amount": "1"} for i in range(ingredients)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[dish(d) for d in range(dishes)])
+    wall = time.perf_counter() - start
+    connections = sum(len(c) for c in stores.connections.values())
+    requests = sum(stores.requests.values())
+    print(f"{label:<10}{connections:>13}{requests:>10}{wall:>10.2f}{statistics.median(latencies) * 1000:>10.1f}"
+          f"{p95(latencies) * 1000:>10.1f}")
+
+
+async def main(dishes: int, ingredients: int, latency: float):
+    from bench.fake_stores import FakeStores, STORES, store_env
+    os.environ.update(store_env(FAKE_PORT))
+
+    from services import prices
+
+    stores = FakeStores(latency={store: latency for store in STORES})
+    runner = await stores.start(FAKE_PORT)
+
+    async def before(items):
+        await asyncio.gather(*[per_lookup_session(item["name"]) for item in items])
+
+    try:
+        print(f"{dishes} dishes x {ingredients} ingredients, store latency {latency * 1000:.0f} ms")
+        print(f"{'mode':<10}{'connections':>13}{'requests':>10}{'wall s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        await run("before", dishes, ingredients, before, stores)
+        await run("pooled", dishes, ingredients, prices.get_cheapest_prices, stores)
+    finally:
+        await prices.close_session()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dishes", type=int, default=20)
+    parser.add_argument("--ingredients", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.dishes, args.ingredients, args.latency))
@@ -0,0 +1,66 @@
+# backend/bench/recipe_retrieval.py
+# Fridge analysis with the model writing the recipes (LOCAL_RECIPES=0) vs the
+# model listing ingredients and recipes coming from the local corpus.
+# The fake model answers with eight full recipes in the first mode and pays
+# --token-latency per output token, like a real generation.
+#
+#   cd backend && python -m bench.recipe_retrieval --repeat 10 --token-latency 0.01
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+FAKE_PORT = 8900
+
+
+async def main(repeat: int, latency: float, token_latency: float):
+    from bench import fake_openai
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from services import llm, vision
+    from services.recipe_index import get_index, suggest_recipes
+
+    fridge = fake_openai.CANNED_ANSWERS["FridgeInventory"]["ingredients"]
+    names = [ing["name"] for ing in fridge]
+    # What the model used to write: eight complete recipes for this fridge
+    generated = [{k: r[k] for k in ("name", "ingredients_used", "instructions")} for r in suggest_recipes(names)]
+    answers = dict(fake_openai.CANNED_ANSWERS)
+    answers["FridgeAnalysis"] = {**answers["FridgeAnalysis"], "ingredients": fridge, "recipes": generated}
+
+    samples = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        suggest_recipes(names)
+        samples.append(time.perf_counter() - start)
+    print(f"corpus: {len(get_index().recipes)} recipes, {len(get_index().vocab)} ingredients; "
+          f"suggest p50 {statistics.median(samples) * 1e6:.0f} µs")
+
+    runner = await fake_openai.start(FAKE_PORT, latency, answers, token_latency=token_latency)
+    print(f"{'mode':<22}{'p50 ms':>9}{'prompt tok':>12}{'compl tok':>11}{'recipes':>9}")
+    try:
+        for label, local in (("model writes recipes", False), ("local corpus", True)):
+            vision.LOCAL_RECIPES = local
+            llm.usage_stats.clear()
+            wall, result = [], None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = await vision._analyze_fridge_image(b"photo")  # uncached
+                wall.append(time.perf_counter() - start)
+            usage = llm.get_llm_stats()["usage_by_mode"]["fridge"]
+            print(f"{label:<22}{statistics.median(wall) * 1000:>9.0f}{usage['avg_prompt_tokens']:>12}"
+                  f"{usage['avg_completion_tokens']:>11}{len(result['recipes']):>9}")
+    finally:
+        await llm.close_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake seconds per output token")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat, args.latency, args.token_latency))
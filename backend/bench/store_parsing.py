@@ -0,0 +1,67 @@
+# backend/bench/store_parsing.py
+# Parsing micro-benchmark per store adapter on the fixture pages in bench/fixtures:
+# old approach (decode the whole page, regex over the str) vs the adapter's
+# streaming extraction that stops at the first price.
+#
+#   cd backend && python -m bench.store_parsing --repeat 2000
+import argparse
+import os
+import re
+import time
+
+from services.store_adapters import CHUNK_SIZE, STORE_ADAPTERS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+OLD_PATTERNS = {
+    "Tesco": r'"priceValue":\s*(\d+\.?\d*)',
+    "Lidl": r'"price":\s*(\d+\.?\d*)',
+    "Kaufland": r'"price":\s*(\d+\.?\d*)',
+}
+
+
+def load_fixture(store: str) -> bytes:
+    for ext in ("html", "json"):
+        path = os.path.join(FIXTURES, f"{store.lower()}_search.{ext}")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+    raise FileNotFoundError(store)
+
+
+def chunked(body: bytes, counter: list):
+    for i in range(0, len(body), CHUNK_SIZE):
+        chunk = body[i:i + CHUNK_SIZE]
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(repeat: int):
+    print(f"{'store':<10}{'page KB':>9}{'read KB':>9}{'old µs':>10}{'stream µs':>11}{'price':>8}")
+    for name, adapter in STORE_ADAPTERS.items():
+        body = load_fixture(name)
+        read = [0]
+        price = adapter.extract_price_sync(chunked(body, read))
+
+        stream_us = timed(lambda: adapter.extract_price_sync(chunked(body, [0])), repeat)
+        if name in OLD_PATTERNS:
+            pattern = OLD_PATTERNS[name]
+            old_us = timed(lambda: re.search(pattern, body.decode("utf-8")), repeat)
+        else:
+            old_us = stream_us  # Billa is a small JSON API – parsed whole either way
+
+        print(f"{name:<10}{len(body) / 1024:>9.1f}{read[0] / 1024:>9.1f}{old_us:>10.1f}{stream_us:>11.1f}"
+              f"{price if price is not None else '—':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.repeat)
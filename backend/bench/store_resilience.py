@@ -0,0 +1,87 @@
+# backend/bench/store_resilience.py
+# Dish price lookups when one store misbehaves, with the fixed per-store
+# timeout only vs circuit breakers + adaptive timeouts, and with hedging:
+#   hanging - Lidl never answers in time (down or silently blocking us)
+#   tail    - Lidl answers fast, except 10% of requests that take 2 s
+#
+#   cd backend && python -m bench.store_resilience --dishes 30 --ingredients 8
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+FAKE_PORT = 8901
+SCENARIOS = {
+    "hanging": {"latency": {"lidl": 30.0}},
+    "tail": {"slow_rate": {"lidl": 0.1}},
+}
+MODES = {
+    "fixed": {"PRICE_CIRCUIT_BREAKER": False, "PRICE_ADAPTIVE_TIMEOUT": False, "PRICE_HEDGE": False},
+    "breaker+adaptive": {"PRICE_CIRCUIT_BREAKER": True, "PRICE_ADAPTIVE_TIMEOUT": True, "PRICE_HEDGE": False},
+    "+hedging": {"PRICE_CIRCUIT_BREAKER": True, "PRICE_ADAPTIVE_TIMEOUT": True, "PRICE_HEDGE": True},
+}
+
+
+def reset_store_state(prices):
+    for store in prices.STORE_ADAPTERS:
+        prices.store_stats[store] = prices.StoreStats()
+        prices.store_breakers[store] = prices.CircuitBreaker(
+            prices.BREAKER_FAILURES, prices.BREAKER_COOLDOWN, prices.BREAKER_MAX_COOLDOWN, prices.STORE_TIMEOUT
+        )
+        prices.store_latency[store] = prices.LatencyTracker(prices.STORE_TIMEOUT, floor=prices.STORE_TIMEOUT_MIN)
+
+
+async def run(prices, label: str, dishes: int, ingredients: int, stores) -> None:
+    reset_store_state(prices)
+    stores.reset_counters()
+    latencies = []
+    start = time.perf_counter()
+    # Dishes one after another, each pricing its ingredients in parallel like /analyze-dish/
+    for d in range(dishes):
+        items = [{"name": f"{label}-{d}-{i}", "amount": "1"} for i in range(ingredients)]
+        t = time.perf_counter()
+        await prices.get_cheapest_prices(items)
+        latencies.append(time.perf_counter() - t)
+    wall = time.perf_counter() - start
+
+    lidl = prices.store_stats["Lidl"]
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"{label:<28}{wall:>8.1f}{statistics.median(latencies) * 1000:>9.0f}{p95 * 1000:>9.0f}"
+          f"{stores.requests['lidl']:>11}{lidl.timeouts:>10}{lidl.skipped:>9}"
+          f"{sum(s.hedges for s in prices.store_stats.values()):>8}")
+
+
+async def main(dishes: int, ingredients: int):
+    from bench.fake_stores import FakeStores, store_env
+    os.environ.update(store_env(FAKE_PORT))
+
+    import logging
+    logging.disable(logging.WARNING)  # one line per timeout would drown the table
+    from services import prices
+
+    print(f"{dishes} dishes x {ingredients} ingredients, store timeout {prices.STORE_TIMEOUT:.0f}s")
+    print(f"{'scenario / mode':<28}{'wall s':>8}{'p50 ms':>9}{'p95 ms':>9}{'lidl reqs':>11}"
+          f"{'timeouts':>10}{'skipped':>9}{'hedges':>8}")
+    try:
+        for scenario, config in SCENARIOS.items():
+            stores = FakeStores(**config)
+            runner = await stores.start(FAKE_PORT)
+            try:
+                for mode, flags in MODES.items():
+                    for name, value in flags.items():
+                        setattr(prices, name, value)
+                    await run(prices, f"{scenario} / {mode}", dishes, ingredients, stores)
+            finally:
+                await prices.close_session()  # connections still waiting on the hanging store
+                await runner.cleanup()
+    finally:
+        await prices.close_session()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dishes", type=int, default=30)
+    parser.add_argument("--ingredients", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.dishes, args.ingredients))
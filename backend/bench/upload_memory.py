@@ -0,0 +1,162 @@
+# backend/bench/upload_memory.py
+# Backend memory while many large photos are being uploaded and analysed at
+# once: the streaming upload path (spooled upload, image decoded from the
+# file, base64 encoded while the model request is sent) vs the previous one
+# (UploadFile.read() into bytes, base64 string built before the SDK call).
+#
+#   cd backend && python -m bench.upload_memory --concurrency 50 --size-mb 10
+#
+# Each variant runs as its own uvicorn process; its VmRSS is sampled while the
+# uploads are in flight and VmHWM (peak RSS) is read at the end.
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+FAKE_OPENAI_PORT = 8900
+BACKEND_PORT = 8910
+VARIANTS = {
+    "streaming": ("main:app", {}),
+    "read+b64": ("bench.upload_memory:legacy_app", {"OPENAI_STREAM_BODY": "0"}),
+}
+
+
+def legacy_app():
+    """The upload handling before streaming uploads, as a uvicorn factory."""
+    from fastapi import FastAPI, File, UploadFile
+    from services.image_prep import prepare_image
+    from services.llm import close_client
+    from services.vision import analyze_fridge_image
+
+    app = FastAPI(on_shutdown=[close_client])
+
+    @app.post("/analyze")
+    async def analyze(file: UploadFile = File(...)):
+        raw = await file.read()
+        return await analyze_fridge_image(await prepare_image(raw))
+
+    return app
+
+
+def make_uploads(count: int, size_mb: float, directory: str) -> List[str]:
+    """Distinct noisy JPEGs of about `size_mb` each (noise barely compresses)."""
+    from PIL import Image
+    side = int((size_mb * 2 ** 20 / 1.1) ** 0.5)  # q95 noise: ~1.1 bytes per pixel
+    noise = Image.merge("RGB", [Image.effect_noise((side, side), 90).convert("L") for _ in range(3)])
+    paths = []
+    for i in range(count):
+        img = noise.rotate(i * 90 % 360) if i % 4 else noise
+        img.paste((i % 256, (i * 37) % 256, (i * 101) % 256), (0, 0, 64, 64 + i))
+        path = os.path.join(directory, f"{i}.jpg")
+        img.save(path, format="JPEG", quality=95)
+        paths.append(path)
+    return paths
+
+
+def serve_fake_openai(latency: float):
+    from bench import fake_openai
+
+    async def serve():
+        await fake_openai.start(FAKE_OPENAI_PORT, latency)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def proc_status(pid: int) -> Dict[str, float]:
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(rest.split()[0]) / 1024  # kB -> MB
+    return values
+
+
+async def wait_until_up(client, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get("/openapi.json")
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise RuntimeError("backend did not start")
+            await asyncio.sleep(0.1)
+
+
+async def run_variant(name: str, uploads: List[str]) -> None:
+    import httpx
+    target, extra_env = VARIANTS[name]
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{FAKE_OPENAI_PORT}/v1",
+        "OPENAI_API_KEY": "bench",
+        "MAX_UPLOAD_MB": "64",
+        **extra_env,
+    }
+    factory = ["--factory"] if target.startswith("bench.") else []
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, *factory, "--port", str(BACKEND_PORT), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{BACKEND_PORT}", timeout=300) as client:
+            await wait_until_up(client)
+            idle = proc_status(server.pid)["VmRSS"]
+            samples = []
+
+            async def sample():
+                while True:
+                    samples.append(proc_status(server.pid)["VmRSS"])
+                    await asyncio.sleep(0.05)
+
+            async def upload(path: str) -> int:
+                with open(path, "rb") as f:  # httpx streams the file, the client holds no copies
+                    r = await client.post("/analyze", files={"file": ("photo.jpg", f, "image/jpeg")})
+                return r.status_code
+
+            sampler = asyncio.create_task(sample())
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*[upload(p) for p in uploads])
+            wall = time.perf_counter() - start
+            sampler.cancel()
+            peak = proc_status(server.pid)["VmHWM"]
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = sum(status == 200 for status in statuses)
+    print(f"{name:<12}{ok:>4}/{len(statuses):<4}{wall:>8.1f}{idle:>10.0f}{max(samples):>12.0f}{peak:>10.0f}"
+          f"{peak - idle:>12.0f}")
+
+
+async def main(concurrency: int, size_mb: float, latency: float, variants: List[str]):
+    fakes = multiprocessing.get_context("spawn").Process(target=serve_fake_openai, args=(latency,), daemon=True)
+    fakes.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            uploads = make_uploads(concurrency, size_mb, tmp)
+            avg = sum(os.path.getsize(p) for p in uploads) / len(uploads) / 2 ** 20
+            print(f"{concurrency} concurrent uploads of {avg:.1f} MB, fake model latency {latency:.1f}s")
+            print(f"{'variant':<12}{'ok':>9}{'wall s':>8}{'idle MB':>10}{'sampled MB':>12}"
+                  f"{'peak MB':>10}{'peak-idle':>12}")
+            for name in variants:
+                await run_variant(name, uploads)
+    finally:
+        fakes.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake model latency, keeps requests overlapping")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.size_mb, args.latency, args.variants))
@@ -1,8 +1,22 @@
 # backend/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from routes.analyze import router as fridge_router
 from routes.dish import router as dish_router  # Fixed import
+from routes.prices import router as prices_router
+from routes.nutrition import router as nutrition_router
+from routes.jobs import router as jobs_router
+from routes.session import router as session_router
+from services.cache import analysis_cache
+from services.cascade import get_cascade_stats
+from services.catalog import start_crawler, stop_crawler
+from services.jobs import job_queue
+from services.llm import close_client, get_llm_stats
+from services.near_duplicates import near_duplicates
+from services.metrics import MetricsMiddleware, render as render_metrics
+from services.prices import get_session, close_session
+from services.sessions import SESSION_HEADER
 
 app = FastAPI(title="FridgeNutri AI + DishToShop", version="1.0")
 
@@ -12,11 +26,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[SESSION_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(fridge_router)
 app.include_router(dish_router)  # Now works with full path in dish.py
+app.include_router(prices_router)
+app.include_router(nutrition_router)
+app.include_router(jobs_router)
+app.include_router(session_router)
+
+
+@app.on_event("startup")
+async def startup():
+    # Open the shared price-scraper connection pool inside the running loop
+    get_session()
+    job_queue.start()
+    start_crawler()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await stop_crawler()
+    await close_client()
+    await close_session()
+
 
 @app.get("/")
 def home():
-    return {"message": "Backend running! Endpoints: /analyze, /analyze-dish"}
\ No newline at end of file
+    return {"message": "Backend running! Endpoints: /analyze, /analyze/batch, /analyze/combined, /analyze-dish, /prices/batch, /nutrition/gaps, /jobs/{id}"}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {**analysis_cache.stats(), "near_duplicates": near_duplicates.stats()}
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    return {**get_llm_stats(), "cascade": get_cascade_stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,29 +1,100 @@
-from fastapi import APIRouter, File, UploadFile
+import asyncio
+from typing import List, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from routes.jobs import JOB_MODE, accept_job
+from services.combined import OUTPUTS, analyze_combined, parse_outputs
 from services.vision import analyze_fridge_image, analyze_dish_image
-from services.recipes import calculate_gaps
 from services.alternative import suggest_healthier_alternatives
+from services.fridge_batch import analyze_fridge_batch
+from services.image_prep import prepare_image
+from services.near_duplicates import near_duplicate_analysis
+from services.sessions import session_id, session_store
+from services.uploads import BATCH_UPLOAD_OPENAPI, UPLOAD_OPENAPI, Upload, image_upload, image_uploads
 
 router = APIRouter()
 
-# Store last analysis in memory (for demo)
-last_analysis = None
-last_dish = None
-@router.post("/analyze")
-async def analyze_fridge(file: UploadFile = File(...)):
-    global last_analysis
-    contents = await file.read()
-    last_analysis = await analyze_fridge_image(contents)
-    return last_analysis
-
-@router.post("/analyze/dish")
-async def analyze_dish(file: UploadFile = File(...)):
-    global last_dish
-    contents = await file.read()
-    last_dish = await analyze_dish_image(contents)
-    return last_dish
-
-@router.post("/api/alternative")
-async def alternative_suggestion(file: UploadFile = File(...)):
-    image_bytes = await file.read()
-    result = await suggest_healthier_alternatives(image_bytes)
-    return result
\ No newline at end of file
+FRESH = Query(False, description="Analyse even if a near-identical photo was analysed recently in this session")
+
+
+async def _remember(sid: str, name: str, result: dict) -> dict:
+    # Keep the last good result per session for the /session follow-ups
+    if isinstance(result, dict) and "error" not in result:
+        await session_store.set(sid, name, result)
+    return result
+
+
+# The helpers take the prepared image: the upload's temp file is gone once the
+# response is sent, which is before a job runs.
+async def _fridge(contents: bytes, sid: str, fresh: bool = False) -> dict:
+    result = await near_duplicate_analysis(sid, "fridge", contents, lambda: analyze_fridge_image(contents), fresh)
+    return await _remember(sid, "fridge", result)
+
+
+async def _dish(contents: bytes, sid: str, fresh: bool = False) -> dict:
+    result = await near_duplicate_analysis(sid, "fridge-dish", contents, lambda: analyze_dish_image(contents), fresh)
+    return await _remember(sid, "dish", result)
+
+
+async def _alternative(image_bytes: bytes, sid: str) -> dict:
+    return await _remember(sid, "alternative", await suggest_healthier_alternatives(image_bytes))
+
+
+async def _fridge_batch(images: List[bytes], sid: str) -> dict:
+    return await _remember(sid, "fridge", await analyze_fridge_batch(images))
+
+
+async def _combined(contents: bytes, outputs: Tuple[str, ...], sid: str) -> dict:
+    result = await analyze_combined(contents, outputs)
+    for name in ("fridge", "dish", "alternative"):
+        if name in result:
+            await _remember(sid, name, result[name])
+    return result
+
+
+@router.post("/analyze", openapi_extra=UPLOAD_OPENAPI)
+async def analyze_fridge(response: Response, upload: Upload = Depends(image_upload), job: bool = JOB_MODE,
+                         fresh: bool = FRESH, sid: str = Depends(session_id)):
+    contents = await prepare_image(upload)
+    if job:
+        return await accept_job("fridge", lambda: _fridge(contents, sid, fresh), response)
+    return await _fridge(contents, sid, fresh)
+
+@router.post("/analyze/batch", openapi_extra=BATCH_UPLOAD_OPENAPI)
+async def analyze_fridge_batch_route(response: Response, uploads: List[Upload] = Depends(image_uploads),
+                                     job: bool = JOB_MODE, sid: str = Depends(session_id)):
+    # Several photos of one fridge (shelves, door, freezer) -> one inventory and one set of recipes
+    images = list(await asyncio.gather(*(prepare_image(upload) for upload in uploads)))
+    if job:
+        return await accept_job("fridge-batch", lambda: _fridge_batch(images, sid), response)
+    return await _fridge_batch(images, sid)
+
+@router.post("/analyze/dish", openapi_extra=UPLOAD_OPENAPI)
+async def analyze_dish(response: Response, upload: Upload = Depends(image_upload), job: bool = JOB_MODE,
+                       fresh: bool = FRESH, sid: str = Depends(session_id)):
+    contents = await prepare_image(upload)
+    if job:
+        return await accept_job("dish", lambda: _dish(contents, sid, fresh), response)
+    return await _dish(contents, sid, fresh)
+
+@router.post("/api/alternative", openapi_extra=UPLOAD_OPENAPI)
+async def alternative_suggestion(response: Response, upload: Upload = Depends(image_upload), job: bool = JOB_MODE,
+                                 sid: str = Depends(session_id)):
+    contents = await prepare_image(upload)
+    if job:
+        return await accept_job("alternative", lambda: _alternative(contents, sid), response)
+    return await _alternative(contents, sid)
+
+@router.post("/analyze/combined", openapi_extra=UPLOAD_OPENAPI)
+async def analyze_combined_route(response: Response, upload: Upload = Depends(image_upload),
+                                 outputs: str = Query("inventory,recipes", description=f"Comma-separated: {', '.join(OUTPUTS)}"),
+                                 job: bool = JOB_MODE, sid: str = Depends(session_id)):
+    # Several analyses of one photo in a single model call
+    try:
+        selected = parse_outputs(outputs.split(","))
+    except ValueError as e:
+        raise HTTPException(422, detail=str(e))
+    contents = await prepare_image(upload)
+    if job:
+        return await accept_job("combined", lambda: _combined(contents, selected, sid), response)
+    return await _combined(contents, selected, sid)
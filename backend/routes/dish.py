@@ -1,22 +1,119 @@
 # backend/routes/dish.py
-from fastapi import APIRouter, File, UploadFile
-from services.dish_vision import analyze_dish_image
-from services.prices import get_cheapest_prices
+import asyncio
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
+from routes.sse import SSE_HEADERS, sse
+from routes.analyze import FRESH
+from routes.jobs import JOB_MODE, accept_job
+from services.dish_vision import analyze_dish_image, stream_dish_image
+from services.image_prep import prepare_image
+from services.near_duplicates import near_duplicate_analysis
+from services.prices import fetch_price, get_cheapest_prices
+from services.sessions import session_id, session_store, set_session
+from services.shopping_list import generate_shopping_list, normalize_name
+from services.uploads import UPLOAD_OPENAPI, Upload, image_upload
 
 router = APIRouter(prefix="/analyze-dish", tags=["Dish to Shopping List"])
 
-@router.post("/")
-async def analyze_dish(file: UploadFile = File(...)):
-    image_bytes = await file.read()
-    analysis = await analyze_dish_image(image_bytes)
+NO_INGREDIENTS = {"items": [], "estimated_total": 0, "currency": "€", "note": "No ingredients"}
+
+
+async def _dish_with_prices(image_bytes: bytes, sid: str, fresh: bool = False) -> dict:
+    # A repeat photo reuses the analysis; prices are always looked up again
+    analysis = await near_duplicate_analysis(sid, "dish", image_bytes, lambda: analyze_dish_image(image_bytes), fresh)
 
     ingredients = analysis.get("ingredients", [])
     if not ingredients:
-        analysis["shopping_list"] = {
-            "items": [], "estimated_total": 0, "currency": "€", "note": "No ingredients"
-        }
+        analysis["shopping_list"] = dict(NO_INGREDIENTS)
         return analysis
 
     shopping_data = await get_cheapest_prices(ingredients)
     analysis["shopping_list"] = shopping_data
-    return analysis
\ No newline at end of file
+    await session_store.set(sid, "dish", analysis)
+    return analysis
+
+
+@router.post("/", openapi_extra=UPLOAD_OPENAPI)
+async def analyze_dish(response: Response, upload: Upload = Depends(image_upload), job: bool = JOB_MODE,
+                       fresh: bool = FRESH, sid: str = Depends(session_id)):
+    image_bytes = await prepare_image(upload)
+    if job:
+        return await accept_job("dish-shopping", lambda: _dish_with_prices(image_bytes, sid, fresh), response)
+    return await _dish_with_prices(image_bytes, sid, fresh)
+
+
+@router.post("/stream", openapi_extra=UPLOAD_OPENAPI)
+async def analyze_dish_stream(upload: Upload = Depends(image_upload), sid: str = Depends(session_id)):
+    """Server-Sent Events version of POST /analyze-dish/.
+
+    Events in order: `dish` (as soon as the model names it), `ingredients`,
+    one `item` per priced shopping item as its store lookup finishes, then
+    `done` with the same body the non-streaming endpoint returns.
+    `error` replaces everything after the failure point.
+    """
+    image_bytes = await prepare_image(upload)
+
+    async def events():
+        price_tasks = {}
+        analysis = None
+
+        def start_lookup(ingredient: dict):
+            name = normalize_name(ingredient["name"])
+            if name not in price_tasks:
+                price_tasks[name] = asyncio.create_task(fetch_price(name))
+
+        try:
+            try:
+                async for kind, value in stream_dish_image(image_bytes):
+                    if kind == "dish":
+                        yield sse("dish", {"recognized_dish": value})
+                    elif kind == "ingredient":
+                        # Start the store lookup while the model is still writing the rest
+                        start_lookup(value)
+                    elif kind == "result":
+                        analysis = value
+            except Exception as e:
+                analysis = {"error": "Unexpected error in dish analysis", "details": str(e)}
+
+            if analysis is None or "error" in analysis:
+                yield sse("error", analysis)
+                return
+
+            ingredients = analysis.get("ingredients", [])
+            yield sse("ingredients", ingredients)
+            if not ingredients:
+                analysis["shopping_list"] = dict(NO_INGREDIENTS)
+                yield sse("done", analysis)
+                return
+
+            for ingredient in ingredients:
+                start_lookup(ingredient)
+            names = {task: name for name, task in price_tasks.items()}
+            pending = set(price_tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    price_info = task.result()
+                    for ingredient in ingredients:
+                        if normalize_name(ingredient["name"]) == names[task]:
+                            yield sse("item", {
+                                "item": ingredient["name"],
+                                "amount": ingredient.get("amount", ""),
+                                "price": price_info.get("price", "—"),
+                                "store": price_info.get("store", "—"),
+                            })
+
+            prices = {name: task.result() for name, task in price_tasks.items()}
+            analysis["shopping_list"] = generate_shopping_list(ingredients, prices)
+            await session_store.set(sid, "dish", analysis)
+            yield sse("done", analysis)
+        finally:
+            # Client gone or analysis failed: no one will read the remaining lookups
+            for task in price_tasks.values():
+                if not task.done():
+                    task.cancel()
+
+    stream = StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+    # Returned directly, so the session header and cookie set by the dependency must be repeated
+    set_session(stream, sid)
+    return stream
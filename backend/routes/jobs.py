@@ -0,0 +1,92 @@
+# backend/routes/jobs.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from routes.sse import SSE_HEADERS, sse
+from services.jobs import FINAL_STATES, QueueFull, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+MAX_WAIT = 30.0          # seconds a long-poll may hang, below common proxy timeouts
+EVENTS_HEARTBEAT = 15.0  # seconds between SSE keep-alive comments
+
+# ?job=true on the vision routes: enqueue the analysis and answer 202 with a job id
+JOB_MODE = Query(False, description="Run in the background and return a job id")
+
+
+async def accept_job(kind: str, compute: Callable[[], Awaitable[Any]], response: Response) -> Dict:
+    """Enqueue `compute` and answer 202 with where to find the result, or 429 when full."""
+    try:
+        job = await job_queue.submit(kind, compute)
+    except QueueFull as e:
+        raise HTTPException(429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    response.status_code = 202
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+@router.get("/stats")
+def job_stats():
+    return job_queue.stats()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, description="Long-poll: seconds to wait for the job to finish")):
+    job = job_queue.get_local(job_id)
+    if job is not None and wait:
+        deadline = time.monotonic() + min(wait, MAX_WAIT)
+        while job.status not in FINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await job.wait_for_change(remaining):
+                break
+
+    record = await job_queue.get(job_id)
+    if record is None:
+        raise HTTPException(404, detail="Job not found or expired")
+    return record
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """SSE: `status` on every state change, then `done` (result) or `error`."""
+    job = job_queue.get_local(job_id)
+    if job is None:
+        # Known only from the shared job DB: report its current state once
+        record = await job_queue.get(job_id)
+        if record is None:
+            raise HTTPException(404, detail="Job not found or expired")
+
+        async def snapshot():
+            yield sse("status", {"id": job_id, "status": record["status"]})
+            if record["status"] == "done":
+                yield sse("done", record["result"])
+            elif record["status"] == "error":
+                yield sse("error", {"error": record["error"]})
+        return StreamingResponse(snapshot(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    async def events():
+        status = None
+        while True:
+            if job.status != status:
+                status = job.status
+                yield sse("status", {"id": job.id, "status": status})
+            if status == "done":
+                yield sse("done", job.result)
+                return
+            if status == "error":
+                yield sse("error", {"error": job.error})
+                return
+            if not await job.wait_for_change(EVENTS_HEARTBEAT):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
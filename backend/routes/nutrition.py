@@ -0,0 +1,25 @@
+# backend/routes/nutrition.py
+from typing import Dict, List
+
+from fastapi import APIRouter
+from schemas import GapAnalysisRequest, NutrientRecipe
+from services.nutrition import fill_recipe_nutrition
+from services.recipes import rank_recipes
+
+router = APIRouter(prefix="/nutrition", tags=["Nutrition"])
+
+
+def _with_nutrition(recipes: List[NutrientRecipe]) -> List[Dict]:
+    items = [recipe.model_dump() for recipe in recipes]
+    # Recipes sent without nutrition (e.g. typed in by the user) get it from the local table
+    fill_recipe_nutrition([r for r in items if r["ingredients_used"] and not (r["macros"] or r["micronutrients"])])
+    return items
+
+
+@router.post("/gaps")
+def nutrient_gaps(request: GapAnalysisRequest):
+    eaten_days = [
+        _with_nutrition(day.meals) + ([day.totals] if day.totals else [])
+        for day in request.days
+    ]
+    return rank_recipes(_with_nutrition(request.recipes), eaten_days, request.top_k)
@@ -0,0 +1,17 @@
+# backend/routes/prices.py
+from fastapi import APIRouter
+from schemas import BatchPriceRequest
+from services.prices import get_batch_prices, get_store_stats
+
+router = APIRouter(prefix="/prices", tags=["Prices"])
+
+
+@router.post("/batch")
+async def batch_prices(request: BatchPriceRequest):
+    dishes = [dish.model_dump() for dish in request.dishes]
+    return await get_batch_prices(dishes)
+
+
+@router.get("/stats")
+def price_stats():
+    return get_store_stats()
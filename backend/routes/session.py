@@ -0,0 +1,56 @@
+# backend/routes/session.py
+# Follow-ups on the results stored for the caller's session (see services/sessions.py),
+# so none of them needs another model call.
+from fastapi import APIRouter, Depends, HTTPException, Query
+from services.prices import get_cheapest_prices
+from services.recipes import calculate_gaps, rank_recipes
+from services.sessions import session_id, session_store
+
+router = APIRouter(prefix="/session", tags=["Session"])
+
+SOURCES = {
+    "fridge": "POST /analyze",
+    "dish": "POST /analyze/dish or /analyze-dish/",
+    "alternative": "POST /api/alternative",
+}
+
+
+async def _stored(sid: str, name: str) -> dict:
+    result = await session_store.get(sid, name)
+    if result is None:
+        raise HTTPException(404, detail=f"No {name} analysis in this session – call {SOURCES[name]} first")
+    return result
+
+
+@router.get("/fridge")
+async def last_fridge(sid: str = Depends(session_id)):
+    return await _stored(sid, "fridge")
+
+
+@router.get("/dish")
+async def last_dish(sid: str = Depends(session_id)):
+    return await _stored(sid, "dish")
+
+
+@router.get("/alternative")
+async def last_alternative(sid: str = Depends(session_id)):
+    return await _stored(sid, "alternative")
+
+
+@router.get("/gaps")
+async def session_gaps(recipe: str = Query(None, description="Recipe name; omit to rank all recipes"),
+                       top_k: int = Query(5, ge=1, le=100), sid: str = Depends(session_id)):
+    analysis = await _stored(sid, "fridge")
+    if recipe:
+        result = calculate_gaps(recipe, analysis)
+        if "error" in result:
+            raise HTTPException(404, detail=result["error"])
+        return result
+    return rank_recipes(analysis.get("recipes", []), top_k=top_k)
+
+
+@router.get("/shopping-list")
+async def session_shopping_list(sid: str = Depends(session_id)):
+    # Real store prices for the last dish, whichever dish endpoint produced it
+    analysis = await _stored(sid, "dish")
+    return await get_cheapest_prices(analysis.get("ingredients", []))
@@ -0,0 +1,10 @@
+# backend/routes/sse.py
+# Server-Sent Events framing shared by the streaming routes.
+import json
+
+# No caching, and no response buffering by nginx-style proxies
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
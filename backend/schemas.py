@@ -0,0 +1,129 @@
+# backend/schemas.py
+from typing import Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class Ingredient(BaseModel):
+    # A blank name would be sent to every store adapter as an empty search
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    name: str = Field(min_length=1)
+    amount: str = ""
+
+
+class DishIngredients(BaseModel):
+    name: Optional[str] = None
+    ingredients: List[Ingredient]
+
+
+class BatchPriceRequest(BaseModel):
+    dishes: List[DishIngredients] = Field(..., min_length=1, max_length=100)
+
+
+# ---- Model output schemas -------------------------------------------------
+# Sent to the API as strict JSON-schema response formats, so every field is
+# required and no extra keys are allowed.
+
+class StrictModel(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class DetectedIngredient(StrictModel):
+    name: str
+    amount: str
+
+
+class Recipe(StrictModel):
+    name: str
+    ingredients_used: List[str]
+    instructions: str
+    # macros / micronutrients are added locally by services.nutrition
+
+
+class FridgeAnalysis(StrictModel):
+    ingredients: List[DetectedIngredient]
+    recipes: List[Recipe]
+    shopping_suggestions: List[str]
+
+
+class FridgeInventory(StrictModel):
+    # Recipes come from the local corpus (services.recipe_index)
+    ingredients: List[DetectedIngredient]
+    shopping_suggestions: List[str]
+
+
+class RecipeSuggestions(StrictModel):
+    recipes: List[Recipe]
+
+
+class DishAnalysis(StrictModel):
+    recognized_dish: str
+    certainty_percent: int
+    serves: int
+    prep_time_min: int
+    instructions: str
+    ingredients: List[DetectedIngredient]
+
+
+class ShoppingItem(StrictModel):
+    item: str
+    amount: str
+    price: float
+    store: str
+
+
+class ShoppingList(StrictModel):
+    items: List[ShoppingItem]
+    estimated_total: float
+    currency: str
+
+
+class DishShoppingAnalysis(StrictModel):
+    recognized_dish: str
+    serves: int
+    prep_time_min: int
+    instructions: str
+    ingredients: List[DetectedIngredient]
+    shopping_list: ShoppingList
+
+
+class Alternative(StrictModel):
+    name: str
+    why_better_or_similar: str
+    price_per_100ml_eur: float
+    best_for: str
+
+
+class AlternativesAnalysis(StrictModel):
+    detected_product: str
+    category: str
+    assessment: Literal["great", "good", "moderate", "suboptimal"]
+    message: str
+    why: str
+    alternatives: List[Alternative]
+
+
+# ---- Gap analysis -----------------------------------------------------------
+
+NutrientValues = Dict[str, Union[float, str]]
+
+
+class NutrientRecipe(BaseModel):
+    name: Optional[str] = None
+    # Used to compute macros/micronutrients locally when they are not given
+    ingredients_used: List[str] = []
+    macros: NutrientValues = {}
+    micronutrients: NutrientValues = {}
+
+
+class EatenDay(BaseModel):
+    # Either the day's totals (as kept by the app per day) or its meals, or both
+    totals: NutrientValues = {}
+    meals: List[NutrientRecipe] = []
+
+
+class GapAnalysisRequest(BaseModel):
+    recipes: List[NutrientRecipe] = Field(..., min_length=1, max_length=20000)
+    days: List[EatenDay] = Field([], max_length=31)
+    top_k: int = Field(5, ge=1, le=100)
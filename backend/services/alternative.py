@@ -1,14 +1,15 @@
 # services/alternative.py
+from typing import Optional
 
-import base64
-import json
-import re
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from schemas import AlternativesAnalysis
+from services.cache import cached_analysis
+from services.cascade import CACHE_MODEL, run_cascade
+from services.image_prep import IMAGE_DETAIL, image_part
+from services.ingredients import fold
+from services.llm import chat_completion, parse_content, response_format, VISION_MODEL
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Bump when the prompt changes so cached results from the old prompt are ignored
+PROMPT_VERSION = "alternative-v2"
 
 ALREADY_GREAT = {
     "extra virgin olive oil", "olive oil extra virgin", "evoo",
@@ -23,13 +24,45 @@ ALREADY_GREAT = {
     "dark chocolate 85%", "cacao", "cocoa 85%", "cocoa 90%"
 }
 
+_ALREADY_GREAT_FOLDED = {fold(name) for name in ALREADY_GREAT}
+MIN_ALTERNATIVES = 3
+
+
+def is_already_great(product: str) -> bool:
+    padded = f" {fold(product)} "
+    return any(f" {name} " in padded for name in _ALREADY_GREAT_FOLDED)
+
+
+def _doubt(result: dict) -> Optional[str]:
+    # Why a cheap-model answer should go to the full model, or None to keep it
+    if "error" in result:
+        return "invalid"
+    if is_already_great(result["detected_product"]) and result["assessment"] != "great":
+        return "inconsistent"  # a product we know is great, rated otherwise
+    if len(result["alternatives"]) < MIN_ALTERNATIVES:
+        return "incomplete"
+    return None
+
+
 async def suggest_healthier_alternatives(image_bytes: bytes) -> dict:
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    return await cached_analysis(
+        image_bytes, CACHE_MODEL, PROMPT_VERSION,
+        lambda: run_cascade(
+            "alternative",
+            lambda model, detail, mode: _suggest_healthier_alternatives(image_bytes, model, detail, mode),
+            _doubt,
+        ),
+    )
+
 
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-08-06",
+async def _suggest_healthier_alternatives(image_bytes: bytes, model: str = VISION_MODEL,
+                                          detail: str = IMAGE_DETAIL, mode: str = "alternative") -> dict:
+    response = await chat_completion(
+        mode=mode,
+        model=model,
         temperature=0.2,
         max_tokens=1500,
+        response_format=response_format(AlternativesAnalysis),
         messages=[
             {
                 "role": "system",
@@ -69,32 +102,17 @@ Rules:
 - Prices = realistic European averages 2025
 - Only valid JSON — nothing else!
 """},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-                    }
+                    image_part(image_bytes, detail)
                 ]
             }
         ]
     )
 
-    raw = response.choices[0].message.content.strip()
-    cleaned = re.sub(r"^```json\s*|```$", "", raw, flags=re.MULTILINE).strip()
-
+    content = response.choices[0].message.content
     try:
-        result = json.loads(cleaned)
-
-        result.setdefault("assessment", "moderate")
-        result.setdefault("message", "Product analyzed.")
-        result.setdefault("why", "")
-        result.setdefault("alternatives", [])
-        result.setdefault("detected_product", "Unknown product")
-        result.setdefault("category", "unknown")
-
-        return result
-
-    except json.JSONDecodeError:
+        return parse_content(content, AlternativesAnalysis)
+    except ValueError:
         return {
             "error": "Failed to parse model response",
-            "raw": cleaned
+            "raw": content
         }
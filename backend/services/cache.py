@@ -0,0 +1,270 @@
+# backend/services/cache.py
+# Content-addressed cache for vision results.
+# Key = sha256(image bytes) + model + prompt version, so re-uploads of the same
+# photo skip the GPT-4o call entirely. Two tiers: in-process LRU and an
+# optional SQLite file (set ANALYSIS_CACHE_DB) that survives restarts.
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from services import metrics
+
+load_dotenv()
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", str(24 * 3600)))
+ANALYSIS_CACHE_DB = os.getenv("ANALYSIS_CACHE_DB")  # e.g. "cache/analysis.sqlite3"
+ANALYSIS_CACHE_DB_MAX_MB = float(os.getenv("ANALYSIS_CACHE_DB_MAX_MB", "100"))
+
+
+def image_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{prompt_version}:{model}:{digest}"
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if time.time() >= expires:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """File-backed tier with TTL and size-based (least recently used) eviction."""
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM cache ORDER BY accessed ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one in-flight computation.
+
+    The computation runs in its own task, so a caller that is cancelled (a
+    client disconnect) does not cancel it for the others; it is only cancelled
+    once every caller waiting for it has gone."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(key) == 1:
+                # Nobody left who wants the result; a later caller starts afresh
+                task.cancel()
+                del self._inflight[key]
+                del self._waiters[key]
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # Mark retrieved so an exception nobody waited for isn't logged
+            task.exception()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+class ResultCache:
+    """LRU (+ optional disk) cache with singleflight: concurrent requests for
+    the same key share one in-flight computation."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return copy.deepcopy(value)
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return copy.deepcopy(value)
+        return None
+
+    async def set(self, key: str, value: Any):
+        # A copy: callers go on to decorate their result (e.g. with a shopping list)
+        self.memory.set(key, copy.deepcopy(value))
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda result: True,
+    ) -> Any:
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        async def compute_and_store():
+            self.misses += 1
+            result = await compute()
+            if should_cache(result):
+                await self.set(key, result)
+            return result
+
+        return copy.deepcopy(await self._flight.do(key, compute_and_store))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self._flight.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "inflight": len(self._flight),
+        }
+
+
+def _is_cacheable(result: Any) -> bool:
+    # Never cache failed parses – the next upload should get a fresh attempt
+    return isinstance(result, dict) and "error" not in result
+
+
+analysis_cache = ResultCache(
+    LRUCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL),
+    SQLiteCache(ANALYSIS_CACHE_DB, ANALYSIS_CACHE_TTL, int(ANALYSIS_CACHE_DB_MAX_MB * 1024 * 1024))
+    if ANALYSIS_CACHE_DB else None,
+)
+
+metrics.Counter(
+    "fridgenutri_analysis_cache_lookups_total", "Vision result cache lookups by result", ["result"],
+    function=lambda: {
+        ("memory_hit",): analysis_cache.hits - analysis_cache.disk_hits,
+        ("disk_hit",): analysis_cache.disk_hits,
+        ("miss",): analysis_cache.misses,
+        ("coalesced",): analysis_cache._flight.coalesced,
+    },
+)
+metrics.Gauge(
+    "fridgenutri_analysis_cache_entries", "Vision results held in memory",
+    function=lambda: {(): len(analysis_cache.memory)},
+)
+metrics.Gauge(
+    "fridgenutri_analysis_in_flight", "Distinct vision analyses being computed",
+    function=lambda: {(): len(analysis_cache._flight)},
+)
+
+
+async def cached_analysis(
+    image_bytes: bytes, model: str, prompt_version: str, compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    key = image_key(image_bytes, model, prompt_version)
+    return await analysis_cache.get_or_compute(key, compute, _is_cacheable)
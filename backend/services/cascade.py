@@ -0,0 +1,111 @@
+# backend/services/cascade.py
+# Cheap-first model routing for the photo analyses. Each analysis is first
+# run on a smaller, faster model with a low-detail image; the service's own
+# confidence check (schema valid, certainty_percent, known products, enough
+# recognised ingredients) decides whether that answer is kept or the photo
+# goes to the full model. Escalation reasons and the latency won or lost are
+# counted per mode.
+import os
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from services import metrics
+from services.image_prep import IMAGE_DETAIL
+from services.llm import VISION_MODEL, usage_stats
+
+load_dotenv()
+
+MODEL_CASCADE = os.getenv("MODEL_CASCADE", "1") == "1"
+CHEAP_VISION_MODEL = os.getenv("OPENAI_CHEAP_VISION_MODEL", "gpt-4o-mini")
+CHEAP_IMAGE_DETAIL = os.getenv("CHEAP_IMAGE_DETAIL", "low")
+
+# Cached results depend on which models may have produced them
+CACHE_MODEL = f"{CHEAP_VISION_MODEL}>{VISION_MODEL}" if MODEL_CASCADE else VISION_MODEL
+
+# (model, image detail, llm stats mode) -> analysis result dict
+Attempt = Callable[[str, str, str], Awaitable[Dict]]
+# result -> None to accept it, or why it is not good enough
+Check = Callable[[Dict], Optional[str]]
+
+
+class CascadeStats:
+    def __init__(self):
+        self.accepted = 0
+        self.escalated = Counter()  # reason -> count
+        self.cheap_accepted = deque(maxlen=500)   # seconds of cheap answers that were kept
+        self.cheap_escalated = deque(maxlen=500)  # seconds spent on cheap answers before escalating
+
+    def snapshot(self, mode: str) -> Dict:
+        total = self.accepted + sum(self.escalated.values())
+        # Estimate: each kept cheap answer saved the full model's median latency minus its own
+        full = usage_stats[mode].latencies if mode in usage_stats else ()
+        full_p50 = statistics.median(full) if full else None
+        saved = (sum(full_p50 - s for s in self.cheap_accepted) if full_p50 is not None else None)
+        return {
+            "requests": total,
+            "accepted_cheap": self.accepted,
+            "escalated": dict(self.escalated),
+            "escalation_rate": round(sum(self.escalated.values()) / total, 3) if total else 0.0,
+            "full_model_p50_ms": round(full_p50 * 1000, 1) if full_p50 is not None else None,
+            "est_saved_s": round(saved, 2) if saved is not None else None,
+            "wasted_on_escalation_s": round(sum(self.cheap_escalated), 2),
+        }
+
+
+cascade_stats: Dict[str, CascadeStats] = defaultdict(CascadeStats)
+
+cascade_requests = metrics.Counter(
+    "fridgenutri_cascade_total", "Cascaded analyses by mode and outcome (accepted or escalation reason)",
+    ["mode", "outcome"],
+)
+cascade_seconds = metrics.Histogram(
+    "fridgenutri_cascade_seconds", "End-to-end latency of cascaded analyses", ["mode", "path"],
+    buckets=metrics.MODEL_BUCKETS,
+)
+metrics.Gauge(
+    "fridgenutri_cascade_escalation_ratio", "Share of cascaded analyses that needed the full model", ["mode"],
+    function=lambda: {(mode,): s.snapshot(mode)["escalation_rate"] for mode, s in cascade_stats.items()},
+)
+
+
+async def run_cascade(mode: str, attempt: Attempt, check: Check) -> Dict:
+    """The cheap model's answer if `check` accepts it, otherwise the full model's."""
+    if not MODEL_CASCADE:
+        return await attempt(VISION_MODEL, IMAGE_DETAIL, mode)
+
+    stats = cascade_stats[mode]
+    start = time.perf_counter()
+    try:
+        result = await attempt(CHEAP_VISION_MODEL, CHEAP_IMAGE_DETAIL, f"{mode}:cheap")
+        reason = check(result)
+    except Exception:
+        # Cheap model unavailable or rate limited: the full model still answers
+        reason = "error"
+    cheap_elapsed = time.perf_counter() - start
+
+    if reason is None:
+        stats.accepted += 1
+        stats.cheap_accepted.append(cheap_elapsed)
+        cascade_requests.inc(mode, "accepted")
+        cascade_seconds.observe(cheap_elapsed, mode, "cheap")
+        return result
+
+    stats.escalated[reason] += 1
+    stats.cheap_escalated.append(cheap_elapsed)
+    cascade_requests.inc(mode, f"escalated_{reason}")
+    result = await attempt(VISION_MODEL, IMAGE_DETAIL, mode)
+    cascade_seconds.observe(time.perf_counter() - start, mode, "escalated")
+    return result
+
+
+def get_cascade_stats() -> Dict:
+    return {
+        "enabled": MODEL_CASCADE,
+        "cheap_model": CHEAP_VISION_MODEL,
+        "cheap_detail": CHEAP_IMAGE_DETAIL,
+        "full_model": VISION_MODEL,
+        "modes": {mode: s.snapshot(mode) for mode, s in sorted(cascade_stats.items())},
+    }
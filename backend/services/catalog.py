@@ -0,0 +1,390 @@
+# backend/services/catalog.py
+# Local copy of the store catalogs, so price lookups don't scrape on the
+# request path. A crawler (python -m services.catalog, or in-process every
+# CATALOG_CRAWL_HOURS) searches every store for every known ingredient plus
+# the names recent lookups missed, and keeps every product on the result pages
+# in SQLite (PRICE_CATALOG_DB). Each worker loads the file into an in-memory
+# inverted index: folded, stemmed token -> products, so "Cibuľa červená",
+# "cibula" and "onions" land on the same postings. A lookup is a dict access
+# for a crawled search term or a small posting-list intersection otherwise;
+# whatever the catalog can't answer falls back to live scraping.
+#
+#   cd backend && PRICE_CATALOG_DB=cache/catalog.sqlite3 python -m services.catalog
+#   python -m services.catalog --lookup "cibuľa"
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+from services import metrics
+from services.ingredients import fold, known_names, stem
+from services.store_adapters import HEADERS, STORE_ADAPTERS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PRICE_CATALOG_DB = os.getenv("PRICE_CATALOG_DB")  # e.g. "cache/catalog.sqlite3"; unset = live scraping only
+CATALOG_MAX_AGE_H = float(os.getenv("CATALOG_MAX_AGE_H", "48"))       # older prices are not served
+CATALOG_CRAWL_HOURS = float(os.getenv("CATALOG_CRAWL_HOURS", "0"))    # 0 = only the CLI crawls
+CATALOG_CRAWL_CONCURRENCY = int(os.getenv("CATALOG_CRAWL_CONCURRENCY", "2"))  # requests per store at once
+CATALOG_RELOAD_S = 30         # how often workers look for a newer crawl in the file
+CATALOG_MAX_TERMS = 2000      # search terms per crawl: the lexicon plus the most recently missed names
+MISSED_RETENTION_DAYS = 30    # a missed name not requested again for this long is no longer crawled
+REQUEST_TIMEOUT = 15          # seconds per search page; the crawler is not in a hurry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY, store TEXT NOT NULL, name TEXT NOT NULL,
+    price REAL NOT NULL, crawled_at REAL NOT NULL, UNIQUE (store, name));
+CREATE TABLE IF NOT EXISTS hits (
+    term TEXT NOT NULL, store TEXT NOT NULL, rank INTEGER NOT NULL, product_id INTEGER NOT NULL,
+    PRIMARY KEY (term, store, rank));
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY, requested_at REAL, crawled_at REAL);
+"""
+
+
+def tokens(text: str) -> FrozenSet[str]:
+    # Same folding and stemming as ingredient names, so spelling variants share tokens
+    return frozenset(stem(fold(text)).split())
+
+
+class CatalogIndex:
+    """Immutable in-memory view of one crawl: products, search results and token postings."""
+
+    def __init__(self, products: Iterable[Tuple[int, str, str, float, float]],
+                 hits: Iterable[Tuple[str, str, int, int]]):
+        self.stores: List[str] = []
+        self.names: List[str] = []
+        self.prices: List[float] = []
+        self.crawled_at: List[float] = []
+        self.lengths: List[int] = []  # name tokens; fewer = a closer match for a short query
+        position = {}
+        product_tokens: List[set] = []
+        for product_id, store, name, price, crawled_at in products:
+            position[product_id] = len(self.names)
+            self.stores.append(store)
+            self.names.append(name)
+            self.prices.append(price)
+            self.crawled_at.append(crawled_at)
+            name_tokens = tokens(name)
+            self.lengths.append(len(name_tokens))
+            product_tokens.append(set(name_tokens))
+
+        # Search term -> store -> the store's top result, what a live scrape would return
+        self.by_term: Dict[str, Dict[str, int]] = {}
+        for term, store, rank, product_id in sorted(hits, key=lambda h: h[2]):
+            i = position.get(product_id)
+            if i is None:
+                continue
+            self.by_term.setdefault(term, {}).setdefault(store, i)
+            # A Slovak product name found by an English term is indexed under both
+            product_tokens[i] |= tokens(term)
+
+        postings: Dict[str, List[int]] = {}
+        for i, product in enumerate(product_tokens):
+            for token in product:
+                postings.setdefault(token, []).append(i)
+        self.postings: Dict[str, FrozenSet[int]] = {t: frozenset(ids) for t, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, name: str) -> Tuple[List[int], str]:
+        """Candidate products (one per store) for an ingredient, and how they were found."""
+        top = self.by_term.get(name)
+        if top:
+            return list(top.values()), "term"
+        query = tokens(name)
+        if not query:
+            return [], "miss"
+        lists = [self.postings.get(token) for token in query]
+        if any(ids is None for ids in lists):
+            return [], "miss"
+        lists.sort(key=len)
+        matched = lists[0].intersection(*lists[1:])
+        # Per store the product with the fewest extra words: "milk" -> "Mlieko 1,5 %", not "Mliečna čokoláda"
+        best: Dict[str, int] = {}
+        for i in matched:
+            current = best.get(self.stores[i])
+            if current is None or (self.lengths[i], self.prices[i]) < (self.lengths[current], self.prices[current]):
+                best[self.stores[i]] = i
+        return list(best.values()), "token" if best else "miss"
+
+
+class CatalogStore:
+    """The SQLite file the crawler writes and the workers load."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # workers read while the crawler writes
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def load(self) -> CatalogIndex:
+        with self._lock:
+            products = self._conn.execute("SELECT id, store, name, price, crawled_at FROM products").fetchall()
+            hits = self._conn.execute("SELECT term, store, rank, product_id FROM hits").fetchall()
+        return CatalogIndex(products, hits)
+
+    def save_results(self, store: str, term: str, products: List[Tuple[str, float]], now: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM hits WHERE term = ? AND store = ?", (term, store))
+            for rank, (name, price) in enumerate(products):
+                self._conn.execute(
+                    "INSERT INTO products (store, name, price, crawled_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (store, name) DO UPDATE SET price = excluded.price, crawled_at = excluded.crawled_at",
+                    (store, name, price, now),
+                )
+                product_id = self._conn.execute(
+                    "SELECT id FROM products WHERE store = ? AND name = ?", (store, name)
+                ).fetchone()[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO hits (term, store, rank, product_id) VALUES (?, ?, ?, ?)",
+                    (term, store, rank, product_id),
+                )
+            self._conn.commit()
+
+    def record_missed(self, names: Iterable[str], now: float):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO terms (term, requested_at) VALUES (?, ?)"
+                " ON CONFLICT (term) DO UPDATE SET requested_at = excluded.requested_at",
+                [(name, now) for name in names],
+            )
+            self._conn.commit()
+
+    def terms_to_crawl(self, now: float) -> List[str]:
+        lexicon = known_names()
+        with self._lock:
+            missed = [row[0] for row in self._conn.execute(
+                "SELECT term FROM terms WHERE requested_at >= ? ORDER BY requested_at DESC LIMIT ?",
+                (now - MISSED_RETENTION_DAYS * 86400, CATALOG_MAX_TERMS),
+            )]
+        return list(dict.fromkeys(lexicon + missed))[:CATALOG_MAX_TERMS]
+
+    def finish_crawl(self, terms: List[str], now: float, max_age: float):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO terms (term, crawled_at) VALUES (?, ?)"
+                " ON CONFLICT (term) DO UPDATE SET crawled_at = excluded.crawled_at",
+                [(term, now) for term in terms],
+            )
+            # Products no store has listed for two max ages are gone from the shelves
+            self._conn.execute("DELETE FROM products WHERE crawled_at < ?", (now - 2 * max_age,))
+            self._conn.execute("DELETE FROM hits WHERE product_id NOT IN (SELECT id FROM products)")
+            # Workers reload when the generation changes, not on every write of a running crawl
+            generation = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            self._conn.execute(f"PRAGMA user_version = {generation + 1}")
+            self._conn.commit()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def last_crawl(self) -> Optional[float]:
+        with self._lock:
+            return self._conn.execute("SELECT MAX(crawled_at) FROM terms").fetchone()[0]
+
+
+async def crawl(path: str, terms: Optional[List[str]] = None,
+                concurrency: int = CATALOG_CRAWL_CONCURRENCY) -> Dict:
+    """Search every store for every term and store all products found. Returns crawl stats."""
+    store = CatalogStore(path)
+    now = time.time()
+    if terms is None:
+        terms = await asyncio.to_thread(store.terms_to_crawl, now)
+    semaphores = {name: asyncio.Semaphore(concurrency) for name in STORE_ADAPTERS}
+    stats = {"terms": len(terms), "pages": 0, "products": 0, "errors": Counter()}
+    start = time.perf_counter()
+
+    async def crawl_page(session: aiohttp.ClientSession, store_name: str, term: str):
+        async with semaphores[store_name]:
+            try:
+                products = await STORE_ADAPTERS[store_name].fetch_products(session, term)
+            except Exception as e:
+                # Keep the previous crawl's results for this store and term
+                stats["errors"][store_name] += 1
+                logger.warning("catalog crawl: %s error for %s: %s", store_name, term, e)
+                return
+        await asyncio.to_thread(store.save_results, store_name, term, products, now)
+        stats["pages"] += 1
+        stats["products"] += len(products)
+
+    try:
+        async with aiohttp.ClientSession(
+            headers=HEADERS, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        ) as session:
+            await asyncio.gather(*[
+                crawl_page(session, store_name, term) for term in terms for store_name in STORE_ADAPTERS
+            ])
+        await asyncio.to_thread(store.finish_crawl, terms, now, CATALOG_MAX_AGE_H * 3600)
+    finally:
+        store.close()
+    stats["errors"] = dict(stats["errors"])
+    stats["seconds"] = round(time.perf_counter() - start, 1)
+    return stats
+
+
+class Catalog:
+    """A worker's view of the catalog file, reloaded when a crawl has changed it."""
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._store: Optional[CatalogStore] = None
+        self._index = CatalogIndex([], [])
+        self._generation = 0  # 0 = no finished crawl loaded yet
+        self._next_check = 0.0
+        self._missed = set()  # names to add to the next crawl
+        self.loaded_at = None
+        self.counts = Counter()
+
+    def _sync(self, missed: set) -> Optional[CatalogIndex]:
+        # In a thread: hand over missed names, reload only if a crawl has finished since
+        if self._store is None:
+            if not os.path.exists(self.path):
+                return None
+            self._store = CatalogStore(self.path)
+        if missed:
+            self._store.record_missed(missed, time.time())
+        generation = self._store.generation()
+        if generation == self._generation:
+            return None
+        index = self._store.load()
+        self._generation = generation
+        return index
+
+    async def _refresh(self):
+        self._next_check = time.monotonic() + CATALOG_RELOAD_S
+        missed, self._missed = self._missed, set()
+        index = await asyncio.to_thread(self._sync, missed)
+        if index is not None:
+            self._index = index
+            self.loaded_at = time.time()
+
+    async def lookup(self, name: str) -> Optional[Dict]:
+        """Cheapest catalog price for a canonical ingredient name, or None to scrape live."""
+        if time.monotonic() >= self._next_check:
+            await self._refresh()
+        index = self._index
+        candidates, found_by = index.search(name)
+        cutoff = time.time() - self.max_age
+        fresh = [i for i in candidates if index.crawled_at[i] >= cutoff]
+        if not fresh:
+            self.counts["stale" if candidates else "misses"] += 1
+            if len(self._missed) < CATALOG_MAX_TERMS:
+                self._missed.add(name)
+            return None
+        self.counts[f"{found_by}_hits"] += 1
+        best = min(fresh, key=lambda i: index.prices[i])
+        return {"price": f"{index.prices[best]:.2f} €", "store": index.stores[best],
+                "source": "catalog", "crawled_at": index.crawled_at[best]}
+
+    async def close(self):
+        if self._store is not None:
+            if self._missed:
+                await asyncio.to_thread(self._store.record_missed, self._missed, time.time())
+                self._missed = set()
+            self._store.close()
+            self._store = None
+
+    def stats(self) -> Dict:
+        lookups = sum(self.counts.values())
+        hits = self.counts["term_hits"] + self.counts["token_hits"]
+        return {
+            "path": self.path,
+            "generation": self._generation,
+            "products": len(self._index),
+            "terms": len(self._index.by_term),
+            "tokens": len(self._index.postings),
+            "loaded_at": self.loaded_at,
+            "term_hits": self.counts["term_hits"],
+            "token_hits": self.counts["token_hits"],
+            "stale": self.counts["stale"],
+            "misses": self.counts["misses"],
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+price_catalog = Catalog(PRICE_CATALOG_DB, CATALOG_MAX_AGE_H * 3600) if PRICE_CATALOG_DB else None
+
+if price_catalog is not None:
+    metrics.Counter(
+        "fridgenutri_price_catalog_lookups_total", "Local catalog price lookups by result", ["result"],
+        function=lambda: {(result,): price_catalog.counts[result]
+                          for result in ("term_hits", "token_hits", "stale", "misses")},
+    )
+    metrics.Gauge(
+        "fridgenutri_price_catalog_products", "Products in the loaded price catalog",
+        function=lambda: {(): len(price_catalog._index)},
+    )
+
+_crawler_task: Optional[asyncio.Task] = None
+
+
+async def _crawl_periodically():
+    interval = CATALOG_CRAWL_HOURS * 3600
+    while True:
+        # Several workers share the file: only crawl if nobody else has recently
+        store = CatalogStore(PRICE_CATALOG_DB)
+        last = await asyncio.to_thread(store.last_crawl)
+        store.close()
+        wait = (last or 0) + interval - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        try:
+            logger.info("catalog crawl finished: %s", await crawl(PRICE_CATALOG_DB))
+        except Exception:
+            logger.exception("catalog crawl failed")
+            await asyncio.sleep(min(interval, 600))
+
+
+def start_crawler():
+    global _crawler_task
+    if price_catalog is not None and CATALOG_CRAWL_HOURS > 0 and _crawler_task is None:
+        _crawler_task = asyncio.create_task(_crawl_periodically())
+
+
+async def stop_crawler():
+    global _crawler_task
+    if _crawler_task is not None:
+        _crawler_task.cancel()
+        try:
+            await _crawler_task
+        except asyncio.CancelledError:
+            pass
+        _crawler_task = None
+    if price_catalog is not None:
+        await price_catalog.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the store catalogs into a local SQLite file")
+    parser.add_argument("--db", default=PRICE_CATALOG_DB or "cache/catalog.sqlite3")
+    parser.add_argument("--terms", nargs="+", help="search terms (default: lexicon + recently missed names)")
+    parser.add_argument("--lookup", help="look a name up in the existing catalog instead of crawling")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.lookup:
+        from services.ingredients import canonical_name
+        catalog = Catalog(args.db, CATALOG_MAX_AGE_H * 3600)
+        print(json.dumps(asyncio.run(catalog.lookup(canonical_name(args.lookup))), ensure_ascii=False))
+    else:
+        print(json.dumps(asyncio.run(crawl(args.db, args.terms)), indent=2))
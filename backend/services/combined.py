@@ -0,0 +1,140 @@
+# backend/services/combined.py
+# One model call for several outputs of the same photo. The separate endpoints
+# each resend the full base64 image plus a long prompt with a JSON example;
+# here the image goes once, the structured-output schema replaces the examples,
+# and each requested section adds only a one-line instruction and its share of
+# the token budget. With local recipes on, "recipes" only asks the model for
+# the inventory and the recipes come from the corpus.
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from pydantic import create_model
+from schemas import AlternativesAnalysis, DetectedIngredient, DishAnalysis, Recipe, StrictModel
+from services.cache import cached_analysis
+from services.dish_vision import translate_ingredient
+from services.image_prep import image_part
+from services.llm import chat_completion, parse_content, response_format, VISION_MODEL
+from services.nutrition import fill_recipe_nutrition
+from services.recipe_index import corpus_version
+from services.vision import LOCAL_RECIPES, recipes_for_inventory
+
+# Bump when a section prompt changes so cached results from the old prompt are ignored
+PROMPT_VERSION = f"combined-v2:{corpus_version()}" if LOCAL_RECIPES else "combined-v1"
+
+OUTPUTS = ("inventory", "recipes", "dish", "alternatives")
+
+# Top-level fields of the combined schema each output contributes
+SECTION_FIELDS = {
+    "inventory": {"ingredients": (List[DetectedIngredient], ...), "shopping_suggestions": (List[str], ...)},
+    "recipes": {"recipes": (List[Recipe], ...)},
+    "dish": {"dish": (DishAnalysis, ...)},
+    "alternatives": {"product": (AlternativesAnalysis, ...)},
+}
+
+SECTION_PROMPTS = {
+    "inventory": "ingredients: every visible food item with a realistic quantity. "
+                 "shopping_suggestions: 3-6 staples that would complement them.",
+    "recipes": "recipes: 5-8 realistic recipes using only visible ingredients; write each ingredients_used "
+               "entry as name plus amount (\"milk 400ml\"). Do not compute nutrition.",
+    "dish": "dish: the cooked dish shown - name, certainty_percent, serves, prep_time_min, 5-10 short English "
+            "steps, and its ingredients with amounts using Slovak names (\"zemiaky\", \"bryndza\").",
+    "alternatives": "product: the main food product. assessment: great for the healthiest (EV olive oil, nuts, "
+                    "fatty fish, eggs, berries, leafy greens, Greek yogurt, dark chocolate 85%+), good/moderate "
+                    "if it can be improved, suboptimal if clearly unhealthy (sunflower oil, margarine, sugary "
+                    "cereal, soda); 3-6 alternatives with realistic 2025 EU prices; no numeric health scores.",
+}
+
+# max_tokens per section; the separate endpoints allow 1200 (fridge), 2000 (dish), 1500 (alternatives)
+SECTION_TOKEN_BUDGETS = {"inventory": 300, "recipes": 900, "dish": 500, "alternatives": 600}
+JSON_OVERHEAD_TOKENS = 50
+
+SYSTEM_PROMPT = "You are a food analyst for a Slovak grocery app. Reply only with JSON matching the schema."
+
+
+def parse_outputs(outputs: Iterable[str]) -> Tuple[str, ...]:
+    """Validate and order the requested outputs; raises ValueError on unknown names."""
+    requested = {o.strip().lower() for o in outputs if o.strip()}
+    unknown = requested - set(OUTPUTS)
+    if unknown or not requested:
+        raise ValueError(f"outputs must be a non-empty subset of {', '.join(OUTPUTS)}")
+    # Canonical order, so "dish,recipes" and "recipes,dish" share schema, prompt and cache entry
+    return tuple(o for o in OUTPUTS if o in requested)
+
+
+@lru_cache(maxsize=None)
+def compile_request(outputs: Tuple[str, ...]) -> Tuple[type, dict, str, int]:
+    """(schema, response_format, prompt, max_tokens) for one combination, built once."""
+    fields = {}
+    for output in outputs:
+        fields.update(SECTION_FIELDS[output])
+    schema = create_model("Combined_" + "_".join(outputs), __base__=StrictModel, **fields)
+
+    lines = ["From this photo fill in:"] + [f"- {SECTION_PROMPTS[o]}" for o in outputs]
+    lines.append("If the photo does not show something a section asks for, use empty strings, lists or 0.")
+    max_tokens = sum(SECTION_TOKEN_BUDGETS[o] for o in outputs) + JSON_OVERHEAD_TOKENS
+    return schema, response_format(schema), "\n".join(lines), max_tokens
+
+
+def mode_name(outputs: Tuple[str, ...]) -> str:
+    return "combined:" + "+".join(outputs)
+
+
+def model_outputs(outputs: Tuple[str, ...]) -> Tuple[str, ...]:
+    """The sections the model has to fill in for the requested outputs."""
+    if LOCAL_RECIPES and "recipes" in outputs:
+        return parse_outputs(["inventory" if o == "recipes" else o for o in outputs])
+    return outputs
+
+
+async def analyze_combined(image_bytes: bytes, outputs: Tuple[str, ...]) -> dict:
+    return await cached_analysis(
+        image_bytes, VISION_MODEL, f"{PROMPT_VERSION}:{'+'.join(outputs)}",
+        lambda: _analyze_combined(image_bytes, outputs),
+    )
+
+
+def _shape(raw: Dict, outputs: Tuple[str, ...]) -> dict:
+    # Same shapes the separate endpoints return, so the frontend can reuse its views
+    result = {"outputs": list(outputs)}
+    if "inventory" in outputs or "recipes" in outputs:
+        fridge = {
+            "ingredients": raw.get("ingredients", []),
+            "recipes": raw.get("recipes", []),
+            "shopping_suggestions": raw.get("shopping_suggestions", []),
+        }
+        if "recipes" in raw:
+            fill_recipe_nutrition(fridge["recipes"])
+        result["fridge"] = fridge
+    if "dish" in outputs:
+        dish = raw["dish"]
+        dish["ingredients"] = [translate_ingredient(ing) for ing in dish["ingredients"]]
+        result["dish"] = dish
+    if "alternatives" in outputs:
+        result["alternative"] = raw["product"]
+    return result
+
+
+async def _analyze_combined(image_bytes: bytes, outputs: Tuple[str, ...]) -> dict:
+    asked = model_outputs(outputs)
+    schema, fmt, prompt, max_tokens = compile_request(asked)
+
+    response = await chat_completion(
+        mode=mode_name(asked),
+        model=VISION_MODEL,
+        temperature=0.0,
+        max_tokens=max_tokens,
+        response_format=fmt,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": [{"type": "text", "text": prompt}, image_part(image_bytes)]},
+        ],
+    )
+
+    content = response.choices[0].message.content
+    try:
+        result = _shape(parse_content(content, schema), outputs)
+    except ValueError as e:
+        return {"error": "Invalid JSON", "raw": content, "parse_error": str(e)}
+    if asked != outputs:
+        result["fridge"]["recipes"] = await recipes_for_inventory(result["fridge"]["ingredients"])
+    return result
@@ -1,89 +1,60 @@
 # backend/services/dish_vision.py
-import base64
-import json
-import re
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Comprehensive Slovak → English translation map (updated for Slovak dishes)
-ENGLISH_NAMES = {
-    # Meats
-    "hovädzie mäso": "beef",
-    "hovädzie": "beef",
-    "bravčové mäso": "pork",
-    "kuracie mäso": "chicken",
-    "morčacie mäso": "turkey",
-    "klobása": "sausage",
-    "slanina": "bacon",
-    "údené mäso": "smoked meat",
-
-    # Dairy & Eggs
-    "bryndza": "bryndza cheese",
-    "syrové halušky": "cheese dumplings",
-    "smotana": "cooking cream",
-    "kyslá smotana": "sour cream",
-    "mlieko": "milk",
-    "maslo": "butter",
-    "vajcia": "eggs",
-    "vajíčka": "eggs",
-    "syrov": "cheese",
-
-    # Vegetables
-    "zemiaky": "potatoes",
-    "koreňová zelenina": "root vegetables",
-    "mrkva": "carrots",
-    "mrkev": "carrots",
-    "petržlen": "parsley root",
-    "celer": "celery",
-    "cibuľa": "onion",
-    "cesnak": "garlic",
-    "kapusta": "cabbage",
-    "kyslá kapusta": "sauerkraut",
-    "paradajky": "tomatoes",
-    "paprika": "bell pepper",
-
-    # Grains & Flour
-    "múka": "flour",
-    "hladká múka": "all-purpose flour",
-    "ryža": "rice",
-
-    # Other
-    "soľ": "salt",
-    "korenie": "black pepper",
-    "olej": "oil",
-    "cukor": "sugar",
-    "ocot": "vinegar",
-
-    # Full dishes (for recognition)
-    "bryndzové halušky": "bryndza dumplings",
-    "kapustnica": "sauerkraut soup",
-    "sviečková na smotane": "beef sirloin in cream sauce",
-    "guláš": "goulash",
-    "rezne": "schnitzel",
-    "cesnačka": "garlic soup",
-}
+from typing import Any, AsyncIterator, Optional, Tuple
+from schemas import DetectedIngredient, DishAnalysis
+from services.cache import analysis_cache, cached_analysis, image_key
+from services.cascade import CACHE_MODEL, run_cascade
+from services.image_prep import IMAGE_DETAIL, image_part
+from services.ingredients import translate
+from services.json_stream import JSONStreamParser
+from services.llm import (
+    chat_completion, chat_completion_stream, parse_content, response_format, VISION_MODEL
+)
+
+# Bump when the prompt or the post-processing changes so old cached results are ignored
+PROMPT_VERSION = "dish-v3"
+
+# A cheap-model answer is kept only if it is this sure of the dish...
+DISH_MIN_CERTAINTY = 80
+# ...and this share of its ingredients are names the lexicon knows
+MIN_KNOWN_INGREDIENTS = 0.6
+
+
+def _doubt(result: dict) -> Optional[str]:
+    if "error" in result:
+        return "invalid"
+    if result.get("certainty_percent", 0) < DISH_MIN_CERTAINTY:
+        return "low_certainty"
+    ingredients = result.get("ingredients", [])
+    if not ingredients:
+        return "no_ingredients"
+    # _finalize already translated them; unknown names come back title-cased
+    known = sum(translate(ing["name"]) is not None for ing in ingredients)
+    if known < MIN_KNOWN_INGREDIENTS * len(ingredients):
+        return "unknown_ingredients"
+    return None
+
 
 async def analyze_dish_image(image_bytes: bytes) -> dict:
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    return await cached_analysis(
+        image_bytes, CACHE_MODEL, PROMPT_VERSION,
+        lambda: run_cascade(
+            "dish",
+            lambda model, detail, mode: _analyze_dish_image(image_bytes, model, detail, mode),
+            _doubt,
+        ),
+    )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-08-06",
-        temperature=0.0,
-        max_tokens=2000,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a world-class Slovak chef. Analyze the finished dish in the photo and return ONLY valid JSON using this exact structure. Use Slovak names for ingredients (e.g. 'zemiaky', 'bryndza') so we can match prices in Slovak shops."
-            },
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": """
+
+def _dish_messages(image_bytes: bytes, detail: str = IMAGE_DETAIL) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "You are a world-class Slovak chef. Analyze the finished dish in the photo and return ONLY valid JSON using this exact structure. Use Slovak names for ingredients (e.g. 'zemiaky', 'bryndza') so we can match prices in Slovak shops."
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": """
 Analyze this photo of a finished Slovak or international dish and return ONLY valid JSON with this exact structure:
 
 {
@@ -101,58 +72,99 @@ Analyze this photo of a finished Slovak or international dish and return ONLY va
 
 Use only Slovak ingredient names in the list (e.g. 'zemiaky', not 'potatoes'). Be very accurate.
 """},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
-        ]
-    )
+                image_part(image_bytes, detail)
+            ]
+        }
+    ]
+
+
+def translate_ingredient(ing: dict) -> dict:
+    # Translate ingredient names to clean English for frontend display
+    original_name = ing.get("name", "").strip().lower()
+    english_name = translate(original_name) or original_name.title()
+    return {
+        "name": english_name,
+        "amount": ing.get("amount", "1 portion")
+    }
+
 
-    raw = response.choices[0].message.content.strip()
+def _finalize(result: dict) -> dict:
+    result["ingredients"] = [translate_ingredient(ing) for ing in result.get("ingredients", [])]
 
-    # Clean code blocks
-    if raw.startswith("```json"):
-        raw = raw[7:]
-    if raw.endswith("```"):
-        raw = raw[:-3]
-    raw = raw.strip()
+    # Ensure shopping_list will be filled later
+    result.setdefault("shopping_list", {
+        "items": [],
+        "estimated_total": 0,
+        "currency": "€",
+        "note": "Fetching real-time prices..."
+    })
+    return result
 
+
+async def _analyze_dish_image(image_bytes: bytes, model: str = VISION_MODEL, detail: str = IMAGE_DETAIL,
+                              mode: str = "dish") -> dict:
+    response = await chat_completion(
+        mode=mode,
+        model=model,
+        temperature=0.0,
+        max_tokens=2000,
+        response_format=response_format(DishAnalysis),
+        messages=_dish_messages(image_bytes, detail),
+    )
+
+    content = response.choices[0].message.content
     try:
-        result = json.loads(raw)
-
-        # Translate ingredient names to clean English for frontend display
-        translated_ingredients = []
-        for ing in result.get("ingredients", []):
-            original_name = ing.get("name", "").strip().lower()
-            english_name = ENGLISH_NAMES.get(original_name, original_name.title())
-            translated_ingredients.append({
-                "name": english_name,
-                "amount": ing.get("amount", "1 portion")
-            })
-        result["ingredients"] = translated_ingredients
-
-        # Ensure shopping_list will be filled later
-        result.setdefault("shopping_list", {
-            "items": [],
-            "estimated_total": 0,
-            "currency": "€",
-            "note": "Fetching real-time prices..."
-        })
-
-        return result
-
-    except json.JSONDecodeError as e:
+        return _finalize(parse_content(content, DishAnalysis))
+    except ValueError as e:
         return {
             "error": "Failed to parse GPT response as JSON",
-            "raw_output": raw,
+            "raw_output": content,
             "exception": str(e)
         }
-    except Exception as e:
-        return {
-            "error": "Unexpected error in dish analysis",
-            "details": str(e)
-        }
\ No newline at end of file
+
+
+async def stream_dish_image(image_bytes: bytes) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ("dish", name), ("ingredient", ing) as soon as the model streams them,
+    then ("result", analysis) with the same shape analyze_dish_image returns.
+
+    Always the full model: a cheap answer could not be taken back once streamed."""
+    key = image_key(image_bytes, CACHE_MODEL, PROMPT_VERSION)
+    cached = await analysis_cache.get(key)
+    if cached is not None:
+        yield "dish", cached.get("recognized_dish")
+        for ing in cached.get("ingredients", []):
+            yield "ingredient", ing
+        yield "result", cached
+        return
+
+    parser = JSONStreamParser()
+    async for delta in chat_completion_stream(
+        mode="dish-stream",
+        model=VISION_MODEL,
+        temperature=0.0,
+        max_tokens=2000,
+        response_format=response_format(DishAnalysis),
+        messages=_dish_messages(image_bytes),
+    ):
+        for kind, field, value in parser.feed(delta):
+            if kind == "field" and field == "recognized_dish":
+                yield "dish", value
+            elif kind == "item" and field == "ingredients":
+                try:
+                    ingredient = DetectedIngredient.model_validate(value).model_dump()
+                except ValueError:
+                    continue  # the full-document validation below reports it
+                yield "ingredient", translate_ingredient(ingredient)
+
+    try:
+        result = _finalize(parse_content(parser.text, DishAnalysis))
+    except ValueError as e:
+        yield "result", {
+            "error": "Failed to parse GPT response as JSON",
+            "raw_output": parser.text,
+            "exception": str(e)
+        }
+        return
+
+    await analysis_cache.set(key, result)
+    yield "result", result
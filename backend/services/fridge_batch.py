@@ -0,0 +1,130 @@
+# backend/services/fridge_batch.py
+# One inventory from several photos of the same fridge (shelves, door,
+# freezer) instead of the app posting them to /analyze one after another.
+# A few small photos go to the model together in one call; larger batches fan
+# out one inventory call per photo, FRIDGE_BATCH_CONCURRENCY at a time, and
+# the lists are merged: the same food (by canonical name) becomes one entry
+# with the quantities summed. Recipes are then suggested once, for the whole
+# fridge.
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from services.ingredients import fold, stem, translate
+from services.metrics import span
+from services.nutrition import format_measure, measure
+from services.vision import analyze_fridge_inventory, analyze_fridge_photos, recipes_for_inventory
+
+load_dotenv()
+
+FRIDGE_BATCH_CONCURRENCY = int(os.getenv("FRIDGE_BATCH_CONCURRENCY", "4"))  # inventory calls per request
+FRIDGE_BATCH_PACK_MAX = int(os.getenv("FRIDGE_BATCH_PACK_MAX", "3"))  # photos in one model call, 0 = never
+FRIDGE_BATCH_PACK_MAX_MB = float(os.getenv("FRIDGE_BATCH_PACK_MAX_MB", "4"))  # prepared bytes in one call
+
+
+def _key(name: str) -> str:
+    # Unknown foods still merge across plural/case differences
+    return translate(name) or stem(fold(name))
+
+
+def sum_amounts(amounts: List[str]) -> str:
+    """'1L' + '500ml' -> '1.5L'; incompatible or unparseable amounts are listed: '6 + some'."""
+    amounts = [a.strip() for a in amounts if a and a.strip()]
+    if len(amounts) <= 1:
+        return amounts[0] if amounts else ""
+    totals: Dict[str, float] = {}
+    other: List[str] = []
+    for amount in amounts:
+        measured = measure(amount)
+        if measured is None:
+            if amount not in other:
+                other.append(amount)
+        else:
+            totals[measured[1]] = totals.get(measured[1], 0.0) + measured[0]
+    return " + ".join([format_measure(round(value, 3), dimension) for dimension, value in totals.items()] + other)
+
+
+def merge_ingredients(inventories: List[List[Dict]]) -> List[Dict]:
+    """One entry per food across the photos' ingredient lists, in first-seen order,
+    with summed quantities and the indexes of the photos it was seen in."""
+    merged: Dict[str, Dict] = {}
+    for photo, ingredients in enumerate(inventories):
+        for ing in ingredients:
+            entry = merged.setdefault(_key(ing["name"]), {"name": ing["name"], "amounts": [], "photos": []})
+            entry["amounts"].append(ing.get("amount") or "")
+            if photo not in entry["photos"]:
+                entry["photos"].append(photo)
+    return [{"name": e["name"], "amount": sum_amounts(e["amounts"]), "photos": e["photos"]}
+            for e in merged.values()]
+
+
+def _merge_suggestions(inventories: List[Dict], ingredients: List[Dict]) -> List[str]:
+    have = {_key(ing["name"]) for ing in ingredients}
+    suggestions: Dict[str, str] = {}
+    for inventory in inventories:
+        for name in inventory.get("shopping_suggestions", []):
+            key = _key(name)
+            if key not in have:
+                suggestions.setdefault(key, name)
+    return list(suggestions.values())
+
+
+def _packable(images: List[bytes]) -> bool:
+    return 1 < len(images) <= FRIDGE_BATCH_PACK_MAX and \
+        sum(map(len, images)) <= FRIDGE_BATCH_PACK_MAX_MB * 1024 * 1024
+
+
+async def _fan_out(images: List[bytes]) -> List[Optional[Dict]]:
+    limit = asyncio.Semaphore(FRIDGE_BATCH_CONCURRENCY)
+
+    async def one(image: bytes) -> Optional[Dict]:
+        async with limit:
+            try:
+                result = await analyze_fridge_inventory(image)
+            except Exception:
+                # One unreadable photo should not sink the others
+                return None
+        return None if "error" in result else result
+
+    return await asyncio.gather(*(one(image) for image in images))
+
+
+async def analyze_fridge_batch(images: List[bytes]) -> dict:
+    """The /analyze result shape for several photos of one fridge, plus which
+    photos each ingredient was seen in and how the photos were analysed."""
+    if _packable(images):
+        strategy = "packed"
+        try:
+            packed = await analyze_fridge_photos(images)
+        except Exception as e:
+            # Timed out or failed after retries: smaller per-photo calls may still get through
+            packed = {"error": str(e)}
+        if "error" not in packed:
+            ingredients = merge_ingredients([packed["ingredients"]])
+            for ing in ingredients:
+                del ing["photos"]  # the model saw them together
+            inventories, failed = [packed], []
+        else:
+            strategy = "fan-out"  # after a failed packed call, each photo on its own
+    else:
+        strategy = "fan-out" if len(images) > 1 else "single"
+
+    if strategy != "packed":
+        results = await _fan_out(images)
+        failed = [i for i, result in enumerate(results) if result is None]
+        if len(failed) == len(images):
+            return {"error": "No photo could be analysed", "failed_photos": failed}
+        with span("fridge_batch_merge"):
+            # A failed photo keeps its index, so `photos` still points at the uploads
+            ingredients = merge_ingredients([result["ingredients"] if result else [] for result in results])
+        inventories = [result for result in results if result]
+
+    return {
+        "ingredients": ingredients,
+        "recipes": await recipes_for_inventory(ingredients),
+        "shopping_suggestions": _merge_suggestions(inventories, ingredients),
+        "photos": len(images),
+        "failed_photos": failed,
+        "strategy": strategy,
+    }
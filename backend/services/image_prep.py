@@ -0,0 +1,106 @@
+# backend/services/image_prep.py
+# Downscale + re-encode uploads before they are base64'd into the model request.
+# Phone photos are 4–12 MB; GPT-4o tiles anything above ~2048px anyway, so we
+# EXIF-orient, shrink, drop metadata and re-encode as JPEG in a thread pool.
+# Streamed uploads are decoded straight from their spooled file, and the
+# result is kept per upload hash briefly, so a retried upload is not decoded
+# again. Uploads Pillow cannot decode are refused with 415.
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Union
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+from services.cache import LRUCache
+from services.llm import InlineImage
+from services.metrics import span
+from services.uploads import Upload
+
+try:  # HEIC uploads from iPhones, only if pillow-heif is installed
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_SUPPORT = True
+except ImportError:
+    HEIF_SUPPORT = False
+
+load_dotenv()
+
+# "high" keeps detail for the tiled vision mode, "low" sends a single 512px tile
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "high")
+IMAGE_MAX_DIM = int(os.getenv("IMAGE_MAX_DIM", "2048"))
+IMAGE_LOW_DETAIL_MAX_DIM = 512
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREP_WORKERS = int(os.getenv("IMAGE_PREP_WORKERS", str(min(4, os.cpu_count() or 1))))
+PREPARED_CACHE_SIZE = int(os.getenv("PREPARED_CACHE_SIZE", "16"))  # prepared images (~0.2-1 MB each)
+PREPARED_CACHE_TTL = 600  # seconds
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_PREP_WORKERS, thread_name_prefix="image-prep")
+_prepared = LRUCache(PREPARED_CACHE_SIZE, PREPARED_CACHE_TTL)
+
+
+def max_dim_for(detail: str) -> int:
+    return IMAGE_LOW_DETAIL_MAX_DIM if detail == "low" else IMAGE_MAX_DIM
+
+
+class UnsupportedImage(ValueError):
+    """The upload is not an image Pillow can decode."""
+
+
+def preprocess_image(image: Union[bytes, BinaryIO], max_dim: int = IMAGE_MAX_DIM,
+                     quality: int = IMAGE_JPEG_QUALITY) -> bytes:
+    """`image` is the upload as bytes or as a readable file positioned at its start."""
+    try:
+        img = Image.open(io.BytesIO(image) if isinstance(image, bytes) else image)
+        # Decode JPEGs straight at a reduced scale when they are much larger than needed
+        img.draft("RGB", (max_dim, max_dim))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+    except Exception as e:
+        # Not something Pillow can read (e.g. HEIC without pillow-heif, a PDF, a
+        # truncated file). Passing the bytes on would send them to the model as
+        # image/jpeg, which it rejects or misreads.
+        raise UnsupportedImage(str(e)) from e
+
+    out = io.BytesIO()
+    # No exif/icc passed through → metadata (GPS, camera info) is stripped
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+async def _preprocess(image: Union[bytes, BinaryIO], detail: str) -> bytes:
+    loop = asyncio.get_running_loop()
+    try:
+        with span("image_prep"):  # includes waiting for a free prep worker
+            return await loop.run_in_executor(_executor, preprocess_image, image, max_dim_for(detail))
+    except UnsupportedImage:
+        formats = "JPEG, PNG, WebP or HEIC" if HEIF_SUPPORT else "JPEG, PNG or WebP"
+        raise HTTPException(415, detail=f"Unsupported or unreadable image, upload a {formats} photo")
+
+
+async def prepare_image(image: Union[bytes, Upload], detail: str = IMAGE_DETAIL) -> bytes:
+    if isinstance(image, bytes):
+        return await _preprocess(image, detail)
+
+    key = f"{image.sha256}:{detail}"
+    prepared = _prepared.get(key)
+    if prepared is not None:
+        return prepared
+
+    # Not coalesced with a concurrent identical upload: each request decodes from
+    # its own spool, which its dependency closes once that request is gone
+    prepared = await _preprocess(image.file, detail)
+    _prepared.set(key, prepared)
+    return prepared
+
+
+def image_part(image_bytes: bytes, detail: str = IMAGE_DETAIL) -> dict:
+    # Base64-encoded by services.llm while the request body is being sent
+    return {
+        "type": "image_url",
+        "image_url": {"url": InlineImage(image_bytes), "detail": detail},
+    }
@@ -0,0 +1,261 @@
+# backend/services/ingredients.py
+# Canonical ingredient names. The model, the user and the stores spell the same
+# ingredient many ways ("Cibuľa ", "cibula", "cibule", "onions"); everything that
+# keys on an ingredient (translation, price cache, store search) goes through
+# canonical_name() so they all land on one entry.
+#
+# Matching: diacritic folding -> qualifier/suffix stripping -> exact lookup ->
+# trigram index for typos and unseen inflections. Results are memoized.
+import csv
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from services.nutrition import NUTRIENTS_CSV
+
+# Comprehensive Slovak → English translation map (updated for Slovak dishes)
+ENGLISH_NAMES = {
+    # Meats
+    "hovädzie mäso": "beef",
+    "hovädzie": "beef",
+    "bravčové mäso": "pork",
+    "kuracie mäso": "chicken",
+    "morčacie mäso": "turkey",
+    "klobása": "sausage",
+    "slanina": "bacon",
+    "údené mäso": "smoked meat",
+
+    # Dairy & Eggs
+    "bryndza": "bryndza cheese",
+    "syrové halušky": "cheese dumplings",
+    "smotana": "cooking cream",
+    "kyslá smotana": "sour cream",
+    "mlieko": "milk",
+    "maslo": "butter",
+    "vajcia": "eggs",
+    "vajíčka": "eggs",
+    "syrov": "cheese",
+
+    # Vegetables
+    "zemiaky": "potatoes",
+    "koreňová zelenina": "root vegetables",
+    "mrkva": "carrots",
+    "mrkev": "carrots",
+    "petržlen": "parsley root",
+    "celer": "celery",
+    "cibuľa": "onion",
+    "cesnak": "garlic",
+    "kapusta": "cabbage",
+    "kyslá kapusta": "sauerkraut",
+    "paradajky": "tomatoes",
+    "paprika": "bell pepper",
+
+    # Grains & Flour
+    "múka": "flour",
+    "hladká múka": "all-purpose flour",
+    "ryža": "rice",
+
+    # Other
+    "soľ": "salt",
+    "korenie": "black pepper",
+    "olej": "oil",
+    "cukor": "sugar",
+    "ocot": "vinegar",
+
+    # Full dishes (for recognition)
+    "bryndzové halušky": "bryndza dumplings",
+    "kapustnica": "sauerkraut soup",
+    "sviečková na smotane": "beef sirloin in cream sauce",
+    "guláš": "goulash",
+    "rezne": "schnitzel",
+    "cesnačka": "garlic soup",
+}
+
+# Words that describe the state of an ingredient, not the ingredient (folded)
+QUALIFIERS = {
+    "varene", "vareny", "varena", "vareneho", "cerstve", "cerstvy", "cerstva", "nakrajane",
+    "nakrajany", "nakrajana", "strahane", "mlete", "mleta", "mlety", "surove", "bio", "domace",
+    "fresh", "chopped", "cooked", "boiled", "sliced", "diced", "grated", "minced", "raw",
+    "organic", "large", "small", "medium", "of", "frozen", "ground", "whole", "ripe", "peeled",
+    "boneless", "skinless", "canned", "extra", "virgin",
+}
+# Slovak case/plural endings and English plurals; vowels are stripped after these
+_SUFFIX_RE = re.compile(r"(?:ami|ach|och|ovi|ov|om|ou|es|s)$")
+_VOWELS_RE = re.compile(r"[aeiouy]+$")
+# Fleeting vowel before the last consonant: cukor/cukru, ocot/octu, orech/orechy
+_ELISION_RE = re.compile(r"([^aeiouy])[oe]([^aeiouy])$")
+_NON_WORD_RE = re.compile(r"[^a-z0-9 ]+")
+MIN_STEM = 3          # shortest stem left by vowel stripping and elision
+MIN_SUFFIX_STEM = 4   # shortest stem left by suffix stripping: salami is not sal(t)
+
+FUZZY_CANDIDATES = 8        # keys with the most shared trigrams that get scored
+FUZZY_THRESHOLD = 0.8       # difflib ratio of the stemmed forms
+FUZZY_THRESHOLD_SHORT = 0.85  # the same for words under FUZZY_SHORT_KEY letters
+FUZZY_SHORT_KEY = 6
+FUZZY_LENGTH_RATIO = 0.75   # shorter / longer length of the mistyped word
+MEMO_SIZE = 50_000          # distinct spellings remembered (lexicon forms are always kept)
+
+
+def fold(text: str) -> str:
+    """'  Cibuľa, červená ' -> 'cibula cervena'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_NON_WORD_RE.sub(" ", ascii_text).split())
+
+
+def _stem_token(token: str) -> str:
+    stem = _SUFFIX_RE.sub("", token)
+    if len(stem) < MIN_SUFFIX_STEM:
+        stem = token
+    stripped = _VOWELS_RE.sub("", stem)
+    if len(stripped) >= MIN_STEM:
+        stem = stripped
+    elided = _ELISION_RE.sub(r"\1\2", stem)
+    return elided if len(elided) >= MIN_STEM else stem
+
+
+def stem(folded: str) -> str:
+    """Lemmatization-lite: drop qualifiers, strip inflection from each token."""
+    tokens = [t for t in folded.split() if t not in QUALIFIERS]
+    return " ".join(_stem_token(t) for t in tokens)
+
+
+def _strip_qualifiers(folded: str) -> str:
+    # Only trailing words, and only ones that look like a known qualifier
+    tokens = folded.split()
+    while len(tokens) > 1 and any(
+        SequenceMatcher(None, tokens[-1], q).ratio() >= FUZZY_THRESHOLD for q in QUALIFIERS
+    ):
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def _one_token_apart(key: str, candidate: str) -> bool:
+    # A typo stays inside one word: "juice" is not "orange juice", "green bean"
+    # is not "kidney bean" and "creamer" is not "cream", however many
+    # characters they share.
+    tokens, other = key.split(), candidate.split()
+    if len(tokens) != len(other):
+        return False
+    differing = [(a, b) for a, b in zip(tokens, other) if a != b]
+    if len(differing) != 1:
+        return len(differing) == 0
+    a, b = differing[0]
+    threshold = FUZZY_THRESHOLD_SHORT if len(a) < FUZZY_SHORT_KEY else FUZZY_THRESHOLD
+    return min(len(a), len(b)) / max(len(a), len(b)) >= FUZZY_LENGTH_RATIO \
+        and not a.startswith(b) and SequenceMatcher(None, a, b).ratio() >= threshold
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class IngredientNormalizer:
+    def __init__(self, names: List[Tuple[str, str]]):
+        """names: (any spelling, English canonical name); earlier entries win."""
+        self.by_stem: Dict[str, str] = {}
+        self._memo: Dict[str, Optional[str]] = {}
+        for alias, english in names:
+            for form in (english, alias):
+                self._memo.setdefault(fold(form), english)
+                self.by_stem.setdefault(stem(fold(form)), english)
+        self._lexicon_size = len(self._memo)
+
+        # Trigram -> stem keys containing it
+        self._keys = list(self.by_stem)
+        self._index: Dict[str, List[int]] = {}
+        for i, key in enumerate(self._keys):
+            for gram in set(trigrams(key)):
+                self._index.setdefault(gram, []).append(i)
+        self.memo_hits = 0
+        self.fuzzy_hits = 0
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        # The trigram index narrows ~200 keys to a few candidates sharing the most
+        # trigrams; only those get the (slower) character-level similarity.
+        shared = Counter(i for gram in set(trigrams(key)) for i in self._index.get(gram, ()))
+        threshold = FUZZY_THRESHOLD_SHORT if len(key) < FUZZY_SHORT_KEY else FUZZY_THRESHOLD
+        best, best_score = None, threshold
+        for i, _ in shared.most_common(FUZZY_CANDIDATES):
+            if not _one_token_apart(key, self._keys[i]):
+                continue
+            matcher = SequenceMatcher(None, key, self._keys[i])
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best, best_score = i, score
+        return self.by_stem[self._keys[best]] if best is not None else None
+
+    def _match(self, key: str) -> Optional[str]:
+        english = self.by_stem.get(key)
+        if english is None and key:
+            english = self._fuzzy(key)
+            if english is not None:
+                self.fuzzy_hits += 1
+        return english
+
+    def translate(self, name: str) -> Optional[str]:
+        """English canonical name, or None when nothing is close enough."""
+        # The memo is keyed by the raw spelling as well, so repeats skip folding too
+        if name in self._memo:
+            self.memo_hits += 1
+            return self._memo[name]
+        folded = fold(name)
+        if folded in self._memo:
+            self.memo_hits += 1
+            english = self._memo[folded]
+        else:
+            english = self._match(stem(folded))
+            if english is None:
+                # "syr varné" – a misspelled qualifier is not part of the ingredient
+                trimmed = _strip_qualifiers(folded)
+                if trimmed != folded:
+                    english = self._match(stem(trimmed))
+            self._remember(folded, english)
+        self._remember(name, english)
+        return english
+
+    def _remember(self, spelling: str, english: Optional[str]):
+        if len(self._memo) < self._lexicon_size + MEMO_SIZE:
+            self._memo[spelling] = english
+
+    def canonical_name(self, name: str) -> str:
+        # Unknown ingredients keep their own (trimmed, lower-case) name as key
+        return self.translate(name) or " ".join(name.lower().split())
+
+
+def _lexicon() -> List[Tuple[str, str]]:
+    names = [(sk, en) for sk, en in ENGLISH_NAMES.items()]
+    # Every food in the nutrient table, with its English and Slovak aliases
+    with open(NUTRIENTS_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            names.append((row["name"], row["name"]))
+            names.extend((alias, row["name"]) for alias in row["aliases"].split("|") if alias)
+    return names
+
+
+_normalizer: Optional[IngredientNormalizer] = None
+
+
+def get_normalizer() -> IngredientNormalizer:
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = IngredientNormalizer(_lexicon())
+    return _normalizer
+
+
+def translate(name: str) -> Optional[str]:
+    return get_normalizer().translate(name)
+
+
+def canonical_name(name: str) -> str:
+    return get_normalizer().canonical_name(name)
+
+
+def known_names() -> List[str]:
+    """Every canonical English name in the lexicon, e.g. as store search terms."""
+    return sorted(set(get_normalizer().by_stem.values()))
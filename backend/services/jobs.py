@@ -0,0 +1,201 @@
+# backend/services/jobs.py
+# Background jobs for the vision routes. Instead of holding the upload request
+# open for the whole model call, a route can enqueue the work and return a job
+# id; a fixed pool of workers drains a bounded queue, and clients poll
+# GET /jobs/{id} (long-poll) or follow GET /jobs/{id}/events (SSE).
+#
+# The queue lives in this process. Job records can also be written to SQLite
+# (JOBS_DB) so that any uvicorn worker sharing the file can answer a poll and
+# finished results survive a restart.
+import asyncio
+import math
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from services import metrics
+from services.cache import LRUCache, SQLiteCache
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "64"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "180"))       # seconds one job may run
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds a job can still be fetched
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))        # job records kept in memory
+JOBS_DB = os.getenv("JOBS_DB")  # e.g. "cache/jobs.sqlite3"
+JOBS_DB_MAX_MB = 50
+
+FINAL_STATES = ("done", "error")
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, kind: str, compute: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.compute = compute
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def _update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        # Wake every waiter, then arm a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class JobQueue:
+    def __init__(self, workers: int, max_queued: int, db: Optional[SQLiteCache] = None):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+        self._jobs = LRUCache(JOB_HISTORY, JOB_RESULT_TTL)
+        self._db = db
+        self._tasks = []
+        self.avg_runtime = 10.0  # seconds, EWMA of finished jobs – seeds Retry-After
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def retry_after(self) -> int:
+        # Time until a slot frees up if the queue drains at the recent pace
+        backlog = self._queue.qsize() + 1
+        return max(1, math.ceil(backlog * self.avg_runtime / self.workers))
+
+    async def submit(self, kind: str, compute: Callable[[], Awaitable[Any]]) -> Job:
+        job = Job(kind, compute)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(self.retry_after()) from None
+        self.submitted += 1
+        self._jobs.set(job.id, job)
+        await self._persist(job)
+        return job
+
+    def get_local(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self._db is None:
+            return None
+        # Accepted by another worker process (or before a restart)
+        record = await asyncio.to_thread(self._db.get, job_id)
+        if record and record["status"] not in FINAL_STATES and time.time() - record["created"] > JOB_TIMEOUT:
+            record.update(status="error", error="Job was lost (server restarted)")
+        return record
+
+    async def _persist(self, job: Job):
+        if self._db is not None:
+            await asyncio.to_thread(self._db.set, job.id, job.to_dict())
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job._update(status="running", started=time.time())
+        await self._persist(job)
+        try:
+            result = await asyncio.wait_for(job.compute(), JOB_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.failed += 1
+            job._update(status="error", error=f"Timed out after {JOB_TIMEOUT:.0f}s", finished=time.time())
+        except Exception as e:
+            self.failed += 1
+            job._update(status="error", error=str(e), finished=time.time())
+        else:
+            self.completed += 1
+            job._update(status="done", result=result, finished=time.time())
+        job.compute = None  # drop the closure holding the image bytes
+        self.avg_runtime = 0.8 * self.avg_runtime + 0.2 * (job.finished - job.started)
+        job_seconds.observe(job.finished - job.started, job.kind, job.status)
+        await self._persist(job)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "max_queued": self._queue.maxsize,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_runtime_s": round(self.avg_runtime, 2),
+        }
+
+
+job_queue = JobQueue(
+    JOB_WORKERS,
+    JOB_QUEUE_SIZE,
+    SQLiteCache(JOBS_DB, JOB_RESULT_TTL, JOBS_DB_MAX_MB * 1024 * 1024) if JOBS_DB else None,
+)
+
+job_seconds = metrics.Histogram(
+    "fridgenutri_job_run_seconds", "Background job run time by kind and final status", ["kind", "status"],
+    buckets=metrics.MODEL_BUCKETS,
+)
+metrics.Counter(
+    "fridgenutri_jobs_total", "Background jobs by outcome", ["outcome"],
+    function=lambda: {
+        ("submitted",): job_queue.submitted,
+        ("rejected",): job_queue.rejected,
+        ("completed",): job_queue.completed,
+        ("failed",): job_queue.failed,
+    },
+)
+metrics.Gauge(
+    "fridgenutri_jobs_queued", "Background jobs waiting for a worker",
+    function=lambda: {(): job_queue._queue.qsize()},
+)
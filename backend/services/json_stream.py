@@ -0,0 +1,139 @@
+# backend/services/json_stream.py
+# Incremental parser for a JSON object arriving token by token from the model.
+# Reports each top-level field as soon as its value is complete, and each
+# element of a top-level array as soon as that element is complete, so the
+# streaming endpoints can act on "recognized_dish" or a single ingredient long
+# before the full response has arrived.
+import json
+from typing import Any, List, Tuple
+
+Event = Tuple[str, str, Any]  # ("field" | "item", top-level key, parsed value)
+
+
+class JSONStreamParser:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._phase = "key"        # key | colon | value | primitive | after_value
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._item_start = None
+        self._item_kind = None     # container | string | primitive
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    def feed(self, text: str) -> List[Event]:
+        self._buf += text
+        events = []
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            if self.done:
+                break
+            self._step(buf, i, events)
+        self._pos = len(buf)
+        return events
+
+    def _in_top_array(self) -> bool:
+        return len(self._stack) == 2 and self._stack[-1] == "["
+
+    def _step(self, buf: str, i: int, events: List[Event]):
+        c = buf[i]
+        depth = len(self._stack)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                self._string_closed(buf, i, events)
+            return
+
+        if depth == 0:
+            # Skip anything before the opening brace (e.g. a ```json fence)
+            if c == "{":
+                self._stack.append(c)
+            return
+
+        if depth == 1:
+            self._top_level(buf, i, c, events)
+            return
+
+        # Inside a top-level container value
+        if self._in_top_array():
+            if self._item_kind == "primitive" and c in ",]":
+                events.append(("item", self._key, json.loads(buf[self._item_start:i])))
+                self._item_start = self._item_kind = None
+            elif self._item_start is None and not c.isspace() and c not in ",]":
+                self._item_start = i
+                self._item_kind = "container" if c in "{[" else "string" if c == '"' else "primitive"
+
+        if c == '"':
+            self._in_string = True
+        elif c in "{[":
+            self._stack.append(c)
+        elif c in "}]":
+            self._stack.pop()
+            if len(self._stack) == 1:
+                events.append(("field", self._key, json.loads(buf[self._value_start:i + 1])))
+                self._phase = "after_value"
+            elif self._in_top_array() and self._item_kind == "container":
+                events.append(("item", self._key, json.loads(buf[self._item_start:i + 1])))
+                self._item_start = self._item_kind = None
+
+    def _top_level(self, buf: str, i: int, c: str, events: List[Event]):
+        phase = self._phase
+        if phase == "key":
+            if c == '"':
+                self._in_string = True
+                self._key_start = i
+            elif c == "}":
+                self._finish()
+        elif phase == "colon":
+            if c == ":":
+                self._phase = "value"
+        elif phase == "value":
+            if c.isspace():
+                return
+            self._value_start = i
+            if c in "{[":
+                self._stack.append(c)
+            elif c == '"':
+                self._in_string = True
+            else:
+                self._phase = "primitive"
+        elif phase == "primitive":
+            if c in ",}":
+                events.append(("field", self._key, json.loads(buf[self._value_start:i])))
+                self._phase = "key"
+                if c == "}":
+                    self._finish()
+        elif phase == "after_value":
+            if c == ",":
+                self._phase = "key"
+            elif c == "}":
+                self._finish()
+
+    def _string_closed(self, buf: str, i: int, events: List[Event]):
+        depth = len(self._stack)
+        if depth == 1 and self._phase == "key":
+            self._key = json.loads(buf[self._key_start:i + 1])
+            self._phase = "colon"
+        elif depth == 1 and self._phase == "value":
+            events.append(("field", self._key, json.loads(buf[self._value_start:i + 1])))
+            self._phase = "after_value"
+        elif self._in_top_array() and self._item_kind == "string":
+            events.append(("item", self._key, json.loads(buf[self._item_start:i + 1])))
+            self._item_start = self._item_kind = None
+
+    def _finish(self):
+        self._stack.pop()
+        self.done = True
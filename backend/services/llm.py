@@ -0,0 +1,375 @@
+# backend/services/llm.py
+# Shared async OpenAI client used by every vision service.
+# One pooled connection, bounded concurrency and retries with jittered backoff,
+# so a slow GPT-4o call never blocks the event loop for other requests.
+# Calls with images are sent with a streamed body: the image is base64-encoded
+# block by block while the request goes out, instead of the SDK building the
+# whole JSON (base64 string included) in memory first.
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import time
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+from openai.types.chat import ChatCompletion
+from pydantic import BaseModel
+from services import metrics
+
+load_dotenv()
+
+VISION_MODEL = os.getenv("OPENAI_VISION_MODEL", "gpt-4o-2024-08-06")
+
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+CONNECT_TIMEOUT = 10.0
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.5   # seconds
+RETRY_MAX_DELAY = 8.0    # seconds
+STREAM_REQUEST_BODY = os.getenv("OPENAI_STREAM_BODY", "1") == "1"
+BASE64_BLOCK = 48 * 1024  # raw bytes per base64 block; a multiple of 3, so blocks concatenate cleanly
+
+_client = None
+_http_client = None
+parse_successes = Counter()  # schema name -> responses that validated
+parse_failures = Counter()   # schema name -> responses that did not
+_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+def _percentile_ms(sorted_samples: List[float], q: float) -> Optional[float]:
+    if not sorted_samples:
+        return None
+    return round(sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))] * 1000, 1)
+
+
+class UsageStats:
+    """Token usage and latency of one analysis mode ("fridge", "combined:dish+recipes", ...)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=500)  # seconds, including retries and queueing
+
+    def record(self, usage, elapsed: float):
+        self.calls += 1
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        self.latencies.append(elapsed)
+
+    def snapshot(self) -> Dict:
+        lat = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.calls) if self.calls else 0,
+            "avg_completion_tokens": round(self.completion_tokens / self.calls) if self.calls else 0,
+            "latency_p50_ms": _percentile_ms(lat, 0.5),
+            "latency_p95_ms": _percentile_ms(lat, 0.95),
+        }
+
+
+usage_stats: Dict[str, UsageStats] = defaultdict(UsageStats)
+
+llm_requests = metrics.Counter("fridgenutri_llm_requests_total", "Model calls by mode and outcome", ["mode", "outcome"])
+llm_seconds = metrics.Histogram(
+    "fridgenutri_llm_request_seconds", "Model call latency including retries and queueing", ["mode"],
+    buckets=metrics.MODEL_BUCKETS,
+)
+llm_tokens = metrics.Counter("fridgenutri_llm_tokens_total", "Tokens used by mode", ["mode", "kind"])
+llm_retries = metrics.Counter("fridgenutri_llm_retries_total", "Retried model calls by mode", ["mode"])
+llm_in_flight = metrics.Gauge("fridgenutri_llm_in_flight", "Model calls holding a concurrency slot")
+llm_waiting = metrics.Gauge("fridgenutri_llm_waiting", "Model calls waiting for a concurrency slot")
+metrics.Counter(
+    "fridgenutri_llm_parse_total", "Structured-output replies by schema and result", ["schema", "result"],
+    function=lambda: {
+        **{(schema, "ok"): n for schema, n in parse_successes.items()},
+        **{(schema, "invalid"): n for schema, n in parse_failures.items()},
+    },
+)
+
+
+def _record(mode: str, usage, start: float, outcome: str = "ok"):
+    elapsed = time.perf_counter() - start
+    llm_requests.inc(mode, outcome)
+    llm_seconds.observe(elapsed, mode)
+    if outcome != "ok":
+        return
+    usage_stats[mode].record(usage, elapsed)
+    if usage is not None:
+        llm_tokens.inc(mode, "prompt", amount=usage.prompt_tokens or 0)
+        llm_tokens.inc(mode, "completion", amount=usage.completion_tokens or 0)
+
+
+def get_client() -> AsyncOpenAI:
+    global _client, _http_client
+    if _client is None:
+        _http_client = http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY * 2,
+                max_keepalive_connections=MAX_CONCURRENCY,
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=0,  # retries are handled below, outside the semaphore
+            http_client=http_client,
+        )
+    return _client
+
+
+async def close_client():
+    global _client, _http_client
+    if _client is not None:
+        await _client.close()
+        _client = _http_client = None
+
+
+class InlineImage:
+    """Image bytes for an image_url part, base64-encoded only as the request is sent.
+
+    Stands in for the "data:image/jpeg;base64,..." URL string in the messages.
+    """
+    __slots__ = ("data", "mime")
+
+    def __init__(self, data: bytes, mime: str = "image/jpeg"):
+        self.data = data
+        self.mime = mime
+
+    def _json_prefix(self) -> bytes:
+        return f'"data:{self.mime};base64,'.encode()
+
+    def json_length(self) -> int:
+        return len(self._json_prefix()) + (len(self.data) + 2) // 3 * 4 + 1
+
+    def iter_json(self) -> Iterator[bytes]:
+        """The data URL as a JSON string, in blocks."""
+        yield self._json_prefix()
+        view = memoryview(self.data)
+        for i in range(0, len(view), BASE64_BLOCK):
+            yield base64.b64encode(view[i:i + BASE64_BLOCK])
+        yield b'"'
+
+    def data_url(self) -> str:
+        with metrics.span("base64_encode"):
+            return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+def _has_inline_image(value: Any) -> bool:
+    if isinstance(value, InlineImage):
+        return True
+    if isinstance(value, dict):
+        return any(_has_inline_image(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_inline_image(v) for v in value)
+    return False
+
+
+def _materialize(value: Any) -> Any:
+    # For the SDK: every InlineImage replaced by its data URL string
+    if isinstance(value, InlineImage):
+        return value.data_url()
+    if isinstance(value, dict):
+        return {k: _materialize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_materialize(v) for v in value]
+    return value
+
+
+_IMAGE_PLACEHOLDER = re.compile(rb'"__inline_image_(\d+)__"')
+
+
+def _body_parts(body: Dict) -> Tuple[List[Union[bytes, InlineImage]], int]:
+    """The JSON body split around its images, and its exact length for Content-Length."""
+    images = []
+
+    def placeholder(obj):
+        if isinstance(obj, InlineImage):
+            images.append(obj)
+            return f"__inline_image_{len(images) - 1}__"
+        raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+    encoded = json.dumps(body, default=placeholder, ensure_ascii=False).encode()
+    parts, pos = [], 0
+    for match in _IMAGE_PLACEHOLDER.finditer(encoded):
+        parts += [encoded[pos:match.start()], images[int(match.group(1))]]
+        pos = match.end()
+    parts.append(encoded[pos:])
+    return parts, sum(len(p) if isinstance(p, bytes) else p.json_length() for p in parts)
+
+
+async def _create_streamed(client: AsyncOpenAI, timeout: float, body: Dict) -> ChatCompletion:
+    """POST /chat/completions with a streamed body; raises the same errors the SDK would."""
+    parts, length = _body_parts(body)
+
+    async def content():
+        with metrics.span("base64_encode"):  # spread over the upload, not one blocking call
+            for part in parts:
+                if isinstance(part, bytes):
+                    yield part
+                else:
+                    for block in part.iter_json():
+                        yield block
+
+    headers = {k: v for k, v in client.default_headers.items() if isinstance(v, str)}
+    headers["Content-Length"] = str(length)
+    try:
+        response = await _http_client.post(
+            client.base_url.join("chat/completions"), content=content(), headers=headers, timeout=timeout,
+        )
+    except httpx.TimeoutException as e:
+        raise APITimeoutError(request=e.request) from e
+    except httpx.TransportError as e:
+        raise APIConnectionError(request=e.request) from e
+    if response.is_error:
+        try:
+            error = response.json()
+        except ValueError:
+            error = response.text
+        raise APIStatusError(f"Error code: {response.status_code} - {error}", response=response, body=error)
+    return ChatCompletion.model_validate(response.json())
+
+
+def _is_retryable(exc: Exception) -> bool:
+    # APITimeoutError is a subclass of APIConnectionError
+    if isinstance(exc, APIConnectionError):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    # Honour Retry-After from a 429 when the API sends one
+    if isinstance(exc, APIStatusError):
+        retry_after = exc.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+    # Full jitter: spread retries so parallel callers don't hit the API in lockstep
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def chat_completion(timeout: float = None, mode: str = "other", **kwargs):
+    kwargs.setdefault("model", VISION_MODEL)
+    client = get_client()
+    start = time.perf_counter()
+    streamed = STREAM_REQUEST_BODY and _has_inline_image(kwargs.get("messages"))
+    if not streamed:
+        kwargs["messages"] = _materialize(kwargs.get("messages"))
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with llm_waiting.track():
+                await _semaphore.acquire()
+            try:
+                with llm_in_flight.track():
+                    if streamed:
+                        response = await _create_streamed(client, timeout or REQUEST_TIMEOUT, kwargs)
+                    else:
+                        response = await client.chat.completions.create(
+                            timeout=timeout or REQUEST_TIMEOUT, **kwargs
+                        )
+            finally:
+                _semaphore.release()
+            _record(mode, response.usage, start)
+            return response
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                _record(mode, None, start, outcome="error")
+                raise
+            llm_retries.inc(mode)
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+
+async def chat_completion_stream(timeout: float = None, mode: str = "other", **kwargs) -> AsyncIterator[str]:
+    """Yield content deltas as the model produces them.
+
+    Retries only cover opening the stream; once tokens have been yielded a
+    failure is raised to the caller.
+    """
+    kwargs.setdefault("model", VISION_MODEL)
+    # The last chunk then carries token usage (with empty choices)
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    # Streamed answers go through the SDK's SSE parsing, so images are inlined as strings here
+    kwargs["messages"] = _materialize(kwargs.get("messages"))
+    client = get_client()
+    start = time.perf_counter()
+
+    for attempt in range(MAX_RETRIES + 1):
+        with llm_waiting.track():
+            await _semaphore.acquire()
+        llm_in_flight.inc()
+        try:
+            stream = await client.chat.completions.create(
+                stream=True, timeout=timeout or REQUEST_TIMEOUT, **kwargs
+            )
+            break
+        except BaseException as e:  # includes cancellation – never leak the slot
+            llm_in_flight.dec()
+            _semaphore.release()
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                _record(mode, None, start, outcome="error")
+                raise
+            llm_retries.inc(mode)
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+    usage = None
+    outcome = "error"
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = "ok"
+    finally:
+        llm_in_flight.dec()
+        _semaphore.release()
+        _record(mode, usage, start, outcome)
+        await stream.close()
+
+
+@lru_cache(maxsize=None)
+def response_format(schema: Type[BaseModel]) -> dict:
+    # Structured outputs: the API guarantees the reply matches this JSON schema
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "strict": True, "schema": schema.model_json_schema()},
+    }
+
+
+def parse_content(content: Optional[str], schema: Type[BaseModel]) -> dict:
+    """Validate a structured-output reply; raises ValueError (and counts it) on failure."""
+    try:
+        if content is None:
+            raise ValueError("Model returned no content (refusal or length cut-off)")
+        with metrics.span("json_parse"):
+            result = schema.model_validate_json(content).model_dump()
+    except ValueError:
+        parse_failures[schema.__name__] += 1
+        raise
+    parse_successes[schema.__name__] += 1
+    return result
+
+
+def get_llm_stats() -> dict:
+    return {
+        "parse_successes": dict(parse_successes),
+        "parse_failures": dict(parse_failures),
+        "max_concurrency": MAX_CONCURRENCY,
+        "usage_by_mode": {mode: stats.snapshot() for mode, stats in sorted(usage_stats.items())},
+    }
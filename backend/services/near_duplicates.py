@@ -0,0 +1,218 @@
+# backend/services/near_duplicates.py
+# Near-identical photos from the same user reuse the previous analysis.
+# The same fridge photographed every day differs in lighting, angle or one
+# moved item, so the exact-bytes cache key (services/cache.py) never matches.
+# Each analysed photo gets a 64-bit difference hash (dHash), computed in a
+# thread; a BK-tree per session and analysis kind finds the closest earlier
+# photo by Hamming distance.
+#   distance <= NEAR_DUPLICATE_DISTANCE       -> previous result, no model call
+#   distance <= NEAR_DUPLICATE_DIFF_DISTANCE  -> fresh analysis, plus what
+#                                                changed in the ingredient list
+# The index lives in process memory: with several workers a repeat photo only
+# matches on the worker that saw the earlier one.
+import asyncio
+import copy
+import io
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from PIL import Image
+from services import metrics
+from services.cache import LRUCache
+from services.ingredients import canonical_name
+from services.metrics import span
+
+load_dotenv()
+
+NEAR_DUPLICATES = os.getenv("NEAR_DUPLICATES", "1") == "1"
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "6"))  # differing bits out of 64
+NEAR_DUPLICATE_DIFF_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DIFF_DISTANCE", "16"))
+NEAR_DUPLICATE_TTL = float(os.getenv("NEAR_DUPLICATE_TTL", str(3 * 24 * 3600)))  # seconds
+NEAR_DUPLICATE_PER_USER = 20  # photos remembered per session and kind
+NEAR_DUPLICATE_USERS = int(os.getenv("NEAR_DUPLICATE_USERS", "10000"))
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes: bytes, size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a
+    (size+1) x size greyscale thumbnail, set where brightness increases."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("L", (size * 16, size * 16))  # JPEGs decode at 1/8 scale, enough for a 9x8 thumbnail
+    pixels = img.convert("L").resize((size + 1, size), Image.Resampling.BOX).tobytes()
+    bits = 0
+    for row in range(size):
+        line = pixels[row * (size + 1):(row + 1) * (size + 1)]
+        for left, right in zip(line, line[1:]):
+            bits = (bits << 1) | (right > left)
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over Hamming distance: a node's children are keyed by their
+    distance to it, so a search only descends into children whose key is within
+    `max_distance` of the query's distance to that node."""
+
+    def __init__(self):
+        self._root: Optional[Tuple[int, Any, Dict[int, tuple]]] = None
+        self._size = 0
+
+    def add(self, bits: int, value: Any):
+        self._size += 1
+        if self._root is None:
+            self._root = (bits, value, {})
+            return
+        node = self._root
+        while True:
+            d = hamming(bits, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (bits, value, {})
+                return
+            node = child
+
+    def search(self, bits: int, max_distance: int) -> Iterator[Tuple[int, Any]]:
+        """(distance, value) of every entry within `max_distance`, unordered."""
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node_bits, value, children = stack.pop()
+            d = hamming(bits, node_bits)
+            if d <= max_distance:
+                yield d, value
+            for key, child in children.items():
+                if d - max_distance <= key <= d + max_distance:
+                    stack.append(child)
+
+    def __len__(self):
+        return self._size
+
+
+class PhotoHistory:
+    """One session's analysed photos of one kind, newest last."""
+
+    def __init__(self):
+        self.entries: List[Tuple[int, float, Any]] = []  # (hash, analysed at, result)
+        self.tree = BKTree()
+
+    def nearest(self, bits: int, max_distance: int, now: float) -> Optional[Tuple[int, float, Any]]:
+        best = None
+        for d, (at, result) in self.tree.search(bits, max_distance):
+            if now - at >= NEAR_DUPLICATE_TTL:
+                continue
+            # Ties go to the newer analysis
+            if best is None or (d, -at) < (best[0], -best[1]):
+                best = (d, at, result)
+        return best
+
+    def add(self, bits: int, result: Any, now: float):
+        self.entries.append((bits, now, result))
+        if len(self.entries) <= NEAR_DUPLICATE_PER_USER:
+            self.tree.add(bits, (now, result))
+            return
+        # A BK-tree has no delete; with a few dozen photos rebuilding is cheap
+        self.entries = self.entries[-NEAR_DUPLICATE_PER_USER:]
+        self.tree = BKTree()
+        for entry_bits, at, entry in self.entries:
+            self.tree.add(entry_bits, (at, entry))
+
+
+def ingredient_changes(previous: Dict, current: Dict) -> Dict:
+    """Ingredients added, removed or with a different amount since `previous`."""
+    before = {canonical_name(i["name"]): i for i in previous.get("ingredients", [])}
+    after = {canonical_name(i["name"]): i for i in current.get("ingredients", [])}
+    return {
+        "added": [after[k] for k in after if k not in before],
+        "removed": [before[k] for k in before if k not in after],
+        "changed": [{"name": after[k]["name"], "before": before[k].get("amount"), "after": after[k].get("amount")}
+                    for k in after if k in before and after[k].get("amount") != before[k].get("amount")],
+    }
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_users: int = NEAR_DUPLICATE_USERS, ttl: float = NEAR_DUPLICATE_TTL):
+        self._histories = LRUCache(max_users, ttl)
+        self.hits = 0
+        self.diffs = 0
+        self.misses = 0
+        self.hash_errors = 0
+
+    def _history(self, sid: str, kind: str) -> PhotoHistory:
+        key = f"{sid}:{kind}"
+        history = self._histories.get(key)
+        if history is None:
+            history = PhotoHistory()
+        # Re-set on every use so an active session does not expire
+        self._histories.set(key, history)
+        return history
+
+    async def analyze(self, sid: str, kind: str, image_bytes: bytes,
+                      compute: Callable[[], Awaitable[Any]], fresh: bool = False) -> Any:
+        """The previous result for a near-identical photo of this session, or
+        `compute()` (annotated with ingredient changes if the photo is similar)."""
+        try:
+            with span("near_duplicate_hash"):
+                bits = await asyncio.to_thread(dhash, image_bytes)
+        except Exception:
+            # Not decodable here: analyse normally
+            self.hash_errors += 1
+            return await compute()
+
+        history = self._history(sid, kind)
+        now = time.time()
+        nearest = history.nearest(bits, max(NEAR_DUPLICATE_DISTANCE, NEAR_DUPLICATE_DIFF_DISTANCE), now)
+        if nearest is not None and nearest[0] <= NEAR_DUPLICATE_DISTANCE and not fresh:
+            self.hits += 1
+            distance, at, previous = nearest
+            result = copy.deepcopy(previous)
+            result["near_duplicate"] = {"distance": distance, "analyzed_at": round(at)}
+            return result
+
+        self.misses += 1
+        result = await compute()
+        if not isinstance(result, dict) or "error" in result:
+            return result
+        history.add(bits, copy.deepcopy(result), now)
+        if nearest is not None and "ingredients" in result:
+            self.diffs += 1
+            result = {**result, "changes": {"distance": nearest[0], "analyzed_at": round(nearest[1]),
+                                            **ingredient_changes(nearest[2], result)}}
+        return result
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": NEAR_DUPLICATES,
+            "max_distance": NEAR_DUPLICATE_DISTANCE,
+            "hits": self.hits,
+            "diffs": self.diffs,
+            "misses": self.misses,
+            "hash_errors": self.hash_errors,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "histories": len(self._histories),
+        }
+
+
+near_duplicates = NearDuplicateIndex()
+
+metrics.Counter(
+    "fridgenutri_near_duplicate_lookups_total", "Per-session perceptual-hash lookups by result", ["result"],
+    function=lambda: {
+        ("reused",): near_duplicates.hits,
+        ("diffed",): near_duplicates.diffs,
+        ("analysed",): near_duplicates.misses - near_duplicates.diffs,
+        ("hash_error",): near_duplicates.hash_errors,
+    },
+)
+
+
+async def near_duplicate_analysis(sid: str, kind: str, image_bytes: bytes,
+                                  compute: Callable[[], Awaitable[Any]], fresh: bool = False) -> Any:
+    if not NEAR_DUPLICATES:
+        return await compute()
+    return await near_duplicates.analyze(sid, kind, image_bytes, compute, fresh)
@@ -0,0 +1,242 @@
+# backend/services/nutrition.py
+# Local nutrient engine: recipe macros and micronutrients are computed from a
+# bundled food-composition table (data/nutrients.csv, values per 100 g) instead
+# of being generated by GPT-4o. The table is held as one float32 matrix
+# (foods x nutrients), so a whole batch of recipes is a single matrix product.
+import csv
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.metrics import span
+from services.recipes import DAILY_NUTRIENTS
+
+NUTRIENTS_CSV = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "nutrients.csv")
+
+MACRO_KEYS = ["calories", "protein", "carbs", "fat", "sugar_g"]
+# The twelve micronutrient keys the recipes and DAILY_NUTRIENTS use (protein is a macro)
+MICRO_KEYS = [k for k in DAILY_NUTRIENTS if k != "protein"]
+NUTRIENT_KEYS = MACRO_KEYS + MICRO_KEYS
+
+DEFAULT_PORTION_G = 100.0
+
+# unit -> (grams, millilitres); exactly one is set
+UNITS = {
+    "mg": (0.001, None), "g": (1.0, None), "gram": (1.0, None), "grams": (1.0, None),
+    "dkg": (10.0, None), "kg": (1000.0, None),
+    "ml": (None, 1.0), "cl": (None, 10.0), "dl": (None, 100.0), "l": (None, 1000.0),
+    "liter": (None, 1000.0), "liters": (None, 1000.0), "litre": (None, 1000.0), "litres": (None, 1000.0),
+    "tsp": (None, 5.0), "teaspoon": (None, 5.0), "teaspoons": (None, 5.0),
+    "tbsp": (None, 15.0), "tablespoon": (None, 15.0), "tablespoons": (None, 15.0),
+    "cup": (None, 240.0), "cups": (None, 240.0),
+    "pinch": (0.5, None), "can": (400.0, None), "cans": (400.0, None),
+    "pack": (250.0, None), "packs": (250.0, None), "portion": (150.0, None), "portions": (150.0, None),
+}
+# Counted units: the food's own piece weight is used
+PIECE_UNITS = {
+    "piece", "pieces", "pcs", "pc", "ks", "head", "heads", "clove", "cloves", "slice", "slices",
+    "fillet", "fillets", "stalk", "stalks", "bunch", "whole",
+}
+# Counted units that mean something besides "pieces", singular. Containers
+# have a typical weight in UNITS for nutrition, but are counted when summing.
+_CONTAINER_UNITS = {"pinch", "can", "cans", "pack", "packs", "portion", "portions"}
+_COUNT_UNITS = {unit: unit.rstrip("s") for unit in PIECE_UNITS | _CONTAINER_UNITS
+                if unit not in ("piece", "pieces", "pcs", "pc", "ks", "whole")}
+_ARTICLE_RE = re.compile(r"^an?\s+(?!dozen)(?=[a-z])", re.IGNORECASE)
+_WORD_QTY = {"half": 0.5, "dozen": 12.0, "a dozen": 12.0, "a": 1.0, "an": 1.0, "one": 1.0,
+             "two": 2.0, "three": 3.0, "four": 4.0, "five": 5.0, "six": 6.0}
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75}
+
+_unit_alt = "|".join(sorted(list(UNITS) + list(PIECE_UNITS), key=len, reverse=True))
+_qty_alt = r"\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?|[½¼¾]|a dozen|dozen|half|one|two|three|four|five|six"
+AMOUNT_RE = re.compile(rf"(?P<qty>{_qty_alt})?\s*(?P<unit>{_unit_alt})?\.?", re.IGNORECASE)
+_TRAILING_AMOUNT_RE = re.compile(rf"^(?P<name>.+?)\s+(?P<amount>(?:{_qty_alt})\s*(?:{_unit_alt})?\.?)$",
+                                 re.IGNORECASE)
+_LEADING_AMOUNT_RE = re.compile(rf"^(?P<amount>(?:{_qty_alt})\s*(?:{_unit_alt})?\.?)\s+(?:of\s+)?(?P<name>.+)$",
+                                re.IGNORECASE)
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().replace(",", " ").split())
+
+
+class NutrientTable:
+    def __init__(self, path: str = NUTRIENTS_CSV):
+        names, piece_g, density, rows = [], [], [], []
+        self.index: Dict[str, int] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                i = len(names)
+                names.append(row["name"])
+                piece_g.append(float(row["piece_g"]) if row["piece_g"] else np.nan)
+                density.append(float(row["density_g_ml"]) if row["density_g_ml"] else 1.0)
+                rows.append([float(row[k] or 0) for k in NUTRIENT_KEYS])
+                for alias in [row["name"]] + [a for a in row["aliases"].split("|") if a]:
+                    self.index.setdefault(_normalize(alias), i)
+
+        self.names = names
+        self.piece_g = np.array(piece_g, dtype=np.float32)
+        self.density = np.array(density, dtype=np.float32)
+        self.per_100g = np.array(rows, dtype=np.float32)  # foods x NUTRIENT_KEYS
+        self._memo: Dict[str, Optional[int]] = {}
+
+    def _lookup(self, key: str) -> Optional[int]:
+        row = self.index.get(key)
+        if row is None and key.endswith("es"):
+            row = self.index.get(key[:-2])
+        if row is None and key.endswith("s"):
+            row = self.index.get(key[:-1])
+        return row
+
+    def match(self, name: str) -> Optional[int]:
+        key = _normalize(name)
+        if key in self._memo:
+            return self._memo[key]
+        row = self._lookup(key)
+        if row is None:
+            # The food is the head noun, and only when every other word just
+            # describes it: "fresh broccoli", "garlic cloves, minced" -> garlic
+            # cloves. "peanut butter" and "cream cheese" stay unmatched.
+            from services.ingredients import QUALIFIERS  # it imports this module
+            tokens = key.split()
+            while len(tokens) > 1 and tokens[-1] in QUALIFIERS:
+                tokens.pop()
+            start = 0
+            while row is None and start < len(tokens):
+                row = self._lookup(" ".join(tokens[start:]))
+                if tokens[start] not in QUALIFIERS:
+                    break
+                start += 1
+        self._memo[key] = row
+        return row
+
+    def grams(self, amount: str, row: int) -> float:
+        return parse_amount(amount, float(self.piece_g[row]), float(self.density[row]))
+
+
+def _quantity(amount: str) -> Optional[Tuple[float, str, str]]:
+    """'1.5L' -> (1.5, 'l', ''), '2 jars' -> (2.0, '', 'jars'), unparseable -> None."""
+    match = AMOUNT_RE.match(amount.strip()) if amount else None
+    if not match or not (match.group("qty") or match.group("unit")):
+        return None
+
+    qty_text = (match.group("qty") or "1").lower().replace(",", ".")
+    if qty_text in _WORD_QTY:
+        qty = _WORD_QTY[qty_text]
+    elif qty_text in _FRACTIONS:
+        qty = _FRACTIONS[qty_text]
+    elif "/" in qty_text:
+        num, den = qty_text.replace(" ", "").split("/")
+        qty = float(num) / float(den) if float(den) else 1.0
+    else:
+        qty = float(qty_text)
+    return qty, (match.group("unit") or "").lower(), amount.strip()[match.end():].strip().lower()
+
+
+def parse_amount(amount: str, piece_g: float = float("nan"), density: float = 1.0) -> float:
+    """'1.5L' / '300 g' / 'dozen' / '3 heads' / '6' -> grams."""
+    quantity = _quantity(amount)
+    if quantity is None:
+        return DEFAULT_PORTION_G
+
+    qty, unit, _ = quantity
+    if unit in UNITS:
+        grams, millilitres = UNITS[unit]
+        return qty * grams if grams is not None else qty * millilitres * density
+    # Bare count ("6", "dozen") or counted unit ("3 heads")
+    return qty * (piece_g if not np.isnan(piece_g) else DEFAULT_PORTION_G)
+
+
+def measure(amount: str) -> Optional[Tuple[float, str]]:
+    """'1.5L' -> (1500.0, 'ml'), '300 g' -> (300.0, 'g'), 'dozen' -> (12.0, 'pcs'),
+    '3 heads' / 'a head' -> (count, 'head'), '2 packs' -> (2.0, 'pack'), '2 jars' ->
+    (2.0, 'jar'). Only real mass and volume units are converted. None when there is
+    no recognisable quantity ('some')."""
+    quantity = _quantity(_ARTICLE_RE.sub("1 ", amount.strip()) if amount else amount)
+    if quantity is None:
+        return None
+    qty, unit, rest = quantity
+    if unit in _COUNT_UNITS:
+        return qty, _COUNT_UNITS[unit]
+    if unit in UNITS:
+        grams, millilitres = UNITS[unit]
+        return (qty * grams, "g") if grams is not None else (qty * millilitres, "ml")
+    if not unit and rest.isalpha():
+        return qty, rest.rstrip("s")  # a container the unit table does not know
+    if rest:
+        return None
+    return qty, "pcs"
+
+
+def format_measure(value: float, dimension: str) -> str:
+    """Inverse of measure(), in the largest sensible unit: (1500, 'ml') -> '1.5L'."""
+    if dimension == "pcs":
+        return f"{value:g}"
+    if dimension not in ("g", "ml"):
+        return f"{value:g} {dimension}{'' if value == 1 else 'es' if dimension.endswith('ch') else 's'}"
+    if dimension == "g":
+        return f"{value / 1000:g}kg" if value >= 1000 else f"{value:g}g"
+    return f"{value / 1000:g}L" if value >= 1000 else f"{value:g}ml"
+
+
+def split_ingredient(text: str) -> Tuple[str, str]:
+    """'chicken thighs 600g' / '600 g chicken thighs' -> ('chicken thighs', '600g')."""
+    text = text.strip()
+    for pattern in (_TRAILING_AMOUNT_RE, _LEADING_AMOUNT_RE):
+        match = pattern.match(text)
+        if match:
+            return match.group("name").strip(), match.group("amount").strip()
+    return text, ""
+
+
+_table: Optional[NutrientTable] = None
+
+
+def get_table() -> NutrientTable:
+    global _table
+    if _table is None:
+        _table = NutrientTable()
+    return _table
+
+
+def quantity_matrix(recipes: List[List[Tuple[str, str]]], table: NutrientTable) -> Tuple[np.ndarray, List[List[str]]]:
+    """recipes x foods matrix of amounts in units of 100 g, plus unmatched names per recipe."""
+    quantities = np.zeros((len(recipes), len(table.names)), dtype=np.float32)
+    unmatched = []
+    for r, ingredients in enumerate(recipes):
+        missing = []
+        for name, amount in ingredients:
+            row = table.match(name)
+            if row is None:
+                missing.append(name)
+                continue
+            quantities[r, row] += table.grams(amount, row) / 100.0
+        unmatched.append(missing)
+    return quantities, unmatched
+
+
+def compute_nutrition(recipes: List[List[Tuple[str, str]]]) -> Tuple[np.ndarray, List[List[str]]]:
+    """(recipes x NUTRIENT_KEYS) totals for a batch of (name, amount) lists."""
+    table = get_table()
+    quantities, unmatched = quantity_matrix(recipes, table)
+    return quantities @ table.per_100g, unmatched
+
+
+def _round(value: float) -> float:
+    # Keep µg-scale vitamins readable without float32 noise on the large minerals
+    return round(value, 1) if value >= 10 else round(value, 4)
+
+
+@span("nutrition")
+def fill_recipe_nutrition(recipes: List[Dict]) -> List[Dict]:
+    """Set 'macros' and 'micronutrients' on each recipe from its 'ingredients_used'."""
+    parsed = [[split_ingredient(text) for text in recipe.get("ingredients_used", [])] for recipe in recipes]
+    totals, unmatched = compute_nutrition(parsed)
+    for recipe, values, missing in zip(recipes, totals.tolist(), unmatched):
+        by_key = dict(zip(NUTRIENT_KEYS, values))
+        recipe["macros"] = {k: round(by_key[k], 1) for k in MACRO_KEYS}
+        recipe["micronutrients"] = {k: _round(by_key[k]) for k in MICRO_KEYS}
+        recipe["nutrition_unmatched"] = missing
+    return recipes
@@ -1,123 +1,431 @@
 # backend/services/prices.py
 import aiohttp
 import asyncio
-import re
-from typing import List, Dict
+import logging
+import os
+import time
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from services import metrics
+from services.cache import LRUCache, SQLiteCache, SingleFlight
+from services.catalog import price_catalog
+from services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker
+from services.shopping_list import generate_shopping_list, merge_shopping_lists, normalize_name
+from services.store_adapters import HEADERS, STORE_ADAPTERS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Price cache: bounded LRU, optional SQLite tier (PRICE_CACHE_DB) shared by all
+# uvicorn workers and kept across restarts.
+CACHE_TTL = 300              # seconds a found price is fresh
+NEGATIVE_CACHE_TTL = 60      # seconds a "—" miss is trusted before retrying the stores
+STALE_TTL = 3600             # seconds a stale price is still served while refreshing in the background
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", "5000"))
+PRICE_CACHE_DB = os.getenv("PRICE_CACHE_DB")  # e.g. "cache/prices.sqlite3"
+PRICE_CACHE_DB_MAX_MB = 20
+
+_price_cache = LRUCache(PRICE_CACHE_SIZE, CACHE_TTL + STALE_TTL)
+_price_db = (
+    SQLiteCache(PRICE_CACHE_DB, CACHE_TTL + STALE_TTL, PRICE_CACHE_DB_MAX_MB * 1024 * 1024)
+    if PRICE_CACHE_DB else None
+)
+_price_flight = SingleFlight()
+_refresh_tasks = set()
+cache_stats = {"hits": 0, "stale_hits": 0, "negative_hits": 0, "misses": 0, "refreshes": 0}
+
+# One keep-alive connection pool for the whole app lifetime (see main.py startup/shutdown)
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300      # seconds
+KEEPALIVE_TIMEOUT = 30   # seconds
+REQUEST_TIMEOUT = 8      # seconds, hard ceiling for any store request
+
+# "cheapest": query all stores in parallel, wait up to PRICE_DEADLINE, take the minimum
+# "first":    query all stores in parallel, return the first valid price
+PRICE_STRATEGY = os.getenv("PRICE_STRATEGY", "cheapest")
+STORE_TIMEOUT = float(os.getenv("PRICE_STORE_TIMEOUT", "4"))
+PRICE_DEADLINE = float(os.getenv("PRICE_DEADLINE", "5"))
+PRICE_BATCH_CONCURRENCY = int(os.getenv("PRICE_BATCH_CONCURRENCY", "8"))  # ingredients looked up at once
+
+# A store that keeps failing is skipped for a cooldown instead of costing every lookup its timeout
+PRICE_CIRCUIT_BREAKER = os.getenv("PRICE_CIRCUIT_BREAKER", "1") == "1"
+BREAKER_FAILURES = int(os.getenv("PRICE_BREAKER_FAILURES", "5"))         # consecutive errors/timeouts
+BREAKER_COOLDOWN = float(os.getenv("PRICE_BREAKER_COOLDOWN", "30"))      # seconds before a probe
+BREAKER_MAX_COOLDOWN = 300.0
+# Per-store timeout = 2 x its recent p95, between STORE_TIMEOUT_MIN and STORE_TIMEOUT
+PRICE_ADAPTIVE_TIMEOUT = os.getenv("PRICE_ADAPTIVE_TIMEOUT", "1") == "1"
+STORE_TIMEOUT_MIN = float(os.getenv("PRICE_STORE_TIMEOUT_MIN", "0.5"))
+# Hedging: if a store hasn't answered by its p90, send the same request again and take the first answer
+PRICE_HEDGE = os.getenv("PRICE_HEDGE", "0") == "1"
+
+_session = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def _percentile_ms(sorted_samples: List[float], q: float) -> Optional[float]:
+    if not sorted_samples:
+        return None
+    return round(sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))] * 1000, 1)
+
+
+class StoreStats:
+    def __init__(self):
+        self.requests = 0
+        self.found = 0
+        self.not_found = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.skipped = 0  # refused by the open circuit breaker
+        self.hedges = 0
+        self.latencies = deque(maxlen=500)  # seconds, most recent lookups
+
+    def snapshot(self) -> Dict:
+        lat = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "found": self.found,
+            "not_found": self.not_found,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "hedges": self.hedges,
+            "error_rate": round((self.errors + self.timeouts) / self.requests, 3) if self.requests else 0.0,
+            "latency_p50_ms": _percentile_ms(lat, 0.5),
+            "latency_p95_ms": _percentile_ms(lat, 0.95),
+        }
+
+
+store_stats = {store: StoreStats() for store in STORE_ADAPTERS}
+store_breakers = {
+    store: CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN, probe_timeout=STORE_TIMEOUT)
+    for store in STORE_ADAPTERS
+}
+store_latency = {store: LatencyTracker(STORE_TIMEOUT, floor=STORE_TIMEOUT_MIN) for store in STORE_ADAPTERS}
+
+store_requests = metrics.Counter(
+    "fridgenutri_store_requests_total", "Store price lookups by store and outcome", ["store", "outcome"],
+)
+store_seconds = metrics.Histogram("fridgenutri_store_request_seconds", "Store price lookup latency", ["store"])
+store_in_flight = metrics.Gauge("fridgenutri_store_in_flight", "Store price lookups in progress", ["store"])
+store_hedges = metrics.Counter("fridgenutri_store_hedged_requests_total", "Duplicate (hedged) store requests", ["store"])
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+metrics.Gauge(
+    "fridgenutri_store_circuit_state", "Store circuit breaker: 0 closed, 1 half-open, 2 open", ["store"],
+    function=lambda: {(store, ): _STATE_VALUES[b.state] for store, b in store_breakers.items()},
+)
+metrics.Gauge(
+    "fridgenutri_store_timeout_seconds", "Current per-store timeout", ["store"],
+    function=lambda: {(store, ): store_timeout(store) for store in STORE_ADAPTERS},
+)
+metrics.Counter(
+    "fridgenutri_price_cache_lookups_total", "Price cache lookups by result", ["result"],
+    function=lambda: {(result,): cache_stats[result] for result in ("hits", "stale_hits", "negative_hits", "misses")},
+)
+metrics.Gauge(
+    "fridgenutri_price_cache_hit_ratio", "Share of price lookups answered from the cache",
+    function=lambda: {(): get_price_cache_stats()["hit_ratio"]},
+)
+metrics.Gauge(
+    "fridgenutri_price_lookups_in_flight", "Distinct ingredients being scraped",
+    function=lambda: {(): len(_price_flight)},
+)
+
+
+def get_store_stats() -> Dict:
+    return {
+        "strategy": PRICE_STRATEGY,
+        "hedging": PRICE_HEDGE,
+        "stores": {
+            name: {
+                **s.snapshot(),
+                "timeout_s": round(store_timeout(name), 3),
+                "circuit": store_breakers[name].snapshot(),
+            }
+            for name, s in store_stats.items()
+        },
+        "cache": get_price_cache_stats(),
+        "catalog": price_catalog.stats() if price_catalog is not None else None,
+    }
+
+
+def store_timeout(store: str) -> float:
+    return store_latency[store].timeout() if PRICE_ADAPTIVE_TIMEOUT else STORE_TIMEOUT
+
+
+async def _fetch_hedged(store: str, english_name: str) -> Optional[float]:
+    adapter = STORE_ADAPTERS[store]
+    delay = store_latency[store].hedge_delay() if PRICE_HEDGE else None
+    if delay is None:
+        return await adapter.fetch_price(get_session(), english_name)
+
+    tasks = {asyncio.create_task(adapter.fetch_price(get_session(), english_name))}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            # Slow tail: a second request often lands on a faster backend or connection
+            store_stats[store].hedges += 1
+            store_hedges.inc(store)
+            tasks.add(asyncio.create_task(adapter.fetch_price(get_session(), english_name)))
+        not_found = False
+        while True:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            answered = [task.result() for task in done if task.exception() is None]
+            priced = [price for price in answered if price is not None and price > 0]
+            if priced:
+                return priced[0]
+            # "Not found" from one attempt: the other may still be finding a price
+            not_found = not_found or bool(answered)
+            if not tasks:
+                if not_found:
+                    return None
+                return done.pop().result()  # every attempt failed: raise the last error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _store_failed(store: str):
+    breaker = store_breakers[store]
+    breaker.record_failure()
+    if breaker.failures == breaker.failure_threshold and PRICE_CIRCUIT_BREAKER:
+        logger.warning("%s circuit opened after %d consecutive failures", store, breaker.failures)
+
+
+async def _query_store(store: str, english_name: str) -> Tuple[str, Optional[float]]:
+    stats = store_stats[store]
+    breaker = store_breakers[store]
+    if PRICE_CIRCUIT_BREAKER and not breaker.allow():
+        stats.skipped += 1
+        store_requests.inc(store, "skipped")
+        return store, None
+
+    stats.requests += 1
+    # A half-open probe gets the full timeout: the store may be slower now, not down
+    timeout = STORE_TIMEOUT if breaker.state == HALF_OPEN else store_timeout(store)
+    start = time.perf_counter()
+    price = None
+    outcome = "error"
+    store_in_flight.inc(store)
+    try:
+        price = await asyncio.wait_for(_fetch_hedged(store, english_name), timeout)
+        if price is not None and price > 0:
+            stats.found += 1
+            outcome = "found"
+        else:
+            price = None
+            stats.not_found += 1
+            outcome = "not_found"
+        breaker.record_success()
+        store_latency[store].observe(time.perf_counter() - start)
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        outcome = "timeout"
+        # Counted as a sample too, so a store that got slower overall widens its own timeout
+        store_latency[store].observe(timeout)
+        _store_failed(store)
+        logger.warning("%s timeout for %s", store, english_name)
+    except asyncio.CancelledError:
+        # Losing the race in "first" mode or missing the deadline is not a store error
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        stats.errors += 1
+        _store_failed(store)
+        logger.warning("%s error for %s: %s", store, english_name, e)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.latencies.append(elapsed)
+        store_in_flight.dec(store)
+        store_requests.inc(store, outcome)
+        store_seconds.observe(elapsed, store)
+    return store, price
+
+
+async def _first_price(english_name: str) -> Optional[Tuple[str, float]]:
+    # Latency mode: the first store that answers with a valid price wins
+    pending = {asyncio.create_task(_query_store(store, english_name)) for store in STORE_ADAPTERS}
+    deadline = time.perf_counter() + PRICE_DEADLINE
+    try:
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            done, pending = await asyncio.wait(pending, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return None
+            for task in done:
+                store, price = task.result()
+                if price is not None:
+                    return store, price
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _cheapest_price(english_name: str) -> Optional[Tuple[str, float]]:
+    # Cheapest mode: ask every store, wait up to the deadline, take the true minimum
+    tasks = [asyncio.create_task(_query_store(store, english_name)) for store in STORE_ADAPTERS]
+    done, pending = await asyncio.wait(tasks, timeout=PRICE_DEADLINE)
+    for task in pending:
+        task.cancel()
+    found = [task.result() for task in done if task.result()[1] is not None]
+    if not found:
+        return None
+    return min(found, key=lambda sp: sp[1])
+
+
+async def _lookup(english_name: str) -> Dict:
+    if PRICE_STRATEGY == "first":
+        best = await _first_price(english_name)
+    else:
+        best = await _cheapest_price(english_name)
+
+    if best:
+        store, price = best
+        return {"price": f"{price:.2f} €", "store": store}
+    # No data – honest dash
+    return {"price": "—", "store": "—"}
+
+
+def _is_miss(result: Dict) -> bool:
+    return result.get("price", "—") == "—"
+
+
+async def _cache_get(key: str) -> Optional[Dict]:
+    entry = _price_cache.get(key)
+    if entry is None and _price_db is not None:
+        entry = await asyncio.to_thread(_price_db.get, key)
+        if entry is not None:
+            _price_cache.set(key, entry)
+    return entry
+
+
+async def _cache_set(key: str, result: Dict):
+    entry = {"data": result, "ts": time.time()}
+    # Misses are never served stale, so they expire as soon as they stop being trusted
+    ttl = NEGATIVE_CACHE_TTL if _is_miss(result) else CACHE_TTL + STALE_TTL
+    _price_cache.set(key, entry, ttl)
+    if _price_db is not None:
+        await asyncio.to_thread(_price_db.set, key, entry, ttl)
+
+
+async def _lookup_and_store(key: str, english_name: str) -> Dict:
+    # Concurrent dishes asking for the same ingredient share one scrape
+    async def compute():
+        result = await _lookup(english_name)
+        await _cache_set(key, result)
+        return result
+    return await _price_flight.do(key, compute)
+
+
+def _refresh_in_background(key: str, english_name: str):
+    cache_stats["refreshes"] += 1
+    task = asyncio.create_task(_lookup_and_store(key, english_name))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def fetch_price(name: str) -> Dict:
+    key = normalize_name(name)
+    if price_catalog is not None:
+        # Crawled offline: no store request at all; unknown names fall through to scraping
+        result = await price_catalog.lookup(key)
+        if result is not None:
+            return result
+
+    entry = await _cache_get(key)
+    if entry is not None:
+        result = entry["data"]
+        age = time.time() - entry["ts"]
+        if _is_miss(result):
+            if age < NEGATIVE_CACHE_TTL:
+                cache_stats["negative_hits"] += 1
+                return result
+        elif age < CACHE_TTL:
+            cache_stats["hits"] += 1
+            return result
+        else:
+            # Stale-while-revalidate: answer now, refresh for the next caller
+            cache_stats["stale_hits"] += 1
+            if key not in _price_flight:
+                _refresh_in_background(key, key)
+            return result
+
+    cache_stats["misses"] += 1
+    # Search the stores with the canonical English name, not the caller's spelling
+    return await _lookup_and_store(key, key)
+
+
+def get_price_cache_stats() -> Dict:
+    lookups = sum(cache_stats[k] for k in ("hits", "stale_hits", "negative_hits", "misses"))
+    hits = lookups - cache_stats["misses"]
+    return {
+        **cache_stats,
+        "coalesced": _price_flight.coalesced,
+        "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        "memory_entries": len(_price_cache),
+    }
 
-_price_cache = {}
-CACHE_TTL = 300
 
 async def get_cheapest_prices(ingredients: List[Dict]) -> Dict:
     if not ingredients:
         return {"items": [], "estimated_total": 0, "currency": "€", "note": "No ingredients"}
 
-    async def fetch_from_api(english_name: str) -> Dict:
-        key = english_name.lower()
-        if key in _price_cache:
-            cached = _price_cache[key]
-            if asyncio.get_event_loop().time() - cached["ts"] < CACHE_TTL:
-                return cached["data"]
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "sk-SK,sk;q=0.9,en;q=0.8"
-        }
+    names = list(dict.fromkeys(normalize_name(ing["name"]) for ing in ingredients))
+    price_results = await asyncio.gather(*[fetch_price(name) for name in names])
+    return generate_shopping_list(ingredients, dict(zip(names, price_results)))
 
-        async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=8)) as session:
-            # Tesco SK – Public search page (parse HTML for price)
-            try:
-                url = "https://nakup.tesco.sk/groceries/sk-SK/search"
-                params = {"query": english_name}
-                async with session.get(url, params=params) as r:
-                    if r.status == 200:
-                        text = await r.text()
-                        # Parse price from script/JSON in page
-                        price_match = re.search(r'"priceValue":\s*(\d+\.?\d*)', text)
-                        if price_match:
-                            price = float(price_match.group(1))
-                            result = {"price": f"{price:.2f} €", "store": "Tesco"}
-                            _price_cache[key] = {"data": result, "ts": asyncio.get_event_loop().time()}
-                            return result
-            except Exception as e:
-                print(f"Tesco error for {english_name}: {e}")
-                pass
-
-            # Billa SK – Correct API endpoint (full URL, simplified params)
-            try:
-                url = "https://shop.billa.sk/api/v1/search"
-                params = {"text": english_name, "pageSize": 1}
-                async with session.get(url, params=params) as r:
-                    if r.status == 200:
-                        data = await r.json()
-                        item = data.get("results", [{}])[0]
-                        price = item.get("price", {}).get("finalPrice") or item.get("price")
-                        if price:
-                            result = {"price": f"{float(price):.2f} €", "store": "Billa"}
-                            _price_cache[key] = {"data": result, "ts": asyncio.get_event_loop().time()}
-                            return result
-            except Exception as e:
-                print(f"Billa error for {english_name}: {e}")
-                pass
-
-            # Lidl SK – Simplified search (no limit param to avoid header error)
-            try:
-                url = "https://www.lidl.sk/search"
-                params = {"q": english_name}  # Removed limit to fix header length
-                async with session.get(url, params=params) as r:
-                    if r.status == 200:
-                        text = await r.text()
-                        price_match = re.search(r'"price":\s*(\d+\.?\d*)', text)
-                        if price_match:
-                            price = float(price_match.group(1))
-                            result = {"price": f"{price:.2f} €", "store": "Lidl"}
-                            _price_cache[key] = {"data": result, "ts": asyncio.get_event_loop().time()}
-                            return result
-            except Exception as e:
-                print(f"Lidl error for {english_name}: {e}")
-                pass
-
-            # Kaufland SK – Public search
-            try:
-                url = "https://www.kaufland.sk/search"
-                params = {"q": english_name}
-                async with session.get(url, params=params) as r:
-                    if r.status == 200:
-                        text = await r.text()
-                        price_match = re.search(r'"price":\s*(\d+\.?\d*)', text)
-                        if price_match:
-                            price = float(price_match.group(1))
-                            result = {"price": f"{price:.2f} €", "store": "Kaufland"}
-                            _price_cache[key] = {"data": result, "ts": asyncio.get_event_loop().time()}
-                            return result
-            except Exception as e:
-                print(f"Kaufland error for {english_name}: {e}")
-                pass
-
-        # No data – honest dash
-        result = {"price": "—", "store": "—"}
-        _price_cache[key] = {"data": result, "ts": asyncio.get_event_loop().time()}
-        return result
 
-    price_results = await asyncio.gather(*[fetch_from_api(ing["name"]) for ing in ingredients])
-
-    total = 0.0
-    items = []
-    for ing, price_info in zip(ingredients, price_results):
-        price_str = price_info.get("price", "—")
-        store = price_info.get("store", "—")
-        if price_str != "—":
-            total += float(price_str.replace(" €", ""))
-        items.append({
-            "item": ing["name"],  # English
-            "amount": ing["amount"],
-            "price": price_str,
-            "store": store
-        })
+async def get_batch_prices(dishes: List[Dict]) -> Dict:
+    # A week of meals repeats the same ingredients – look each one up only once
+    names = list(dict.fromkeys(
+        normalize_name(ing["name"]) for dish in dishes for ing in dish["ingredients"]
+    ))
+    semaphore = asyncio.Semaphore(PRICE_BATCH_CONCURRENCY)
+
+    async def bounded_fetch(name: str) -> Dict:
+        async with semaphore:
+            return await fetch_price(name)
+
+    price_results = await asyncio.gather(*[bounded_fetch(name) for name in names])
+    prices = dict(zip(names, price_results))
 
+    per_dish = [
+        {"name": dish.get("name"), "shopping_list": generate_shopping_list(dish["ingredients"], prices)}
+        for dish in dishes
+    ]
     return {
-        "items": items,
-        "estimated_total": round(total, 2),
-        "currency": "€",
-        "note": "Real-time prices from Tesco, Billa, Lidl, Kaufland (Slovakia)"
-    }
\ No newline at end of file
+        "dishes": per_dish,
+        "aggregated": merge_shopping_lists(dishes, prices),
+        "total_of_dishes": round(sum(d["shopping_list"]["estimated_total"] for d in per_dish), 2),
+        "ingredient_count": sum(len(dish["ingredients"]) for dish in dishes),
+        "unique_lookups": len(names),
+    }
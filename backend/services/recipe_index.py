@@ -0,0 +1,114 @@
+# backend/services/recipe_index.py
+# Recipe suggestions from a bundled corpus (data/recipes.json) instead of
+# having the vision model write 5-12 recipes for every photo. Each recipe's
+# ingredients are reduced to canonical names once at load; an inverted index
+# (ingredient -> recipes) picks the recipes that share anything with the
+# fridge, and one (candidates x ingredients) 0/1 matrix product counts how
+# many of each recipe's ingredients the fridge covers.
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.ingredients import canonical_name
+from services.metrics import span
+from services.nutrition import split_ingredient
+
+RECIPES_JSON = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "recipes.json")
+
+RECIPE_SUGGESTIONS = int(os.getenv("RECIPE_SUGGESTIONS", "8"))
+RECIPE_MAX_MISSING = int(os.getenv("RECIPE_MAX_MISSING", "2"))  # ingredients the user would have to buy
+RECIPE_MIN_COVERAGE = 0.5
+
+# Assumed to be in every kitchen: never missing, never counted towards coverage
+PANTRY = {"salt", "black pepper", "oil", "olive oil", "sugar", "vinegar"}
+# Either one satisfies a recipe asking for the other
+INTERCHANGEABLE = [
+    {"chicken breast", "chicken thighs"},
+    {"yogurt", "greek yogurt"},
+]
+
+
+def _key(name: str) -> str:
+    key = canonical_name(name)
+    for group in INTERCHANGEABLE:
+        if key in group:
+            return min(group)
+    return key
+
+
+class RecipeIndex:
+    def __init__(self, recipes: List[Dict]):
+        self.recipes = recipes
+        self.vocab: Dict[str, int] = {}
+        required = []
+        for recipe in recipes:
+            keys = {_key(split_ingredient(text)[0]) for text in recipe["ingredients_used"]} - PANTRY
+            required.append([self.vocab.setdefault(k, len(self.vocab)) for k in sorted(keys)])
+        self.names = {i: k for k, i in self.vocab.items()}
+
+        self.matrix = np.zeros((len(recipes), len(self.vocab)), dtype=np.float32)  # recipes x ingredients
+        self.postings: List[List[int]] = [[] for _ in self.vocab]
+        for r, columns in enumerate(required):
+            self.matrix[r, columns] = 1.0
+            for c in columns:
+                self.postings[c].append(r)
+        self.required = self.matrix.sum(axis=1)
+
+    @span("recipe_search")
+    def suggest(self, inventory: List[str], limit: int = RECIPE_SUGGESTIONS,
+                max_missing: int = RECIPE_MAX_MISSING) -> List[Dict]:
+        """Recipes cookable from `inventory` (ingredient names), fewest missing ingredients first."""
+        columns = sorted({self.vocab[k] for k in map(_key, inventory) if k in self.vocab})
+        if not columns:
+            return []
+        candidates = np.unique(np.concatenate([self.postings[c] for c in columns]).astype(np.intp))
+        have = np.zeros(len(self.vocab), dtype=np.float32)
+        have[columns] = 1.0
+
+        matrix = self.matrix[candidates]
+        covered = matrix @ have
+        required = self.required[candidates]
+        missing = required - covered
+        coverage = covered / np.maximum(required, 1)
+        keep = (missing <= max_missing) & (coverage >= RECIPE_MIN_COVERAGE)
+        # Fewest missing first, then the best covered, then the ones using most of the fridge
+        order = np.lexsort((-covered[keep], -coverage[keep], missing[keep]))[:limit]
+        rows = np.flatnonzero(keep)[order]
+
+        suggestions = []
+        for row in rows:
+            recipe = self.recipes[candidates[row]]
+            absent = np.flatnonzero(matrix[row] > have)
+            suggestions.append({
+                "name": recipe["name"],
+                "ingredients_used": list(recipe["ingredients_used"]),
+                "instructions": recipe["instructions"],
+                "missing_ingredients": [self.names[c] for c in absent],
+                "coverage": round(float(coverage[row]), 2),
+                "source": "corpus",
+            })
+        return suggestions
+
+
+def corpus_version(path: str = RECIPES_JSON) -> str:
+    # Part of the analysis cache key, so editing the corpus retires cached suggestions
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:8]
+
+
+_index: Optional[RecipeIndex] = None
+
+
+def get_index() -> RecipeIndex:
+    global _index
+    if _index is None:
+        with open(RECIPES_JSON, encoding="utf-8") as f:
+            _index = RecipeIndex(json.load(f))
+    return _index
+
+
+def suggest_recipes(inventory: List[str], limit: int = RECIPE_SUGGESTIONS) -> List[Dict]:
+    return get_index().suggest(inventory, limit)
@@ -1,4 +1,14 @@
 # services/recipes.py
+# Nutrient gap analysis. Candidate recipes and already-eaten meals are turned
+# into (n x GAP_KEYS) arrays once, so scoring 10k recipes against the remaining
+# daily/weekly gaps is a handful of NumPy operations instead of a Python loop
+# per recipe and nutrient.
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.metrics import span
 
 # Упрощённые дневные нормы (всё в mg, кроме protein/fiber в g)
 DAILY_NUTRIENTS = {
@@ -19,23 +29,119 @@ DAILY_NUTRIENTS = {
     "potassium_mg": 4700,
 }
 
+GAP_KEYS = list(DAILY_NUTRIENTS)
+DAILY = np.array([DAILY_NUTRIENTS[k] for k in GAP_KEYS], dtype=np.float64)
+
+_NUMBER_RE = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def _unit(nutrient: str) -> str:
+    return "g" if nutrient == "protein" or nutrient.endswith("_g") else "mg"
+
+
+def _to_float(value) -> float:
+    # Model output used to carry units in the value ("8mg", "0.5 g")
+    if value.__class__ in (int, float):
+        return float(value)
+    match = _NUMBER_RE.search(str(value or ""))
+    return float(match.group().replace(",", ".")) if match else 0.0
+
+
+def _row(item: Dict) -> List[float]:
+    macros = item.get("macros") or {}
+    micros = item.get("micronutrients") or {}
+    return [_to_float(micros.get(k, macros.get(k, item.get(k, 0)))) for k in GAP_KEYS]
+
+
+def nutrient_vector(item: Dict) -> np.ndarray:
+    """GAP_KEYS values of a recipe ({"macros", "micronutrients"}) or a flat totals dict."""
+    return np.array(_row(item), dtype=np.float64)
+
+
+def nutrient_matrix(items: List[Dict]) -> np.ndarray:
+    # One array construction for the whole batch, not one small array per recipe
+    return np.array([_row(item) for item in items], dtype=np.float64).reshape(len(items), len(GAP_KEYS))
+
+
+def remaining_gaps(eaten: np.ndarray, days: int = 1) -> np.ndarray:
+    """What is still missing from `days` x DAILY after the eaten (meals x GAP_KEYS) rows."""
+    return np.clip(DAILY * max(days, 1) - eaten.sum(axis=0), 0, None)
+
+
+def score_recipes(candidates: np.ndarray, gaps: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Gap-weighted share of the remaining gaps each candidate row closes (0..1).
+
+    Overshooting a nutrient earns nothing extra, and nutrients that are
+    furthest behind their target weigh the most.
+    """
+    weights = gaps / target
+    if not weights.any():
+        return np.zeros(len(candidates))
+    closed = np.minimum(candidates, gaps) / np.where(gaps > 0, gaps, 1)
+    return closed @ weights / weights.sum()
+
+
+def _by_key(values: np.ndarray, digits: int = 4) -> Dict[str, float]:
+    return {k: round(float(v), digits) for k, v in zip(GAP_KEYS, values)}
+
+
+@span("gap_ranking")
+def rank_recipes(recipes: List[Dict], eaten_days: Optional[List[List[Dict]]] = None,
+                 top_k: int = 5) -> Dict:
+    """Rank candidate recipes by how well each closes today's / this week's gaps.
+
+    `eaten_days` holds one list of meals (recipes or totals dicts) per day;
+    the target is DAILY_NUTRIENTS times the number of days.
+    """
+    eaten_days = eaten_days or [[]]
+    days = len(eaten_days)
+    target = DAILY * days
+    eaten = nutrient_matrix([meal for day in eaten_days for meal in day])
+    gaps = remaining_gaps(eaten, days)
+    eaten_total = eaten.sum(axis=0)
+
+    candidates = nutrient_matrix(recipes)
+    scores = score_recipes(candidates, gaps, target)
+
+    count = min(top_k, len(recipes))
+    if count < len(recipes):
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind="stable")]
+    else:
+        top = np.argsort(-scores, kind="stable")
+
+    coverage = np.minimum((eaten_total + candidates[top]) / target, 1.0)
+    still_missing = np.clip(gaps - candidates[top], 0, None)
+    return {
+        "days": days,
+        "gaps": _by_key(gaps),
+        "coverage_before": _by_key(np.minimum(eaten_total / target, 1.0), 3),
+        "ranked": [
+            {
+                "name": recipes[i].get("name"),
+                "index": int(i),
+                "score": round(float(scores[i]), 4),
+                "coverage_after": _by_key(coverage[row], 3),
+                "still_missing": {k: v for k, v in _by_key(still_missing[row]).items() if v > 0},
+            }
+            for row, i in enumerate(top)
+        ],
+        "candidates": len(recipes),
+    }
+
+
 def calculate_gaps(chosen_recipe_name: str, analysis_result: dict) -> dict:
     recipe = next((r for r in analysis_result["recipes"] if r["name"] == chosen_recipe_name), None)
     if not recipe:
         return {"error": "Recipe not found"}
 
-    gaps = {}
-    micros = recipe.get("micronutrients", {})
-    for nutrient, daily in DAILY_NUTRIENTS.items():
-        current = micros.get(nutrient, 0)
-        if isinstance(current, str):
-            current = float(current.replace("g", "").replace("mg", ""))
-
-        missing = daily - current
-        if missing > 0:
-            unit = "g" if nutrient == "protein" or nutrient.endswith("_g") else "mg"
-            gaps[nutrient] = f"Need {missing:.2f}{unit} more"
+    missing = remaining_gaps(nutrient_vector(recipe)[None, :])
+    gaps = {
+        nutrient: f"Need {value:.2f}{_unit(nutrient)} more"
+        for nutrient, value in zip(GAP_KEYS, missing) if value > 0
+    }
 
+    micros = {**recipe.get("macros", {}), **recipe.get("micronutrients", {})}
     return {
         "chosen_recipe": chosen_recipe_name,
         "covered": {k: v for k, v in micros.items() if k in DAILY_NUTRIENTS},
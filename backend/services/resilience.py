@@ -0,0 +1,131 @@
+# backend/services/resilience.py
+# Building blocks for calling flaky upstreams (the store search pages): a
+# circuit breaker that stops sending requests to a store that keeps failing,
+# and a latency tracker that turns recent response times into a per-store
+# timeout and hedging delay instead of one fixed worst-case timeout.
+# State is per process; each uvicorn worker learns on its own.
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call is refused. After `cooldown` seconds the breaker is
+    half-open and lets one probe through at a time: a success closes it, a
+    failure opens it again with the cooldown doubled (up to `max_cooldown`).
+    A probe that never reports back (cancelled) is replaced after
+    `probe_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0,
+                 max_cooldown: float = 300.0, probe_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.cooldown = cooldown
+        self.failures = 0           # consecutive
+        self.opened_at = 0.0
+        self._probe_started = None  # monotonic time of the half-open probe in flight
+        self.times_opened = 0
+        self.refused = 0
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = time.monotonic()
+            if self._probe_started is None or now - self._probe_started > self.probe_timeout:
+                self._probe_started = now
+                return True
+        self.refused += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._probe_started = None
+
+    def record_failure(self):
+        was_probe = self._probe_started is not None
+        self._probe_started = None
+        self.failures += 1
+        if was_probe:
+            # Still broken: back off further before the next probe
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        if self.failures >= self.failure_threshold:
+            if self.failures == self.failure_threshold:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "cooldown_s": self.cooldown,
+            "times_opened": self.times_opened,
+            "refused": self.refused,
+        }
+
+
+class LatencyTracker:
+    """Recent response times of one upstream and the timeouts derived from them.
+
+    Callers also record a timed-out call, as the timeout it hit: a censored
+    sample (the real time was at least that), so an upstream that got slower
+    overall widens its own timeout instead of timing out forever.
+    `timeout()` is `multiplier` x the observed p95, clamped to [floor, ceiling];
+    until `min_samples` responses have been seen it is the ceiling. Percentiles
+    are recomputed every `refresh_every` observations, not on every call.
+    """
+
+    def __init__(self, ceiling: float, floor: float = 0.5, multiplier: float = 2.0,
+                 window: int = 200, min_samples: int = 20, refresh_every: int = 10):
+        self.ceiling = ceiling
+        self.floor = floor
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self._samples = deque(maxlen=window)
+        self._since_refresh = 0
+        self._percentiles: Dict[float, float] = {}
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh_every:
+            self._percentiles.clear()
+            self._since_refresh = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        value = self._percentiles.get(q)
+        if value is None:
+            ordered = sorted(self._samples)
+            value = self._percentiles[q] = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return value
+
+    def timeout(self) -> float:
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, p95 * self.multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        """When to send a duplicate request: the p90, so roughly one call in ten is hedged."""
+        p90 = self.percentile(0.9)
+        return None if p90 is None else min(p90, self.timeout())
@@ -0,0 +1,74 @@
+# backend/services/sessions.py
+# Per-session results ("my last fridge analysis"), replacing the module globals
+# that every user and every uvicorn worker used to share. Follow-up endpoints
+# (gaps, shopping list, alternatives) read the stored analysis instead of
+# running the model again.
+#
+# Sessions are identified by the X-Session-Id header (or the session_id
+# cookie); a new id is issued when neither is sent. Without SESSION_DB the
+# store is an in-memory LRU per process; with SESSION_DB it is one SQLite file
+# shared by all workers, so a follow-up can land on any of them.
+import asyncio
+import copy
+import os
+import re
+import uuid
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from services.cache import LRUCache, SQLiteCache
+
+load_dotenv()
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))  # seconds since the last write
+SESSION_STORE_SIZE = int(os.getenv("SESSION_STORE_SIZE", "10000"))  # entries kept in memory
+SESSION_DB = os.getenv("SESSION_DB")  # e.g. "cache/sessions.sqlite3"
+SESSION_DB_MAX_MB = 100
+
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "session_id"
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class SessionStore:
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        # Only one backend is used: a memory tier in front of a shared file
+        # would serve one worker's stale "last" result after another wrote.
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, session_id: str, name: str) -> Optional[Any]:
+        key = f"{session_id}:{name}"
+        if self.disk is not None:
+            return await asyncio.to_thread(self.disk.get, key)
+        return copy.deepcopy(self.memory.get(key))
+
+    async def set(self, session_id: str, name: str, value: Any):
+        key = f"{session_id}:{name}"
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+        else:
+            self.memory.set(key, copy.deepcopy(value))
+
+
+session_store = SessionStore(
+    LRUCache(SESSION_STORE_SIZE, SESSION_TTL),
+    SQLiteCache(SESSION_DB, SESSION_TTL, SESSION_DB_MAX_MB * 1024 * 1024) if SESSION_DB else None,
+)
+
+
+def session_id(request: Request, response: Response) -> str:
+    """FastAPI dependency: the caller's session id, issuing a new one if needed."""
+    sid = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    if not sid or not _SESSION_ID_RE.match(sid):
+        sid = uuid.uuid4().hex
+    set_session(response, sid)
+    return sid
+
+
+def set_session(response: Response, sid: str):
+    """Session header and cookie. Also for a response a route returns itself
+    (e.g. a StreamingResponse), which does not get the injected Response's."""
+    response.headers[SESSION_HEADER] = sid
+    response.set_cookie(SESSION_COOKIE, sid, max_age=int(SESSION_TTL), httponly=True, samesite="lax")
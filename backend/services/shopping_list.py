@@ -1,27 +1,93 @@
 # services/shopping_list.py
+import time
+from typing import Dict, List, Optional
+from services.ingredients import canonical_name
+
+STORES_NOTE = "Tesco, Billa, Lidl, Kaufland (Slovakia)"
+PRICE_NOTE = f"Real-time prices from {STORES_NOTE}"
+NO_PRICE = {"price": "—", "store": "—"}
+
+
+def normalize_name(name: str) -> str:
+    # "  Onion " / "onions" / "Cibuľa" / "cibula" → one price lookup
+    return canonical_name(name)
+
+
+def parse_price(price) -> Optional[float]:
+    if isinstance(price, (int, float)):
+        return float(price)
+    if not price or price == "—":
+        return None
+    return float(str(price).replace("€", "").strip())
+
+
+def price_note(price_infos: List[Dict]) -> str:
+    # Prices answered from the offline catalog (services/catalog.py) are a crawl snapshot
+    priced = [p for p in price_infos if parse_price(p.get("price")) is not None]
+    crawled = [p["crawled_at"] for p in priced if p.get("source") == "catalog"]
+    if not crawled:
+        return PRICE_NOTE
+    since = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(min(crawled)))
+    if len(crawled) == len(priced):
+        return f"Catalog prices from {STORES_NOTE}, crawled since {since}"
+    return f"Real-time and catalog prices (crawled since {since}) from {STORES_NOTE}"
+
+
 def generate_shopping_list(ingredients: list, prices: dict):
-    total = 0
+    # prices: normalized ingredient name -> {"price": "1.20 €", "store": "Tesco"}
+    total = 0.0
     items = []
+    used = []
 
     for ing in ingredients:
         name = ing["name"]
-        amount = ing["amount"]
-        price_info = prices.get(name, {"price": 0, "store": "?"})
-        price = price_info.get("price", 0)
-        if isinstance(price, float):
+        price_info = prices.get(normalize_name(name), NO_PRICE)
+        used.append(price_info)
+        price = parse_price(price_info.get("price"))
+        if price is not None:
             total += price
 
         items.append({
-            "item": name,
-            "amount": amount,
-            "price": price if price != "?" else "—",
-            "store": price_info.get("store", "?"),
-            "total_for_this": price if price != "?" else None
+            "item": name,  # English
+            "amount": ing.get("amount", ""),
+            "price": price_info.get("price", "—"),
+            "store": price_info.get("store", "—")
         })
 
     return {
         "items": items,
-        "estimated_total_czk": round(total, 2),
-        "currency": "Kč",
-        "note": "Prices from today – Rohlik/Tesco/Kaufland/Lidl"
-    }
\ No newline at end of file
+        "estimated_total": round(total, 2),
+        "currency": "€",
+        "note": price_note(used)
+    }
+
+
+def merge_shopping_lists(dishes: List[Dict], prices: dict):
+    # One line per unique ingredient across all dishes, each bought once
+    merged = {}
+    used = []
+    for dish in dishes:
+        for ing in dish["ingredients"]:
+            key = normalize_name(ing["name"])
+            entry = merged.get(key)
+            if entry is None:
+                price_info = prices.get(key, NO_PRICE)
+                used.append(price_info)
+                entry = merged[key] = {
+                    "item": ing["name"],
+                    "amounts": [],
+                    "used_in": 0,
+                    "price": price_info.get("price", "—"),
+                    "store": price_info.get("store", "—"),
+                }
+            entry["used_in"] += 1
+            if ing.get("amount"):
+                entry["amounts"].append(ing["amount"])
+
+    total = sum(parse_price(entry["price"]) or 0.0 for entry in merged.values())
+    return {
+        "items": list(merged.values()),
+        "estimated_total": round(total, 2),
+        "currency": "€",
+        "note": price_note(used)
+    }
@@ -0,0 +1,195 @@
+# backend/services/store_adapters.py
+# One adapter per store, registered in STORE_ADAPTERS (lookup order = registration order).
+# HTML adapters scan the response stream chunk by chunk and stop reading as soon
+# as the first price shows up, instead of downloading the whole search page and
+# running a regex over several hundred KB. The catalog crawler reads whole
+# pages instead and keeps every product on them (fetch_products).
+import json
+import os
+import re
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Store search endpoints (overridable so benchmarks can point at a local mock)
+TESCO_SEARCH_URL = os.getenv("TESCO_SEARCH_URL", "https://nakup.tesco.sk/groceries/sk-SK/search")
+BILLA_SEARCH_URL = os.getenv("BILLA_SEARCH_URL", "https://shop.billa.sk/api/v1/search")
+LIDL_SEARCH_URL = os.getenv("LIDL_SEARCH_URL", "https://www.lidl.sk/search")
+KAUFLAND_SEARCH_URL = os.getenv("KAUFLAND_SEARCH_URL", "https://www.kaufland.sk/search")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "sk-SK,sk;q=0.9,en;q=0.8"
+}
+
+CHUNK_SIZE = 16 * 1024
+CATALOG_PAGE_SIZE = 24  # products per search page when crawling
+
+
+def product_pattern(price_key: str) -> re.Pattern:
+    # "name": "...", ... "<price_key>": 1.29 inside one embedded product object
+    return re.compile(rb'"name":\s*"((?:[^"\\]|\\.)*)"[^{}]*?"' + price_key.encode() + rb'":\s*(\d+\.?\d*)')
+
+
+def _json_string(raw: bytes) -> str:
+    try:
+        return json.loads(b'"' + raw + b'"')
+    except ValueError:
+        return raw.decode("utf-8", "replace")
+
+
+class PriceScanner:
+    """Incremental regex search over a byte stream.
+
+    Keeps a small tail of the previous chunk so a match split across chunk
+    boundaries is still found, and holds back a match that touches the end of
+    the buffer because the number may continue in the next chunk.
+    """
+
+    def __init__(self, pattern: re.Pattern, overlap: int = 64):
+        self.pattern = pattern
+        self.overlap = overlap
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> Optional[float]:
+        buf = self._tail + chunk
+        match = self.pattern.search(buf)
+        if match and match.end() < len(buf):
+            return float(match.group(1))
+        self._tail = buf[match.start():] if match else buf[-self.overlap:]
+        return None
+
+    def close(self) -> Optional[float]:
+        match = self.pattern.search(self._tail)
+        return float(match.group(1)) if match else None
+
+
+class StoreAdapter:
+    name = ""
+    url = ""
+    query_param = "q"
+    price_pattern: re.Pattern = None
+    product_pattern: re.Pattern = None
+
+    def params(self, query: str) -> Dict:
+        return {self.query_param: query}
+
+    def catalog_params(self, query: str) -> Dict:
+        return self.params(query)
+
+    async def fetch_price(self, session: aiohttp.ClientSession, query: str) -> Optional[float]:
+        async with session.get(self.url, params=self.params(query)) as r:
+            # Blocked or down (403/429/5xx) is an error for the circuit breaker, not "not found"
+            r.raise_for_status()
+            if r.status != 200:
+                return None
+            # Leaving the block before the body is fully read drops the connection
+            # instead of draining it – cheaper than downloading the rest of the page.
+            return await self.extract_price(r.content.iter_chunked(CHUNK_SIZE))
+
+    async def extract_price(self, chunks: AsyncIterator[bytes]) -> Optional[float]:
+        scanner = PriceScanner(self.price_pattern)
+        async for chunk in chunks:
+            price = scanner.feed(chunk)
+            if price is not None:
+                return price
+        return scanner.close()
+
+    def extract_price_sync(self, chunks: Iterable[bytes]) -> Optional[float]:
+        # Same as extract_price, for fixtures and benchmarks
+        scanner = PriceScanner(self.price_pattern)
+        for chunk in chunks:
+            price = scanner.feed(chunk)
+            if price is not None:
+                return price
+        return scanner.close()
+
+    async def fetch_products(self, session: aiohttp.ClientSession, query: str) -> List[Tuple[str, float]]:
+        """Every (product name, price) on the search page, in the store's result order."""
+        async with session.get(self.url, params=self.catalog_params(query)) as r:
+            r.raise_for_status()
+            return self.parse_products(await r.read())
+
+    def parse_products(self, body: bytes) -> List[Tuple[str, float]]:
+        return [(_json_string(name), float(price)) for name, price in self.product_pattern.findall(body)]
+
+
+STORE_ADAPTERS: Dict[str, StoreAdapter] = {}
+
+
+def register_store(cls):
+    STORE_ADAPTERS[cls.name] = cls()
+    return cls
+
+
+# Tesco SK – Public search page, price sits in embedded page JSON
+@register_store
+class TescoAdapter(StoreAdapter):
+    name = "Tesco"
+    url = TESCO_SEARCH_URL
+    query_param = "query"
+    price_pattern = re.compile(rb'"priceValue":\s*(\d+\.?\d*)')
+    product_pattern = product_pattern("priceValue")
+
+
+# Billa SK – JSON search API, one result is enough
+@register_store
+class BillaAdapter(StoreAdapter):
+    name = "Billa"
+    url = BILLA_SEARCH_URL
+    query_param = "text"
+
+    def params(self, query: str) -> Dict:
+        return {"text": query, "pageSize": 1}
+
+    def catalog_params(self, query: str) -> Dict:
+        return {"text": query, "pageSize": CATALOG_PAGE_SIZE}
+
+    async def extract_price(self, chunks: AsyncIterator[bytes]) -> Optional[float]:
+        # pageSize=1 keeps the body tiny, so just parse the whole document
+        body = b"".join([chunk async for chunk in chunks])
+        return self.parse(body)
+
+    def extract_price_sync(self, chunks: Iterable[bytes]) -> Optional[float]:
+        return self.parse(b"".join(chunks))
+
+    @staticmethod
+    def parse(body: bytes) -> Optional[float]:
+        data = json.loads(body)
+        results = data.get("results") or [{}]
+        price = results[0].get("price")
+        if isinstance(price, dict):
+            price = price.get("finalPrice")
+        return float(price) if price else None
+
+    def parse_products(self, body: bytes) -> List[Tuple[str, float]]:
+        products = []
+        for result in json.loads(body).get("results") or []:
+            price = result.get("price")
+            if isinstance(price, dict):
+                price = price.get("finalPrice")
+            if result.get("name") and price:
+                products.append((result["name"], float(price)))
+        return products
+
+
+# Lidl SK – Simplified search (no limit param to avoid header error)
+@register_store
+class LidlAdapter(StoreAdapter):
+    name = "Lidl"
+    url = LIDL_SEARCH_URL
+    price_pattern = re.compile(rb'"price":\s*(\d+\.?\d*)')
+    product_pattern = product_pattern("price")
+
+
+# Kaufland SK – Public search
+@register_store
+class KauflandAdapter(StoreAdapter):
+    name = "Kaufland"
+    url = KAUFLAND_SEARCH_URL
+    price_pattern = re.compile(rb'"price":\s*(\d+\.?\d*)')
+    product_pattern = product_pattern("price")
@@ -0,0 +1,238 @@
+# backend/services/uploads.py
+# Streaming photo uploads. The multipart body is parsed chunk by chunk as it
+# arrives: the image part goes into a spooled temp file (memory up to
+# UPLOAD_SPOOL_KB, disk beyond), its sha256 is updated per chunk, and the
+# request is refused with 413 as soon as it passes MAX_UPLOAD_MB instead of
+# after it has been read. Routes hand the open file to image_prep, so the raw
+# upload is never held in memory as one bytes object. Batch routes take every
+# repeated `files` part the same way, each in its own spooled file.
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+load_dotenv()
+
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+UPLOAD_SPOOL_KB = int(os.getenv("UPLOAD_SPOOL_KB", "1024"))  # larger uploads are spooled to disk
+UPLOAD_FIELD = "file"
+BATCH_FIELD = "files"  # repeated, one part per photo
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "8"))
+MAX_BATCH_MB = float(os.getenv("MAX_BATCH_MB", "60"))  # all photos of one batch request
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries, part headers and small form fields
+
+# Routes that take the upload through this dependency declare no File()
+# parameter, so the request body is described for the OpenAPI docs here.
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {UPLOAD_FIELD: {"type": "string", "format": "binary"}},
+            "required": [UPLOAD_FIELD],
+        }}},
+    },
+}
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {BATCH_FIELD: {
+                "type": "array", "items": {"type": "string", "format": "binary"}, "maxItems": BATCH_MAX_IMAGES,
+            }},
+            "required": [BATCH_FIELD],
+        }}},
+    },
+}
+
+
+class Upload:
+    """A received image: spooled file, size and sha256 of the raw bytes."""
+
+    def __init__(self, spool: SpooledTemporaryFile, size: int, sha256: str,
+                 filename: Optional[str], content_type: Optional[str]):
+        self._spool = spool
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename
+        self.content_type = content_type
+
+    @property
+    def file(self) -> BinaryIO:
+        self._spool.seek(0)
+        return self._spool
+
+    def read(self) -> bytes:
+        return self.file.read()
+
+    def close(self):
+        self._spool.close()
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(413, detail=f"Upload larger than {MAX_UPLOAD_MB:g} MB")
+
+
+class _ImagePart:
+    def __init__(self, filename: Optional[str], content_type: Optional[str]):
+        self.spool = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_KB * 1024)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.filename = filename
+        self.content_type = content_type
+
+    def upload(self) -> Upload:
+        return Upload(self.spool, self.size, self.digest.hexdigest(), self.filename, self.content_type)
+
+
+class _ImagePartParser:
+    """python-multipart callbacks: keeps up to `max_parts` parts named `field`,
+    ignores other fields."""
+
+    def __init__(self, max_bytes: int, field: str = UPLOAD_FIELD, max_parts: int = 1):
+        self.max_bytes = max_bytes  # per part
+        self.field = field.encode()
+        self.max_parts = max_parts
+        self.parts: List[_ImagePart] = []
+        self.extra_parts = 0  # named `field` but over max_parts
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._current: Optional[_ImagePart] = None
+        self._pending: List[Tuple[_ImagePart, bytes]] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") != self.field:
+            return
+        if len(self.parts) == self.max_parts:
+            self.extra_parts += 1
+            return
+        self._current = _ImagePart(
+            options.get(b"filename", b"").decode("utf-8", "replace") or None,
+            self._headers.get(b"content-type", b"").decode("latin-1") or None,
+        )
+        self.parts.append(self._current)
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._current is not None:
+            self._pending.append((self._current, data[start:end]))
+
+    def _part_end(self):
+        self._current = None
+
+    def flush(self):
+        # Called after each network chunk, outside the parser's callbacks
+        for part, block in self._pending:
+            part.size += len(block)
+            if part.size > self.max_bytes:
+                raise _too_large()
+            part.digest.update(block)
+            # Small blocks into memory or the OS page cache: cheaper inline than in a thread
+            part.spool.write(block)
+        self._pending.clear()
+
+    def close(self):
+        for part in self.parts:
+            part.spool.close()
+
+
+async def _receive_parts(request: Request, field: str, max_parts: int, max_body: int) -> _ImagePartParser:
+    max_bytes = int(MAX_UPLOAD_MB * 1024 * 1024)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_body + MULTIPART_OVERHEAD:
+        raise _too_large()  # refused before reading a single byte
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(422, detail=f"Expected multipart/form-data with a '{field}' field")
+
+    form = _ImagePartParser(max_bytes, field, max_parts)
+    parser = MultipartParser(boundary, form.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body + MULTIPART_OVERHEAD:
+                raise _too_large()
+            parser.write(chunk)
+            form.flush()
+        parser.finalize()
+        form.flush()
+    except HTTPException:
+        form.close()
+        raise
+    except Exception as e:
+        form.close()
+        raise HTTPException(400, detail=f"Malformed multipart body: {e}")
+    return form
+
+
+async def receive_upload(request: Request) -> Upload:
+    max_bytes = int(MAX_UPLOAD_MB * 1024 * 1024)
+    form = await _receive_parts(request, UPLOAD_FIELD, 1, max_bytes)
+    if not form.parts or form.parts[0].size == 0:
+        form.close()
+        raise HTTPException(422, detail=f"Missing '{UPLOAD_FIELD}' upload")
+    return form.parts[0].upload()
+
+
+async def receive_uploads(request: Request, max_files: int = BATCH_MAX_IMAGES) -> List[Upload]:
+    """Every `files` part, each within MAX_UPLOAD_MB and all within MAX_BATCH_MB."""
+    form = await _receive_parts(request, BATCH_FIELD, max_files, int(MAX_BATCH_MB * 1024 * 1024))
+    if form.extra_parts:
+        form.close()
+        raise HTTPException(422, detail=f"At most {max_files} '{BATCH_FIELD}' uploads per request")
+    if not form.parts or any(p.size == 0 for p in form.parts):
+        form.close()
+        raise HTTPException(422, detail=f"Missing or empty '{BATCH_FIELD}' upload")
+    return [p.upload() for p in form.parts]
+
+
+async def image_upload(request: Request) -> AsyncIterator[Upload]:
+    """FastAPI dependency: the streamed `file` upload, closed (temp file removed) after the response."""
+    upload = await receive_upload(request)
+    try:
+        yield upload
+    finally:
+        upload.close()
+
+
+async def image_uploads(request: Request) -> AsyncIterator[List[Upload]]:
+    """FastAPI dependency: the streamed `files` uploads of a batch request, closed after the response."""
+    uploads = await receive_uploads(request)
+    try:
+        yield uploads
+    finally:
+        for upload in uploads:
+            upload.close()
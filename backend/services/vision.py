@@ -1,22 +1,165 @@
 # services/vision.py
-import base64
+import hashlib
 import json
-import re
-from openai import OpenAI
-from dotenv import load_dotenv
 import os
+from typing import Dict, List, Optional
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from schemas import DishShoppingAnalysis, FridgeAnalysis, FridgeInventory, RecipeSuggestions
+from services.cache import cached_analysis
+from services.cascade import CACHE_MODEL, run_cascade
+from services.image_prep import IMAGE_DETAIL, image_part
+from services.ingredients import translate
+from services.llm import chat_completion, parse_content, response_format, VISION_MODEL
+from services.nutrition import fill_recipe_nutrition
+from services.recipe_index import RECIPE_SUGGESTIONS, corpus_version, suggest_recipes
+
+# The model only lists what it sees; recipes come from the local corpus.
+# LOCAL_RECIPES=0 goes back to the model writing every recipe.
+LOCAL_RECIPES = os.getenv("LOCAL_RECIPES", "1") == "1"
+# Fewer corpus matches than this and the model writes the rest (0 = never)
+RECIPE_FALLBACK_MIN = int(os.getenv("RECIPE_FALLBACK_MIN", "3"))
+
+# Bump when a prompt changes so cached results from the old prompt are ignored
+FRIDGE_PROMPT_VERSION = f"fridge-v4:{corpus_version()}" if LOCAL_RECIPES else "fridge-v3"
+DISH_PROMPT_VERSION = "fridge-dish-v2"
+INVENTORY_PROMPT_VERSION = "fridge-inventory-v1"
+
+# A cheap-model inventory is kept only if this share of it are foods the lexicon knows
+MIN_KNOWN_INGREDIENTS = 0.6
+
+
+def _fridge_doubt(result: dict) -> Optional[str]:
+    if "error" in result:
+        return "invalid"
+    ingredients = result["ingredients"]
+    if not ingredients:
+        return "no_ingredients"
+    known = sum(translate(ing["name"]) is not None for ing in ingredients)
+    if known < MIN_KNOWN_INGREDIENTS * len(ingredients):
+        return "unknown_ingredients"
+    if "recipes" in result and not result["recipes"]:
+        return "no_recipes"
+    return None
+
+
+def _dish_doubt(result: dict) -> Optional[str]:
+    if "error" in result:
+        return "invalid"
+    return None if result["ingredients"] else "no_ingredients"
 
 
 async def analyze_fridge_image(image_bytes: bytes) -> dict:
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    return await cached_analysis(
+        image_bytes, CACHE_MODEL, FRIDGE_PROMPT_VERSION,
+        lambda: _analyze_fridge_image(image_bytes),
+    )
+
+
+async def analyze_fridge_inventory(image_bytes: bytes) -> dict:
+    """Ingredients and shopping suggestions of one photo, no recipes."""
+    return await cached_analysis(
+        image_bytes, CACHE_MODEL, INVENTORY_PROMPT_VERSION,
+        lambda: _fridge_inventory(image_bytes),
+    )
+
+
+async def analyze_fridge_photos(images: List[bytes]) -> dict:
+    """One inventory for several photos of the same fridge, in a single model call."""
+    # Keyed by the photos' hashes in order, not by their concatenated bytes
+    key = b"".join(hashlib.sha256(image).digest() for image in images)
+    return await cached_analysis(
+        key, CACHE_MODEL, INVENTORY_PROMPT_VERSION,
+        lambda: run_cascade(
+            "fridge-batch",
+            lambda model, detail, mode: _analyze_fridge_photos(images, model, detail, mode),
+            _fridge_doubt,
+        ),
+    )
+
+
+async def analyze_dish_image(image_bytes: bytes):
+    return await cached_analysis(
+        image_bytes, CACHE_MODEL, DISH_PROMPT_VERSION,
+        lambda: run_cascade(
+            "fridge-dish",
+            lambda model, detail, mode: _analyze_dish_image(image_bytes, model, detail, mode),
+            _dish_doubt,
+        ),
+    )
+
+
+async def recipes_for_inventory(ingredients: List[Dict]) -> List[Dict]:
+    """Corpus recipes for the detected ingredients, with nutrition filled in."""
+    recipes = suggest_recipes([ing["name"] for ing in ingredients])
+    if ingredients and len(recipes) < RECIPE_FALLBACK_MIN:
+        # An unusual fridge: let the model write the rest, text only, no image
+        recipes += await _generate_recipes(ingredients, RECIPE_SUGGESTIONS - len(recipes),
+                                           [r["name"] for r in recipes])
+    fill_recipe_nutrition(recipes)
+    return recipes
+
+
+async def _generate_recipes(ingredients: List[Dict], count: int, exclude: List[str]) -> List[Dict]:
+    inventory = json.dumps(ingredients, ensure_ascii=False)
+    try:
+        response = await chat_completion(
+            mode="recipes",
+            temperature=0.3,
+            max_tokens=120 * count + 50,
+            response_format=response_format(RecipeSuggestions),
+            messages=[
+                {"role": "system", "content": "You are a home cook. Reply only with JSON matching the schema."},
+                {"role": "user", "content":
+                    f"Fridge contents: {inventory}\n"
+                    f"Write {count} realistic recipes using mainly these ingredients"
+                    + (f", not {', '.join(exclude)}" if exclude else "") + ". "
+                    "Write each ingredients_used entry as name plus amount (\"milk 400ml\"). "
+                    "Do not compute nutrition."},
+            ],
+        )
+        recipes = parse_content(response.choices[0].message.content, RecipeSuggestions)["recipes"]
+    except Exception:
+        # The corpus matches (possibly none) are still a valid answer
+        return []
+    for recipe in recipes:
+        recipe["source"] = "model"
+    return recipes[:count]
+
+
+async def _analyze_fridge_image(image_bytes: bytes) -> dict:
+    if not LOCAL_RECIPES:
+        return await run_cascade(
+            "fridge",
+            lambda model, detail, mode: _analyze_fridge_with_recipes(image_bytes, model, detail, mode),
+            _fridge_doubt,
+        )
+
+    result = await _fridge_inventory(image_bytes)
+    if "error" in result:
+        return result
+    return {
+        "ingredients": result["ingredients"],
+        "recipes": await recipes_for_inventory(result["ingredients"]),
+        "shopping_suggestions": result["shopping_suggestions"],
+    }
+
+
+async def _fridge_inventory(image_bytes: bytes) -> dict:
+    return await run_cascade(
+        "fridge",
+        lambda model, detail, mode: _analyze_fridge_inventory(image_bytes, model, detail, mode),
+        _fridge_doubt,
+    )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-08-06",  # newest & most accurate vision model
+
+async def _analyze_fridge_with_recipes(image_bytes: bytes, model: str = VISION_MODEL,
+                                       detail: str = IMAGE_DETAIL, mode: str = "fridge") -> dict:
+    response = await chat_completion(
+        mode=mode,
+        model=model,
         temperature=0.0,
-        max_tokens=2000,
+        max_tokens=1200,  # no nutrition numbers to generate any more
+        response_format=response_format(FridgeAnalysis),
         messages=[
             {"role": "system",
              "content": "You are a world-class fridge analyst. Return ONLY valid JSON. No markdown, no explanations, no code blocks."},
@@ -39,19 +182,12 @@ async def analyze_fridge_image(image_bytes: bytes) -> dict:
                 {
                   "name": "Creamy Chicken Pasta",
                   "ingredients_used": ["chicken thighs 600g", "milk 400ml", "cheese 150g", "tomatoes 4"],
-                  "instructions": "1. Cook chicken. 2. Make creamy sauce with milk and cheese. 3. Add tomatoes.",
-                  "macros": {"calories": 720, "protein": 68, "carbs": 48, "fat": 32, "sugar_g": 10},
-                  "micronutrients": {"vitamin_A_mg": 0.3, "vitamin_B6_mg": 0.5, "vitamin_B12_mg": 0.001, "vitamin_C_mg": 85,
-                  "vitamin_D_mg": 0.01, "vitamin_E_mg": 5, "fiber_g": 8, "calcium_mg": 400, "magnesium_mg": 120, "iron_mg": 4, "zinc_mg": 3, "potassium_mg": 900
-}
+                  "instructions": "1. Cook chicken. 2. Make creamy sauce with milk and cheese. 3. Add tomatoes."
                 },
                 {
                   "name": "Broccoli & Cheese Frittata",
                   "ingredients_used": ["eggs 8", "broccoli 2 heads", "cheese 150g", "bell peppers 2"],
-                  "instructions": "1. Whisk eggs. 2. Add chopped veggies and cheese. 3. Bake 20 min.",
-                  "macros": {"calories": 580, "protein": 48, "carbs": 22, "fat": 38, "sugar_g": 10},
-                  "micronutrients": {"vitamin_A_mg": 0.3, "vitamin_B6_mg": 0.5, "vitamin_B12_mg": 0.001, "vitamin_C_mg": 85,
-                  "vitamin_D_mg": 0.01, "vitamin_E_mg": 5, "fiber_g": 8, "calcium_mg": 400, "magnesium_mg": 120, "iron_mg": 4, "zinc_mg": 3, "potassium_mg": 900
+                  "instructions": "1. Whisk eggs. 2. Add chopped veggies and cheese. 3. Bake 20 min."
                 }
               ],
               "shopping_suggestions": ["pasta", "olive oil", "garlic", "onions", "herbs"]
@@ -61,38 +197,93 @@ async def analyze_fridge_image(image_bytes: bytes) -> dict:
                 - List EVERY visible food item with realistic quantity
                 - Create 5–12 realistic recipes using only what you see
                 - NEVER return empty arrays unless the fridge is truly empty
-                - For EVERY recipe, ALWAYS include both 'macros' and 'micronutrients' with numeric values.
-                - Use ONLY these micronutrient keys: vitamin_A_mg, vitamin_B6_mg, vitamin_B12_mg, vitamin_C_mg, vitamin_D_mg, vitamin_E_mg, fiber_g, calcium_mg, magnesium_mg, iron_mg, zinc_mg, potassium_mg.
+                - In 'ingredients_used' ALWAYS write the ingredient name followed by its amount (e.g. "milk 400ml")
+                - Do NOT compute nutrition – it is calculated from the ingredient amounts
                 - Only valid JSON, nothing else"
             """},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                image_part(image_bytes, detail)
             ]}
         ]
     )
 
-    raw = response.choices[0].message.content.strip()
+    content = response.choices[0].message.content
+    try:
+        result = parse_content(content, FridgeAnalysis)
+    except ValueError as e:
+        return {"error": "Invalid JSON", "raw": content, "parse_error": str(e)}
+    # Macros and micronutrients come from the local nutrient table, not the model
+    fill_recipe_nutrition(result["recipes"])
+    return result
 
-    # Remove any markdown
-    cleaned = re.sub(r"^```json\s*|```$", "", raw, flags=re.MULTILINE).strip()
 
+async def _analyze_fridge_inventory(image_bytes: bytes, model: str = VISION_MODEL,
+                                    detail: str = IMAGE_DETAIL, mode: str = "fridge") -> dict:
+    response = await chat_completion(
+        mode=mode,
+        model=model,
+        temperature=0.0,
+        max_tokens=400,  # the ingredient list only
+        response_format=response_format(FridgeInventory),
+        messages=[
+            {"role": "system",
+             "content": "You are a world-class fridge analyst. Return ONLY valid JSON. No markdown, no explanations, no code blocks."},
+            {"role": "user", "content": [
+                {"type": "text", "text":
+                    "List every visible food item in this fridge photo with a realistic quantity "
+                    "(e.g. {\"name\": \"milk\", \"amount\": \"1.5L\"}), and 3-6 staples in "
+                    "shopping_suggestions that would complement them. Never return an empty ingredient "
+                    "list unless the fridge is truly empty. Do not write recipes."},
+                image_part(image_bytes, detail)
+            ]}
+        ]
+    )
+
+    content = response.choices[0].message.content
     try:
-        result = json.loads(cleaned)
-        # Guarantee structure
-        result.setdefault("ingredients", [])
-        result.setdefault("recipes", [])
-        result.setdefault("shopping_suggestions", [])
-        return result
-    except json.JSONDecodeError as e:
-        return {"error": "Invalid JSON", "raw": cleaned, "parse_error": str(e)}
+        return parse_content(content, FridgeInventory)
+    except ValueError as e:
+        return {"error": "Invalid JSON", "raw": content, "parse_error": str(e)}
 
 
-async def analyze_dish_image(image_bytes: bytes):
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+async def _analyze_fridge_photos(images: List[bytes], model: str = VISION_MODEL,
+                                 detail: str = IMAGE_DETAIL, mode: str = "fridge-batch") -> dict:
+    response = await chat_completion(
+        mode=mode,
+        model=model,
+        temperature=0.0,
+        max_tokens=200 + 200 * len(images),
+        response_format=response_format(FridgeInventory),
+        messages=[
+            {"role": "system",
+             "content": "You are a world-class fridge analyst. Return ONLY valid JSON. No markdown, no explanations, no code blocks."},
+            {"role": "user", "content": [
+                {"type": "text", "text":
+                    f"These {len(images)} photos show different parts of the same fridge (shelves, door, "
+                    "freezer). List every visible food item once with its total realistic quantity across "
+                    "all photos (e.g. {\"name\": \"milk\", \"amount\": \"1.5L\"}); an item visible in "
+                    "two photos is still one item. Add 3-6 staples in shopping_suggestions that would "
+                    "complement them. Never return an empty ingredient list unless the fridge is truly "
+                    "empty. Do not write recipes."},
+                *(image_part(image, detail) for image in images),
+            ]}
+        ]
+    )
+
+    content = response.choices[0].message.content
+    try:
+        return parse_content(content, FridgeInventory)
+    except ValueError as e:
+        return {"error": "Invalid JSON", "raw": content, "parse_error": str(e)}
 
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-08-06",  # newest & most accurate vision model
+
+async def _analyze_dish_image(image_bytes: bytes, model: str = VISION_MODEL, detail: str = IMAGE_DETAIL,
+                              mode: str = "fridge-dish"):
+    response = await chat_completion(
+        mode=mode,
+        model=model,
         temperature=0.0,
         max_tokens=2000,
+        response_format=response_format(DishShoppingAnalysis),
         messages=[
             {"role": "system",
              "content": "You are a world-class fridge analyst. Return ONLY valid JSON. No markdown, no explanations, no code blocks."},
@@ -132,22 +323,17 @@ RETURN JSON EXACTLY in this structure:
   }
 }           
             """},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                image_part(image_bytes, detail)
             ]}
         ]
     )
 
-    raw = response.choices[0].message.content.strip()
-
-    # Remove any markdown
-    cleaned = re.sub(r"^```json\s*|```$", "", raw, flags=re.MULTILINE).strip()
-
+    content = response.choices[0].message.content
     try:
-        result = json.loads(cleaned)
-        # Guarantee structure
-        result.setdefault("ingredients", [])
+        result = parse_content(content, DishShoppingAnalysis)
+        # Keep the keys this endpoint has always returned
         result.setdefault("recipes", [])
         result.setdefault("shopping_suggestions", [])
         return result
-    except json.JSONDecodeError as e:
-        return {"error": "Invalid JSON", "raw": cleaned, "parse_error": str(e)}
+    except ValueError as e:
+        return {"error": "Invalid JSON", "raw": content, "parse_error": str(e)}